@@ -1,13 +1,13 @@
 import pygame
 import numpy as np
 import os
+import queue
+import threading
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 from color_utils import adjust_hue_saturation
 
-# Инициализация Pygame
-pygame.init()
-
 # Константы
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
@@ -23,10 +23,15 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 
-# Создание окна
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("HSV Color Adjustment Tool")
-clock = pygame.time.Clock()
+# Быстрый предпросмотр считается в уменьшенном в PREVIEW_SCALE раз кадре
+PREVIEW_SCALE = 4
+FILMSTRIP_PADDING = 4
+
+# Окно, шрифты и изображения создаются в main(): модуль импортируют процессы пула для ленты кадров
+screen = None
+clock = None
+font = None
+small_font = None
 
 image_path = "assets/horse/barrier/frame_0058.png"
 
@@ -44,14 +49,6 @@ params = default_params.copy()
 
 color_range = [(191, 70, 18), (223, 122, 66)]
 
-# Загрузка шрифта
-try:
-    font = pygame.font.Font(None, FONT_SIZE)
-    small_font = pygame.font.Font(None, FONT_SIZE - 4)
-except:
-    font = pygame.font.SysFont('Arial', FONT_SIZE)
-    small_font = pygame.font.SysFont('Arial', FONT_SIZE - 4)
-
 # Загрузка изображения
 def load_image():
     if not os.path.exists(image_path):
@@ -67,26 +64,175 @@ def load_image():
     else:
         return pygame.image.load(image_path).convert_alpha()
 
-original_surface = load_image()
-modified_surface = original_surface.copy()
+original_surface = None
+modified_surface = None
+# Какой результат сейчас на экране: 'preview' (уменьшенный), 'full' или None (идет расчет)
+modified_quality = None
 
 # Активный параметр для регулировки
 active_param = None
 
-# Функция для обновления модифицированного изображения
-def update_modified_image():
-    global modified_surface
-    modified_surface = adjust_hue_saturation(
-        original_surface,
+# Режим ленты кадров: текущие параметры применяются ко всем кадрам папки изображения
+filmstrip_mode = False
+filmstrip_paths = []
+filmstrip_thumbs = []  # миниатюра, None — еще считается, FILMSTRIP_FAILED — кадр не обработан
+FILMSTRIP_FAILED = False
+filmstrip_futures = []
+filmstrip_pool = None
+
+def adjust(surface, job_params):
+    return adjust_hue_saturation(
+        surface,
         color_range=color_range,
-        hue_shift=params['hue_shift'],
-        saturation_scale=params['saturation_scale'],
-        value_scale=params['value_scale'],
-        h_tolerance=params['h_tolerance'],
-        s_tolerance=params['s_tolerance'],
-        v_tolerance=params['v_tolerance']
+        hue_shift=job_params['hue_shift'],
+        saturation_scale=job_params['saturation_scale'],
+        value_scale=job_params['value_scale'],
+        h_tolerance=job_params['h_tolerance'],
+        s_tolerance=job_params['s_tolerance'],
+        v_tolerance=job_params['v_tolerance']
     )
 
+class PreviewWorker:
+    """Считает модифицированное изображение в фоновом потоке: сначала в уменьшенном
+    кадре, затем в полном. Каждая смена параметров — новое поколение задания;
+    устаревшие задания пропускаются, а их результаты не показываются."""
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.preview_source = pygame.transform.scale(
+            surface, (max(1, surface.get_width() // PREVIEW_SCALE), max(1, surface.get_height() // PREVIEW_SCALE)))
+        self.generation = 0
+        self.jobs = queue.SimpleQueue()
+        self.results = queue.SimpleQueue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def request(self, job_params):
+        self.generation += 1
+        self.jobs.put((self.generation, dict(job_params)))
+
+    def _run(self):
+        while True:
+            generation, job_params = self.jobs.get()
+            # Берем только самое новое задание из накопившихся
+            while True:
+                try:
+                    generation, job_params = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+            # Уменьшенный кадр без сглаживания: цвета пикселей те же, область находится так же
+            preview = adjust(self.preview_source, job_params)
+            if generation != self.generation:
+                continue
+            self.results.put((generation, 'preview', pygame.transform.scale(preview, self.surface.get_size())))
+            full = adjust(self.surface, job_params)
+            if generation == self.generation:
+                self.results.put((generation, 'full', full))
+
+    def poll(self):
+        """Последний актуальный результат (качество, поверхность) или None, без ожидания"""
+        latest = None
+        while True:
+            try:
+                generation, quality, surface = self.results.get_nowait()
+            except queue.Empty:
+                return latest
+            if generation == self.generation:
+                latest = (quality, surface)
+
+preview_worker = None
+
+# Функция для обновления модифицированного изображения
+def update_modified_image():
+    global modified_quality
+    modified_quality = None
+    preview_worker.request(params)
+    if filmstrip_mode:
+        start_filmstrip()
+
+def poll_modified_image():
+    global modified_surface, modified_quality
+    result = preview_worker.poll()
+    if result is not None:
+        modified_quality, modified_surface = result
+    if filmstrip_mode:
+        poll_filmstrip()
+
+def adjust_file(path, job_params):
+    """Выполняется в процессе пула: загружает кадр по пути (поверхности не передаются
+    между процессами) и возвращает размер и RGBA-байты результата"""
+    loaded = pygame.image.load(path)
+    # Как convert_alpha() в load_image: 8-битные и палитровые PNG приводятся к 32 битам с альфой
+    surface = pygame.Surface(loaded.get_size(), pygame.SRCALPHA, 32)
+    surface.blit(loaded, (0, 0))
+    result = adjust(surface, job_params)
+    return result.get_size(), pygame.image.tobytes(result, 'RGBA')
+
+def start_filmstrip():
+    """Ставит все кадры папки в пул процессов; задания от прошлых параметров отменяются"""
+    global filmstrip_paths, filmstrip_thumbs, filmstrip_futures, filmstrip_pool
+    folder = os.path.dirname(image_path)
+    filmstrip_paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.png')) \
+        if os.path.isdir(folder) else []
+    for future in filmstrip_futures:
+        future.cancel()
+    if filmstrip_pool is None:
+        filmstrip_pool = ProcessPoolExecutor()
+    filmstrip_futures = [filmstrip_pool.submit(adjust_file, path, params) for path in filmstrip_paths]
+    filmstrip_thumbs = [None] * len(filmstrip_paths)
+
+def filmstrip_thumb_size():
+    """Размер миниатюры, при котором все кадры помещаются в область над параметрами"""
+    count = max(1, len(filmstrip_paths))
+    # Справа остается место под инструкции
+    area_w = SCREEN_WIDTH - 300 - 40
+    area_h = original_surface.get_height() + 100
+    aspect = original_surface.get_width() / original_surface.get_height()
+    columns = 1
+    while True:
+        thumb_w = area_w // columns - FILMSTRIP_PADDING
+        thumb_h = int(thumb_w / aspect)
+        rows = -(-count // columns)
+        if rows * (thumb_h + FILMSTRIP_PADDING) <= area_h or thumb_w < 16:
+            return max(1, thumb_w), max(1, thumb_h), columns
+        columns += 1
+
+def poll_filmstrip(limit=4):
+    """Забирает готовые кадры ленты, не больше limit за кадр интерфейса"""
+    thumb_w, thumb_h, _ = filmstrip_thumb_size()
+    for i, future in enumerate(filmstrip_futures):
+        if limit == 0:
+            break
+        if filmstrip_thumbs[i] is None and future.done() and not future.cancelled():
+            limit -= 1
+            try:
+                size, data = future.result()
+            except Exception as e:
+                # Ошибка одного кадра не должна ронять интерфейс
+                print(f"Error adjusting {filmstrip_paths[i]}: {e}")
+                filmstrip_thumbs[i] = FILMSTRIP_FAILED
+                continue
+            frame = pygame.image.frombytes(data, size, 'RGBA')
+            filmstrip_thumbs[i] = pygame.transform.smoothscale(frame, (thumb_w, thumb_h))
+
+def draw_filmstrip(padding):
+    thumb_w, thumb_h, columns = filmstrip_thumb_size()
+    for i in range(len(filmstrip_paths)):
+        x = padding + (i % columns) * (thumb_w + FILMSTRIP_PADDING)
+        y = padding + (i // columns) * (thumb_h + FILMSTRIP_PADDING)
+        if filmstrip_thumbs[i] is FILMSTRIP_FAILED:
+            pygame.draw.rect(screen, RED, (x, y, thumb_w, thumb_h), 1)
+            pygame.draw.line(screen, RED, (x, y), (x + thumb_w - 1, y + thumb_h - 1))
+            pygame.draw.line(screen, RED, (x, y + thumb_h - 1), (x + thumb_w - 1, y))
+        elif filmstrip_thumbs[i] is not None:
+            screen.blit(filmstrip_thumbs[i], (x, y))
+        else:
+            pygame.draw.rect(screen, LIGHT_GRAY, (x, y, thumb_w, thumb_h), 1)
+    done = sum(thumb is not None for thumb in filmstrip_thumbs)
+    failed = sum(thumb is FILMSTRIP_FAILED for thumb in filmstrip_thumbs)
+    progress = small_font.render(f"Лента: {done}/{len(filmstrip_paths)} кадров"
+                                 + (f", с ошибкой: {failed}" if failed else ""), True, WHITE)
+    screen.blit(progress, (padding, original_surface.get_height() + 120))
+
 # Функция для отрисовки интерфейса
 def draw_interface():
     # Очистка экрана
@@ -101,15 +247,19 @@ def draw_interface():
     original_pos = (padding, padding)
     modified_pos = (SCREEN_WIDTH // 2 + padding, padding)
     
-    # Отрисовка изображений
-    screen.blit(original_surface, original_pos)
-    screen.blit(modified_surface, modified_pos)
-    
-    # Подписи
-    original_text = font.render("Оригинал", True, WHITE)
-    modified_text = font.render("Модифицированный", True, WHITE)
-    screen.blit(original_text, (original_pos[0], original_pos[1] + img_height + 10))
-    screen.blit(modified_text, (modified_pos[0], modified_pos[1] + img_height + 10))
+    if filmstrip_mode:
+        draw_filmstrip(padding)
+    else:
+        # Отрисовка изображений
+        screen.blit(original_surface, original_pos)
+        screen.blit(modified_surface, modified_pos)
+
+        # Подписи
+        original_text = font.render("Оригинал", True, WHITE)
+        status = {'preview': " (предпросмотр)", 'full': "", None: " (расчет...)"}[modified_quality]
+        modified_text = font.render("Модифицированный" + status, True, WHITE)
+        screen.blit(original_text, (original_pos[0], original_pos[1] + img_height + 10))
+        screen.blit(modified_text, (modified_pos[0], modified_pos[1] + img_height + 10))
     
     # Отображение параметров
     params_y = img_height + 150
@@ -133,6 +283,7 @@ def draw_interface():
         "Кликните на параметр для выбора",
         "Стрелки Вверх/Вниз - регулировка",
         "R - сброс параметров",
+        "F - лента всех кадров анимации",
     ]
     
     for i, instruction in enumerate(instructions):
@@ -180,32 +331,75 @@ def reset_params():
     params = default_params.copy()
     update_modified_image()
 
-# Основной цикл
-running = True
-update_modified_image()  # Первоначальное обновление
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:  # Левая кнопка мыши
-                handle_param_click(event.pos)
-        
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_UP:
-                adjust_param(1)
-            elif event.key == pygame.K_DOWN:
-                adjust_param(-1)
-            elif event.key == pygame.K_r:
-                reset_params()
-            elif event.key == pygame.K_ESCAPE:
+# Переключение ленты кадров
+def toggle_filmstrip():
+    global filmstrip_mode
+    filmstrip_mode = not filmstrip_mode
+    if filmstrip_mode:
+        start_filmstrip()
+    else:
+        for future in filmstrip_futures:
+            future.cancel()
+
+def main():
+    global screen, clock, font, small_font, original_surface, modified_surface, preview_worker
+
+    # Инициализация Pygame
+    pygame.init()
+
+    # Создание окна
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("HSV Color Adjustment Tool")
+    clock = pygame.time.Clock()
+
+    # Загрузка шрифта
+    try:
+        font = pygame.font.Font(None, FONT_SIZE)
+        small_font = pygame.font.Font(None, FONT_SIZE - 4)
+    except:
+        font = pygame.font.SysFont('Arial', FONT_SIZE)
+        small_font = pygame.font.SysFont('Arial', FONT_SIZE - 4)
+
+    original_surface = load_image()
+    modified_surface = original_surface.copy()
+    preview_worker = PreviewWorker(original_surface)
+
+    # Основной цикл
+    running = True
+    update_modified_image()  # Первоначальное обновление
+
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
                 running = False
-    
-    # Отрисовка
-    draw_interface()
-    pygame.display.flip()
-    clock.tick(FPS)
 
-pygame.quit()
\ No newline at end of file
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # Левая кнопка мыши
+                    handle_param_click(event.pos)
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_UP:
+                    adjust_param(1)
+                elif event.key == pygame.K_DOWN:
+                    adjust_param(-1)
+                elif event.key == pygame.K_r:
+                    reset_params()
+                elif event.key == pygame.K_f:
+                    toggle_filmstrip()
+                elif event.key == pygame.K_ESCAPE:
+                    running = False
+
+        # Забираем готовые результаты фоновых расчетов, не дожидаясь их
+        poll_modified_image()
+
+        # Отрисовка
+        draw_interface()
+        pygame.display.flip()
+        clock.tick(FPS)
+
+    if filmstrip_pool is not None:
+        filmstrip_pool.shutdown(wait=False, cancel_futures=True)
+    pygame.quit()
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""Один файл со всеми картинками assets/, уже декодированными.
+
+Пиксели хранятся так, как их держит pygame после convert_alpha() на обычном
+32-битном экране: BGRA в памяти (маски R 0xff0000, G 0xff00, B 0xff, A 0xff000000),
+альфа не премультиплицирована — игра рисует обычным альфа-смешиванием. Файл
+открывается через mmap, и поверхности создаются pygame.image.frombuffer прямо
+поверх отображенной памяти: ни декодирования PNG, ни копии пикселей. Если формат
+экрана другой, поверхность один раз конвертируется (все равно без декодирования PNG).
+Блоки можно сжать zlib (--compress): тогда блок распаковывается при загрузке —
+меньше чтения с медленного носителя ценой копии в памяти.
+
+Одинаковые по пикселям картинки хранятся одним блоком, индекс ведет на него из всех путей.
+Для каждой картинки индекс хранит mtime и размер исходного PNG: если PNG рядом изменился
+после сборки (или в папке другой набор PNG), берется PNG с предупреждением — до пересборки бандла.
+
+    python asset_bundle.py build [--compress] [-o assets.bundle]
+    python asset_bundle.py info [assets.bundle]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = b'HRAB'
+# 2 — mtime и размер исходных PNG в индексе
+VERSION = 2
+# magic, версия, смещение индекса, длина индекса (JSON, zlib)
+_HEADER = struct.Struct('<4sBQI')
+# Начало блоков выравнивается: строки пикселей на границе кэш-линии
+_ALIGN = 64
+# Маски формата блоков (R, G, B, A)
+MASKS = (0xff0000, 0xff00, 0xff, 0xff000000)
+
+
+def _source_paths(root):
+    paths = []
+    for folder, _, files in os.walk(root):
+        paths.extend(os.path.normpath(os.path.join(folder, name)) for name in files if name.endswith('.png'))
+    return sorted(paths)
+
+
+def build(root, output, compress=False):
+    """Собирает бандл из всех PNG в root; возвращает (картинок, блоков, байт)"""
+    import pygame
+
+    index = {}
+    blocks = {}  # digest -> [смещение, размер, сжат]
+    with open(output, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        for path in _source_paths(root):
+            try:
+                image = pygame.image.load(path)
+            except pygame.error as e:
+                print(f"Error loading image {path}: {e}")
+                continue
+            pixels = pygame.image.tobytes(image, 'BGRA')
+            digest = hashlib.blake2b(pixels, digest_size=16).hexdigest()
+            block = blocks.get(digest)
+            if block is None:
+                data = zlib.compress(pixels, 6) if compress else pixels
+                offset = -f.tell() % _ALIGN + f.tell()
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(data)
+                block = blocks[digest] = [offset, len(data), compress]
+            stat = os.stat(path)
+            index[path.replace(os.sep, '/')] = [image.get_width(), image.get_height(), digest] + block + \
+                [stat.st_mtime_ns, stat.st_size]
+        index_data = zlib.compress(json.dumps(index, separators=(',', ':')).encode())
+        index_offset = f.tell()
+        f.write(index_data)
+        size = f.tell()
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, index_offset, len(index_data)))
+    return len(index), len(blocks), size
+
+
+class AssetBundle:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            # Копия при записи: поверхности поверх страниц файла можно менять, файл — нет
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, index_offset, index_size = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not an asset bundle version {VERSION}")
+        index = json.loads(zlib.decompress(self._map[index_offset:index_offset + index_size]))
+        # Ключи — пути в виде os.path.normpath, как их строит игра
+        self._index = {os.path.normpath(path): entry for path, entry in index.items()}
+        self._folders = {}
+        for image_path in sorted(self._index):
+            self._folders.setdefault(os.path.dirname(image_path), []).append(image_path)
+        self._view = memoryview(self._map)
+        self._surfaces = {}  # смещение блока -> поверхность (общие блоки — одна поверхность)
+
+    def list_images(self, folder):
+        """Отсортированные пути PNG папки (None — папки нет в бандле или набор PNG на диске другой)"""
+        files = self._folders.get(os.path.normpath(folder))
+        if files is None:
+            return None
+        if os.path.isdir(folder):
+            on_disk = sorted(os.path.normpath(path) for path in glob.glob(os.path.join(folder, '*.png')))
+            if on_disk != files:
+                print(f"Warning: {folder} differs from asset bundle {self.path}, listing PNG files; rebuild the bundle")
+                return None
+        return list(files)
+
+    def is_stale(self, image_path):
+        """PNG рядом изменился после сборки бандла (нет PNG — бандл считается актуальным)"""
+        entry = self._index.get(os.path.normpath(image_path))
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return False
+        return entry is not None and (stat.st_mtime_ns, stat.st_size) != tuple(entry[6:8])
+
+    def __contains__(self, image_path):
+        return os.path.normpath(image_path) in self._index
+
+    def load(self, image_path):
+        """-> (поверхность, pixel_key) или None, если файла нет в бандле или он устарел.
+        Поверхность в формате блоков (BGRA, с альфой); ее надо конвертировать,
+        если формат экрана другой"""
+        entry = self._index.get(os.path.normpath(image_path))
+        if entry is None:
+            return None
+        if self.is_stale(image_path):
+            print(f"Warning: {image_path} changed after asset bundle {self.path} was built, loading PNG; "
+                  f"rebuild the bundle")
+            return None
+        import pygame
+
+        width, height, digest, offset, size, compressed = entry[:6]
+        surface = self._surfaces.get(offset)
+        if surface is None:
+            data = self._view[offset:offset + size]
+            if compressed:
+                data = bytearray(zlib.decompress(data))
+            # setdefault: блок может одновременно читать поток подготовки заезда
+            surface = self._surfaces.setdefault(offset, pygame.image.frombuffer(data, (width, height), 'BGRA'))
+        # Тот же ключ, что asset_cache.pixel_key: хэш пикселей посчитан при сборке
+        return surface, ((width, height), 32, pygame.SRCALPHA, bytes.fromhex(digest))
+
+    def info(self):
+        blocks = {tuple(entry[3:6]) for entry in self._index.values()}
+        return {
+            'images': len(self._index),
+            'blocks': len(blocks),
+            'stale': sum(self.is_stale(path) for path in self._index),
+            'compressed': any(block[2] for block in blocks),
+            'pixel_bytes': sum(width * height * 4 for width, height, *_ in
+                               {entry[3]: entry for entry in self._index.values()}.values()),
+            'file_bytes': len(self._map),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бандл декодированных картинок assets/')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build')
+    build_parser.add_argument('--root', default='assets')
+    build_parser.add_argument('-o', '--output', default='assets.bundle')
+    build_parser.add_argument('--compress', action='store_true', help='сжать блоки zlib')
+    info_parser = commands.add_parser('info')
+    info_parser.add_argument('path', nargs='?', default='assets.bundle')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        images, blocks, size = build(args.root, args.output, args.compress)
+        print(f"{args.output}: {images} images, {blocks} blocks, {size / (1024 * 1024):.1f} MB")
+    else:
+        info = AssetBundle(args.path).info()
+        print(f"{args.path}: {info['images']} images, {info['blocks']} blocks, "
+              f"pixels {info['pixel_bytes'] / (1024 * 1024):.1f} MB, file {info['file_bytes'] / (1024 * 1024):.1f} MB"
+              + (', compressed' if info['compressed'] else '')
+              + (f", {info['stale']} stale (PNG changed since build)" if info['stale'] else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
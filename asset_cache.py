@@ -0,0 +1,283 @@
+import os
+import glob
+import hashlib
+import pygame
+
+import asset_bundle
+
+
+# Общий кэш неизменяемых ресурсов: поверхности загружаются один раз
+# и разделяются между всеми дорожками, лошадьми и спрайтами.
+_images = {}
+_image_lists = {}
+_scaled = {}
+_frames = {}
+# Дедупликация: одинаковые по пикселям кадры хранятся в одном экземпляре
+_by_pixels = {}
+# Именованные наборы кадров (например, лошадь с цветом жокея) для отчета о памяти
+_frame_sets = {}
+# id(поверхность) -> (поверхность, pygame.mask.Mask) для попиксельных столкновений
+_masks = {}
+# Бандл декодированных картинок (см. asset_bundle.py); None — PNG с диска
+_bundle = None
+# Формат бандла совпадает с convert_alpha() экрана: поверхности бандла используются как есть
+_bundle_native = False
+
+
+def open_bundle(path):
+    """Подключает бандл (после pygame.display.set_mode): картинки из него не декодируются,
+    списки папок не читаются с диска. Файлы, которых нет в бандле, грузятся из PNG как раньше"""
+    global _bundle, _bundle_native
+    _bundle = asset_bundle.AssetBundle(path)
+    probe = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+    _bundle_native = probe.get_bitsize() == 32 and probe.get_masks() == asset_bundle.MASKS
+
+
+def list_images(folder):
+    """Возвращает отсортированный список PNG в папке (результат кэшируется)"""
+    files = _image_lists.get(folder)
+    if files is None:
+        files = _bundle.list_images(folder) if _bundle is not None else None
+        if files is None:
+            files = sorted(glob.glob(os.path.join(folder, '*.png')))
+        _image_lists[folder] = files
+    return files
+
+
+def pixel_key(surface):
+    """Ключ дедупликации по пикселям (можно считать вне главного потока)"""
+    digest = hashlib.blake2b(surface.get_buffer().raw, digest_size=16).digest()
+    return surface.get_size(), surface.get_bitsize(), surface.get_flags() & pygame.SRCALPHA, digest
+
+
+def dedupe(surface, key=None):
+    """Возвращает уже загруженную поверхность с теми же пикселями, если такая есть"""
+    return _by_pixels.setdefault(key if key is not None else pixel_key(surface), surface)
+
+
+def decode_image(image_path, alpha=True):
+    """Декодирует и конвертирует изображение, не трогая кэш (можно вызывать из фонового потока).
+    Возвращает (поверхность, pixel_key)"""
+    loaded = _bundle.load(image_path) if _bundle is not None else None
+    if loaded is None:
+        image = pygame.image.load(image_path)
+        image = image.convert_alpha() if alpha else image.convert()
+    elif alpha and _bundle_native:
+        # Поверхность поверх памяти бандла, ключ дедупликации посчитан при сборке
+        return loaded
+    else:
+        image = loaded[0].convert_alpha() if alpha else loaded[0].convert()
+    return image, pixel_key(image)
+
+
+def load_image(image_path, alpha=True):
+    """Загружает изображение один раз; повторные вызовы возвращают ту же поверхность.
+    Файлы с одинаковыми пикселями получают одну общую поверхность."""
+    image = _images.get((image_path, alpha))
+    if image is None:
+        image = add_image(image_path, alpha, *decode_image(image_path, alpha))
+    return image
+
+
+def add_image(image_path, alpha, surface, key):
+    """Кладет в кэш изображение, декодированное decode_image (уже загруженное не заменяется).
+    Только из главного потока"""
+    image = _images.get((image_path, alpha))
+    if image is None:
+        image = dedupe(surface, key)
+        _images[(image_path, alpha)] = image
+    return image
+
+
+def load_frames(folder_path):
+    """Загружает кадры анимации из папки; список кадров общий для всех Animation"""
+    frames = _frames.get(folder_path)
+    if frames is not None:
+        return frames
+
+    frames = []
+    for image_file in list_images(folder_path):
+        try:
+            frames.append(load_image(image_file))
+        except pygame.error as e:
+            print(f"Error loading image {image_file}: {e}")
+
+    if not frames:
+        print(f"Warning: No frames found in {folder_path}")
+        # Create a placeholder surface
+        placeholder = pygame.Surface((32, 32), pygame.SRCALPHA)
+        pygame.draw.rect(placeholder, (255, 0, 0), (0, 0, 32, 32))
+        frames = [placeholder]
+
+    _frames[folder_path] = frames
+    return frames
+
+
+def load_scaled(image_path, size, alpha=False, flip_x=False, smooth=True):
+    """Возвращает масштабированную копию изображения, общую для всех дорожек.
+    smooth=False — быстрый scale, если сглаженной копии этого размера еще нет"""
+    key = (image_path, alpha, size, flip_x, smooth)
+    scaled = _scaled.get(key)
+    if scaled is None and not smooth:
+        scaled = _scaled.get((image_path, alpha, size, flip_x, True))
+    if scaled is None:
+        if flip_x:
+            scaled = pygame.transform.flip(load_scaled(image_path, size, alpha, smooth=smooth), True, False)
+        else:
+            image = load_image(image_path, alpha)
+            if smooth:
+                try:
+                    scaled = pygame.transform.smoothscale(image, size)
+                except Exception:
+                    scaled = pygame.transform.scale(image, size)
+            else:
+                scaled = pygame.transform.scale(image, size)
+        _scaled[key] = scaled
+    return scaled
+
+
+def add_scaled(scaled):
+    """Кладет в кэш масштабированные копии {ключ load_scaled: поверхность}, подготовленные
+    в фоновом потоке (уже имеющиеся не заменяются). Только из главного потока"""
+    for key, surface in scaled.items():
+        _scaled.setdefault(key, surface)
+
+
+def get_mask(surface):
+    """Маска непрозрачных пикселей поверхности (строится один раз)"""
+    entry = _masks.get(id(surface))
+    if entry is None or entry[0] is not surface:
+        entry = (surface, pygame.mask.from_surface(surface))
+        _masks[id(surface)] = entry
+    return entry[1]
+
+
+def cached_image_keys():
+    """Ключи (путь, alpha) загруженных изображений — какие варианты нужны при перезагрузке файла"""
+    return list(_images)
+
+
+def cached_scaled_keys():
+    """Ключи (путь, alpha, размер, flip_x, smooth) масштабированных копий"""
+    return list(_scaled)
+
+
+def replace_image(image_path, surfaces, scaled=None):
+    """Подменяет загруженные варианты файла новыми поверхностями (горячая перезагрузка).
+
+    surfaces: {alpha: (поверхность, pixel_key)}, scaled: {ключ load_scaled: поверхность}.
+    Вызывается из главного потока между кадрами: кадры анимаций заменяются на месте
+    в общих списках, масштабированные копии — готовыми (остальные сбрасываются).
+    Возвращает {id(старая поверхность): новая} для поверхностей, которые больше никем
+    не используются, — по нему дорожки подменяют картинки живых спрайтов.
+    """
+    replaced = {}
+    for alpha, (surface, key) in surfaces.items():
+        old = _images.get((image_path, alpha))
+        new = dedupe(surface, key)
+        _images[(image_path, alpha)] = new
+        if old is not None and old is not new:
+            replaced[id(old)] = (old, new)
+
+    folder = os.path.dirname(image_path)
+    frames = _frames.get(folder)
+    files = _image_lists.get(folder)
+    if frames is not None and files is not None and len(frames) == len(files) and image_path in files:
+        frames[files.index(image_path)] = _images[(image_path, True)]
+
+    for key in [key for key in _scaled if key[0] == image_path]:
+        del _scaled[key]
+    _scaled.update(scaled or {})
+
+    # Старая поверхность могла быть общей с другим файлом с теми же пикселями — такую не трогаем
+    in_use = {id(image) for image in _images.values()}
+    result = {}
+    for old_id, (old, new) in replaced.items():
+        if old_id in in_use:
+            continue
+        for key in [key for key, value in _by_pixels.items() if value is old]:
+            del _by_pixels[key]
+        _masks.pop(old_id, None)
+        result[old_id] = new
+    return result
+
+
+def drop_frames(folder_path):
+    """Выгружает кадры папки из кэша, когда у вызывающего есть свои копии (обрезанные кадры лошади).
+    Список файлов папки остается; поверхности, общие с другими файлами, не трогаются"""
+    frames = _frames.pop(folder_path, None) or []
+    dropped = {id(frame) for frame in frames}
+    for image_path in _image_lists.get(folder_path, ()):
+        image = _images.pop((image_path, True), None)
+        if image is not None:
+            dropped.add(id(image))
+    dropped -= {id(image) for image in _images.values()}
+    for key in [key for key, value in _by_pixels.items() if id(value) in dropped]:
+        del _by_pixels[key]
+
+
+def refresh_image_list(folder):
+    """Перечитывает список PNG папки (добавленные или удаленные файлы); список заменяется целиком"""
+    files = sorted(glob.glob(os.path.join(folder, '*.png')))
+    changed = files != _image_lists.get(folder)
+    _image_lists[folder] = files
+    return changed
+
+
+def register_frame_set(name, animation_names, frames):
+    """Регистрирует набор кадров анимаций (список списков) для отчета о памяти"""
+    _frame_sets[name] = (animation_names, frames)
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+def _unique_bytes(surfaces):
+    unique = {id(surface): surface for surface in surfaces}
+    return sum(surface_bytes(surface) for surface in unique.values()), len(unique)
+
+
+def memory_report():
+    """Память под кэшированные поверхности: по анимациям, по наборам кадров и всего.
+    Общие (дедуплицированные) поверхности считаются один раз внутри каждой группы."""
+    report = {'frame_sets': {}, 'images': {}}
+    all_surfaces = []
+    for name, (animation_names, frames) in _frame_sets.items():
+        animations = {}
+        for animation_name, animation_frames in zip(animation_names, frames):
+            size, count = _unique_bytes(animation_frames)
+            animations[animation_name] = {'bytes': size, 'frames': len(animation_frames), 'unique_frames': count}
+            all_surfaces.extend(animation_frames)
+        size, count = _unique_bytes([frame for animation_frames in frames for frame in animation_frames])
+        report['frame_sets'][name] = {'bytes': size, 'unique_frames': count, 'animations': animations}
+    images = list(_images.values()) + list(_scaled.values())
+    for animation_frames in _frames.values():
+        images.extend(animation_frames)
+    size, count = _unique_bytes(images)
+    report['images'] = {'bytes': size, 'surfaces': count}
+    all_surfaces.extend(images)
+    report['total_bytes'], report['total_surfaces'] = _unique_bytes(all_surfaces)
+    return report
+
+
+def print_memory_report(report=None):
+    report = report if report is not None else memory_report()
+    mb = 1024 * 1024
+    for name, frame_set in report['frame_sets'].items():
+        print(f"{name}: {frame_set['bytes'] / mb:.1f} MB, {frame_set['unique_frames']} unique frames")
+        for animation_name, animation in frame_set['animations'].items():
+            print(f"    {animation_name:14s} {animation['bytes'] / mb:7.1f} MB  "
+                  f"{animation['unique_frames']}/{animation['frames']} unique frames")
+    print(f"cached images: {report['images']['bytes'] / mb:.1f} MB, {report['images']['surfaces']} surfaces")
+    print(f"total: {report['total_bytes'] / mb:.1f} MB, {report['total_surfaces']} surfaces")
+
+
+def clear():
+    _images.clear()
+    _image_lists.clear()
+    _scaled.clear()
+    _frames.clear()
+    _by_pixels.clear()
+    _frame_sets.clear()
+    _masks.clear()
@@ -1,29 +1,32 @@
 import os
-import glob
 import random
 import pygame
 
+import asset_cache
+
 
 class Barrier(pygame.sprite.Sprite):
-    def __init__(self, position):
+    def __init__(self, position, variant=None):
+        """variant — номер картинки (по модулю их числа); None — случайная"""
         super().__init__()
-        image_path = self._choose_random_image()
+        image_path = self._choose_random_image(variant)
         self.image = self._load_image_with_alpha(image_path)
         self.rect = self.image.get_rect(bottomleft=position)
         self.pos_x = float(self.rect.x)
 
-    def _choose_random_image(self):
+    def _choose_random_image(self, variant=None):
         folder = os.path.join('assets', 'barrier')
-        candidates = sorted(glob.glob(os.path.join(folder, '*.png')))
+        candidates = asset_cache.list_images(folder)
         if not candidates:
             return None
+        if variant is not None:
+            return candidates[variant % len(candidates)]
         return random.choice(candidates)
 
     def _load_image_with_alpha(self, image_path):
         if image_path and os.path.exists(image_path):
             try:
-                image = pygame.image.load(image_path)
-                return image.convert_alpha()
+                return asset_cache.load_image(image_path)
             except pygame.error as e:
                 print(f"Error loading barrier image {image_path}: {e}")
         # Fallback simple placeholder
@@ -0,0 +1,401 @@
+"""Бенчмарки горячих участков игры.
+
+Запуск из корня проекта (нужна папка assets), окно не открывается — используется
+драйвер SDL dummy:
+
+    python benchmark.py                              # все бенчмарки -> benchmark_results.json
+    python benchmark.py --only horse                 # только имена, содержащие подстроку
+    python benchmark.py --save-baseline              # сохранить результат как базовый
+    python benchmark.py --compare                    # сравнить с базовым, код 1 при регрессии
+    python benchmark.py --memory-report              # память под кадры лошадей по умолчанию
+    python benchmark.py --palette-report             # тонировка против палитр для 2/8/32 цветов
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+DEFAULT_OUTPUT = 'benchmark_results.json'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.15
+
+# name -> (setup, number, repeat); setup() готовит данные и возвращает замеряемую функцию
+_BENCHMARKS = {}
+
+
+def register(name, number=1, repeat=5):
+    def decorator(setup):
+        _BENCHMARKS[name] = (setup, number, repeat)
+        return setup
+    return decorator
+
+
+def _ensure_display():
+    if pygame.display.get_surface() is None:
+        pygame.init()
+        pygame.display.set_mode((1024, 768))
+
+
+def _generate_plan(total_distance):
+    from constants import BARRIER_MAX_SPAWN_DISTANCE, BARRIER_MIN_SPAWN_DISTANCE, GRASS_MAX_SPAWN_DISTANCE, GRASS_MIN_SPAWN_DISTANCE
+    from track_plan import TrackPlan
+    return TrackPlan.generate(
+        total_distance=total_distance,
+        min_grass_spacing=GRASS_MIN_SPAWN_DISTANCE,
+        max_grass_spacing=GRASS_MAX_SPAWN_DISTANCE,
+        min_barrier_spacing=BARRIER_MIN_SPAWN_DISTANCE,
+        max_barrier_spacing=BARRIER_MAX_SPAWN_DISTANCE,
+    )
+
+
+def _clear_asset_caches():
+    import asset_cache
+    from horse import Horse
+    asset_cache.clear()
+    Horse._frames_by_shift.clear()
+    Horse._indexed = None
+    Horse._source = None
+    Horse._palettes_by_shift.clear()
+    Horse._masks.clear()
+    Horse._clearances.clear()
+
+
+def _galloping_game(lane_configs=None, results_db=None):
+    """Game на ручных часах: отсчет пропущен, все лошади скачут галопом"""
+    import main
+    from game_clock import ManualClock
+    from horse_states import GALLOP
+    game = main.Game(lane_configs, clock=ManualClock(), results_db=results_db)
+    game.countdown_active = False
+    for path in game.lanes.paths:
+        horse = path.horse
+        while horse.current_animation != GALLOP:
+            horse.accelerate()
+            for _ in range(60):
+                horse.update(1 / 60)
+    return game
+
+
+@register('track_plan.generate', repeat=10)
+def bench_track_plan():
+    from constants import TRACK_TOTAL_DISTANCE
+    random.seed(0)
+    return lambda: _generate_plan(TRACK_TOTAL_DISTANCE)
+
+
+def _register_visible_sprites(total_distance):
+    @register(f'path.update_visible_sprites[{total_distance}]', number=200)
+    def bench_visible_sprites():
+        _ensure_display()
+        from constants import HORSE_SHADOW_MAX_Y_FRAC, SKY_PROPORTION
+        from controls import Controls
+        from path import Path
+        from race_controller import RaceController
+        random.seed(0)
+        plan = _generate_plan(total_distance)
+        path = Path(0, 384, 1024, Controls(0, 0, 0), RaceController(), plan)
+        ground_y = path.top_y + int((path.bottom_y - path.top_y) * SKY_PROPORTION)
+        horse_y = path.top_y + int((path.bottom_y - path.top_y) * HORSE_SHADOW_MAX_Y_FRAC)
+
+        def run():
+            # Проезжаем трассу со скоростью галопа, по кругу
+            path.traveled_distance = (path.traveled_distance + 380 / 60) % total_distance
+            path._update_visible_sprites(ground_y, horse_y, 1 / 60)
+        return run
+
+
+for _distance in (10000, 50000, 200000):
+    _register_visible_sprites(_distance)
+
+
+@register('color_utils.adjust_hue_saturation', repeat=3)
+def bench_adjust_hue_saturation():
+    _ensure_display()
+    import asset_cache
+    from color_utils import adjust_hue_saturation
+    frames = asset_cache.load_frames('assets/horse/gallop')[:3]
+
+    def run():
+        for frame in frames:
+            adjust_hue_saturation(frame, [(191, 70, 18), (223, 122, 66)],
+                                  hue_shift=90, h_tolerance=15, s_tolerance=0.24, v_tolerance=0.26)
+    return run
+
+
+@register('horse.construct[cold]', repeat=3)
+def bench_horse_cold():
+    _ensure_display()
+    from horse import Horse
+
+    def run():
+        _clear_asset_caches()
+        Horse((100, 700))
+    return run
+
+
+@register('horse.construct[cold,tinted]', repeat=1)
+def bench_horse_cold_tinted():
+    _ensure_display()
+    from horse import Horse
+
+    def run():
+        _clear_asset_caches()
+        Horse((100, 700), jacket_color_shift=90)
+    return run
+
+
+@register('horse.construct[warm]', number=100)
+def bench_horse_warm():
+    _ensure_display()
+    from horse import Horse
+    Horse((100, 700))
+    return lambda: Horse((100, 700))
+
+
+@register('horse.update', number=10000)
+def bench_horse_update():
+    _ensure_display()
+    from horse import Horse
+    horse = Horse((100, 700))
+    horse.accelerate()
+    return lambda: horse.update(1 / 60)
+
+
+def _register_collide_barrier(mode):
+    @register(f'horse.collide_barrier[{mode}]', number=1000)
+    def bench_collide_barrier():
+        """Худший случай для масок: прямоугольники пересекаются на каждом кадре галопа"""
+        _ensure_display()
+        from barrier import Barrier
+        from horse import Horse
+        from horse_states import GALLOP
+        random.seed(0)
+        horse = Horse((100, 700))
+        while horse.current_animation != GALLOP:
+            horse.accelerate()
+            for _ in range(60):
+                horse.update(1 / 60)
+        barrier = Barrier((horse.rect.centerx, 700))
+        collide = horse.collide_barrier_mask if mode == 'mask' else horse.collide_barrier
+        animation = horse.animations[GALLOP]
+
+        def run():
+            animation.current_frame = (animation.current_frame + 1) % len(animation.frames)
+            collide(barrier)
+        return run
+
+
+for _mode in ('rect', 'mask'):
+    _register_collide_barrier(_mode)
+
+
+@register('game.frame[2 lanes]', number=100)
+def bench_game_frame():
+    random.seed(0)
+    game = _galloping_game()
+
+    def run():
+        game.dt = game.clock.tick(60)
+        game.frame(())
+    return run
+
+
+def _sample_result(rng):
+    from results import LaneResult, RaceResult
+    winner = rng.randrange(-1, 2)
+    return RaceResult(started_at=time.time() - rng.uniform(0, 30 * 86400),
+                      duration_sec=rng.uniform(40.0, 120.0) if winner >= 0 else None,
+                      winner_lane=winner, seed=rng.getrandbits(32),
+                      lanes=tuple(LaneResult(shift, rng.randrange(4), rng.uniform(0, 10000)) for shift in (90, 0)))
+
+
+@register('game.frame[2 lanes, results writes]', number=100)
+def bench_game_frame_results():
+    """Кадр игры, пока фоновый поток пишет 20 заездов на каждый кадр (тысячи заездов за прогон);
+    сравнивать с game.frame[2 lanes]"""
+    import tempfile
+    random.seed(0)
+    folder = tempfile.mkdtemp()
+    game = _galloping_game(results_db=os.path.join(folder, 'results.sqlite3'))
+    rng = random.Random(1)
+    # Результаты готовятся заранее: замеряется кадр и постановка в очередь, а не генерация данных
+    samples = [_sample_result(rng) for _ in range(2000)]
+    batches = [samples[i:i + 20] for i in range(0, len(samples), 20)]
+    index = 0
+
+    def run():
+        nonlocal index
+        for result in batches[index % len(batches)]:
+            game.results.record(result)
+        index += 1
+        game.dt = game.clock.tick(60)
+        game.frame(())
+    return run
+
+
+@register('results.leaderboard[10000 races]', number=20)
+def bench_results_leaderboard():
+    import tempfile
+    from results import ResultsStore
+    store = ResultsStore(os.path.join(tempfile.mkdtemp(), 'results.sqlite3'))
+    rng = random.Random(1)
+    for _ in range(10000):
+        store.record(_sample_result(rng))
+    store.close()
+    return lambda: (store.leaderboard(10), store.daily_stats())
+
+
+def _register_lanes_frame(count):
+    @register(f'lanes.frame[{count}]', number=100)
+    def bench_lanes_frame():
+        import main
+        from lanes import LaneConfig
+        random.seed(0)
+        # Один цвет жокея на всех: замеряется стоимость дорожки, а не тонировка
+        configs = [LaneConfig(config.controls, 0) for config in main.default_lane_configs(count)]
+        game = _galloping_game(configs)
+
+        def run():
+            game.dt = game.clock.tick(60)
+            game.frame(())
+        return run
+
+
+for _count in (2, 4, 8):
+    _register_lanes_frame(_count)
+
+
+def palette_report():
+    """Загрузка и память кадров лошадей: тонированные копии против 8-битных кадров с палитрами"""
+    _ensure_display()
+    import asset_cache
+    from horse import Horse
+    mb = 1024 * 1024
+    default_mode = Horse.use_palette
+    print(f"{'mode':8s} {'colours':>7s} {'load s':>8s} {'horse frames MB':>16s} {'total MB':>9s}")
+    try:
+        for use_palette in (False, True):
+            for count in (2, 8, 32):
+                _clear_asset_caches()
+                Horse.use_palette = use_palette
+                start = time.perf_counter()
+                for i in range(count):
+                    Horse((100, 700), jacket_color_shift=i * 360 / count)
+                elapsed = time.perf_counter() - start
+                report = asset_cache.memory_report()
+                frames_bytes = sum(frame_set['bytes'] for frame_set in report['frame_sets'].values())
+                if use_palette:
+                    frames_bytes += count * 256 * 4
+                print(f"{'palette' if use_palette else 'tinted':8s} {count:7d} {elapsed:8.2f} "
+                      f"{frames_bytes / mb:16.1f} {report['total_bytes'] / mb:9.1f}")
+    finally:
+        Horse.use_palette = default_mode
+        _clear_asset_caches()
+
+
+def run_benchmarks(selected):
+    results = {}
+    for name, (setup, number, repeat) in _BENCHMARKS.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        fn = setup()
+        fn()  # прогрев
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - start) / number * 1000.0)
+        results[name] = {
+            'median_ms': statistics.median(samples),
+            'min_ms': min(samples),
+            'mean_ms': statistics.fmean(samples),
+            'number': number,
+            'repeat': repeat,
+        }
+        print(f"{name:45s} median {results[name]['median_ms']:10.4f} ms   min {results[name]['min_ms']:10.4f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Печатает сравнение с базовым прогоном; возвращает список регрессий"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:45s} (нет в базовом прогоне)")
+            continue
+        ratio = result['median_ms'] / base['median_ms'] if base['median_ms'] > 0 else float('inf')
+        flag = ''
+        if ratio > 1.0 + threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1.0 - threshold:
+            flag = 'faster'
+        print(f"{name:45s} {base['median_ms']:10.4f} -> {result['median_ms']:10.4f} ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарки горячих участков игры')
+    parser.add_argument('--only', nargs='*', default=[], help='подстроки имен бенчмарков')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, default=None)
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, default=None)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='допустимый относительный рост медианы (0.15 = 15%%)')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='загрузить лошадей для дорожек по умолчанию и напечатать отчет о памяти')
+    parser.add_argument('--palette-report', action='store_true',
+                        help='сравнить тонированные кадры и палитры для 2, 8 и 32 цветов жокея')
+    args = parser.parse_args(argv)
+
+    if args.palette_report:
+        palette_report()
+        return 0
+
+    if args.memory_report:
+        _ensure_display()
+        import asset_cache
+        import main as game_main
+        from horse import Horse
+        for config in game_main.default_lane_configs():
+            Horse((100, 700), jacket_color_shift=config.jacket_color_shift)
+        asset_cache.print_memory_report()
+        return 0
+
+    results = run_benchmarks(args.only)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Регрессии: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Боты-соперники в отдельном процессе.
+
+Игра каждый кадр пишет снимок состояния дорожек ботов (позиция, скорость, состояние
+анимации, расстояния до ближайших барьеров плана) в общую память, процесс бота
+читает его прямо из нее (numpy-представление буфера, без копий) и пишет обратно
+намерение — какие клавиши нажать. Обе записи защищены seqlock: писатель делает
+счетчик нечетным, пишет поля и делает его четным; читатель повторяет чтение,
+если счетчик нечетный или изменился за время чтения. Игра никогда не ждет бота:
+недописанное или запоздавшее намерение просто берется в следующем кадре.
+
+Нажатия бота приходят в игру как обычные KEYDOWN с клавишами его дорожки
+(см. Game.frame), поэтому проходят через Path.handle_event и попадают в запись заезда.
+Процесс бота не импортирует pygame: решения — только по таблицам horse_states.
+"""
+import math
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import horse_states
+from horse_states import GALLOP
+
+# Биты намерения
+KEY_RIGHT = 1
+KEY_LEFT = 2
+KEY_JUMP = 4
+
+_HEADER = np.dtype([
+    ('stop', 'u1'),
+])
+
+_SLOT = np.dtype([
+    # Снимок игры (пишет игра)
+    ('seq', '<u4'),             # seqlock снимка
+    ('frame', '<u4'),
+    ('racing', 'u1'),           # идет заезд (не отсчет и без победителя)
+    ('state', 'u1'),            # AnimState
+    ('facing_right', 'u1'),
+    ('speed', '<f8'),           # пикселей в секунду
+    ('gallop_speed_factor', '<f8'),
+    ('applied', '<u4'),         # номер последнего взятого игрой намерения
+    # Геометрия прыжка: когда лошадь в воздухе и какая часть кадра сбивает барьер
+    ('takeoff_sec', '<f8'),
+    ('landing_sec', '<f8'),
+    ('zone_left', '<f8'),       # от левого края кадра лошади, пиксели
+    ('zone_right', '<f8'),
+    ('barrier_width', '<f8'),
+    ('gaps', '<f8', (4,)),      # от лошади до ближайших барьеров впереди, пиксели; NaN — нет
+    # Намерение (пишет бот)
+    ('intent_seq', '<u4'),      # seqlock намерения
+    ('intent_id', '<u4'),
+    ('intent_keys', 'u1'),
+])
+
+LOOKAHEAD = _SLOT['gaps'].shape[0]
+
+
+def _views(buffer, lane_count):
+    """Заголовок и поля дорожек как numpy-представления общей памяти: slots['speed'][lane] и т.д."""
+    header = np.ndarray((), dtype=_HEADER, buffer=buffer)
+    slots = np.ndarray((lane_count,), dtype=_SLOT, buffer=buffer, offset=_HEADER.itemsize)
+    return header, {name: slots[name] for name in _SLOT.names}
+
+
+def jump_gap(speed, takeoff_sec, landing_sec, zone_left, zone_right, barrier_width):
+    """Расстояние до барьера, на котором надо прыгать (середина окна, в котором барьер
+    проходит зону столкновения, пока лошадь в воздухе), или None, если окна нет"""
+    # Барьер еще не дошел до зоны к отрыву и уже прошел ее к приземлению
+    earliest = zone_right + speed * takeoff_sec
+    latest = zone_left - barrier_width + speed * landing_sec
+    if latest <= earliest:
+        return None
+    return (earliest + latest) / 2
+
+
+def decide(state, facing_right, speed, gallop_speed_factor, gaps, takeoff_sec, landing_sec,
+           zone_left, zone_right, barrier_width, target_gallop_factor):
+    """Намерение бота для одного снимка (биты KEY_*)"""
+    # Ближайший барьер, еще не прошедший зону столкновения
+    gap = next((g for g in gaps if g + barrier_width > zone_left), math.nan)
+    if not facing_right:
+        # «Вправо» при взгляде влево — торможение, из покоя — разворот
+        return KEY_RIGHT
+    if not horse_states.CAN_JUMP[state] and not horse_states.IS_IDLE[state]:
+        # Прыжок, падение, разгон, разворот: ждем окончания анимации
+        return 0
+    if horse_states.CAN_JUMP[state] and not math.isnan(gap):
+        jump_at = jump_gap(speed, takeoff_sec, landing_sec, zone_left, zone_right, barrier_width)
+        if jump_at is not None and gap <= jump_at:
+            return KEY_JUMP
+    if state != GALLOP or gallop_speed_factor < target_gallop_factor - 1e-6:
+        return KEY_RIGHT
+    return 0
+
+
+def _bot_main(shm_name, lane_count, target_gallop_factor, poll_sec):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    header, fields = _views(shm.buf, lane_count)
+    seq = fields['seq']
+    intent_seq = fields['intent_seq']
+    last_frame = [-1] * lane_count
+    sent = [0] * lane_count
+    try:
+        while not header['stop']:
+            for lane in range(lane_count):
+                start = int(seq[lane])
+                if start & 1:
+                    continue  # игра пишет снимок — прочтем на следующем круге
+                frame = int(fields['frame'][lane])
+                if frame == last_frame[lane] or int(fields['applied'][lane]) != sent[lane]:
+                    # Нового снимка нет или игра еще не взяла прошлое намерение
+                    continue
+                racing = bool(fields['racing'][lane])
+                keys = decide(int(fields['state'][lane]), bool(fields['facing_right'][lane]),
+                              float(fields['speed'][lane]), float(fields['gallop_speed_factor'][lane]),
+                              fields['gaps'][lane].tolist(), float(fields['takeoff_sec'][lane]),
+                              float(fields['landing_sec'][lane]), float(fields['zone_left'][lane]),
+                              float(fields['zone_right'][lane]), float(fields['barrier_width'][lane]),
+                              target_gallop_factor)
+                if int(seq[lane]) != start:
+                    continue  # снимок переписан во время чтения
+                last_frame[lane] = frame
+                if not racing or not keys:
+                    continue
+                sent[lane] += 1
+                intent_seq[lane] += 1
+                fields['intent_id'][lane] = sent[lane]
+                fields['intent_keys'][lane] = keys
+                intent_seq[lane] += 1
+            time.sleep(poll_sec)
+    finally:
+        del header, fields, seq, intent_seq
+        shm.close()
+
+
+class BotHost:
+    """Сторона игры: общая память, процесс ботов, публикация снимков и прием нажатий"""
+
+    def __init__(self, lanes, target_gallop_factor, poll_sec):
+        self.lanes = list(lanes)  # номера дорожек под управлением ботов
+        size = _HEADER.itemsize + _SLOT.itemsize * len(self.lanes)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._header, self._fields = _views(self._shm.buf, len(self.lanes))
+        self._fields['gaps'][:] = np.nan
+        self._frame = 0
+        self._taken = [0] * len(self.lanes)
+        # spawn: процесс ботов не наследует окно, потоки и соединения игры
+        context = multiprocessing.get_context('spawn')
+        self._process = context.Process(target=_bot_main, name='bots', daemon=True,
+                                        args=(self._shm.name, len(self.lanes), target_gallop_factor, poll_sec))
+        self._process.start()
+
+    def publish(self, paths, racing, takeoff_sec, landing_sec, zone_left, zone_right, barrier_width):
+        """Пишет снимки дорожек ботов под seqlock; бот игру никогда не блокирует"""
+        self._frame += 1
+        fields = self._fields
+        seq = fields['seq']
+        for index, lane in enumerate(self.lanes):
+            horse = paths[lane].horse
+            gaps = paths[lane].barrier_gaps(LOOKAHEAD)
+            seq[index] += 1
+            fields['frame'][index] = self._frame
+            fields['racing'][index] = racing
+            fields['state'][index] = horse.current_animation
+            fields['facing_right'][index] = horse.facing_right
+            fields['speed'][index] = horse.get_speed()
+            fields['gallop_speed_factor'][index] = horse.gallop_speed_factor
+            fields['takeoff_sec'][index] = takeoff_sec
+            fields['landing_sec'][index] = landing_sec
+            fields['zone_left'][index] = zone_left
+            fields['zone_right'][index] = zone_right
+            fields['barrier_width'][index] = barrier_width
+            row = fields['gaps'][index]
+            row[:] = np.nan
+            row[:len(gaps)] = gaps
+            seq[index] += 1
+
+    def take_presses(self, lane_configs):
+        """Клавиши, нажатые ботами с прошлого кадра; недописанное намерение ждет следующего кадра"""
+        fields = self._fields
+        keys = []
+        for index, lane in enumerate(self.lanes):
+            start = int(fields['intent_seq'][index])
+            if start & 1:
+                continue
+            intent_id = int(fields['intent_id'][index])
+            bits = int(fields['intent_keys'][index])
+            if int(fields['intent_seq'][index]) != start or intent_id == self._taken[index]:
+                continue
+            self._taken[index] = intent_id
+            fields['applied'][index] = intent_id
+            controls = lane_configs[lane].controls
+            if bits & KEY_RIGHT:
+                keys.append(controls.right)
+            if bits & KEY_LEFT:
+                keys.append(controls.left)
+            if bits & KEY_JUMP:
+                keys.append(controls.up)
+        return keys
+
+    def close(self):
+        self._header['stop'] = 1
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        del self._header, self._fields
+        self._shm.close()
+        self._shm.unlink()
@@ -0,0 +1,102 @@
+"""Запись кадров игры в последовательность PNG (ролики для attract-режима, спорные заезды).
+
+В кадре FrameCapture.capture() только копирует буфер пикселей экрана (Surface.get_buffer,
+без преобразования формата) в свободный слот кольца в общей памяти и передает номер
+слота процессу-кодировщику. Кодировщик — отдельный процесс: сохранение PNG держит GIL,
+и в потоке оно останавливало бы игру. Он переводит пиксели в RGB по маскам экрана,
+пишет PNG и возвращает слот в кольцо. Нет свободного слота — кадр пропускается
+(drop=True, по умолчанию) или запись ждет кодировщик (drop=False, для офлайн-записи
+из replay.py). Имена файлов — номера кадров игры, поэтому пропуски видны по дыркам в номерах.
+
+    python replay.py recordings/race.hrr --capture captures
+"""
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def _encode_main(shm_name, slots, size, pitch, masks, shifts, directory, todo, free):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+
+    width, height = size
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slots, height, pitch), dtype=np.uint8, buffer=shm.buf)
+    rgb = np.empty((height, width, 3), dtype=np.uint8)
+    try:
+        while True:
+            item = todo.get()
+            if item is None:
+                return
+            slot, frame = item
+            pixels = frames[slot, :, :width * 4].view('<u4')
+            for channel in range(3):
+                rgb[:, :, channel] = (pixels & masks[channel]) >> shifts[channel]
+            free.put(slot)
+            path = os.path.join(directory, f'frame_{frame:06d}.png')
+            try:
+                pygame.image.save(pygame.image.frombuffer(rgb, size, 'RGB'), path)
+            except (pygame.error, OSError) as e:
+                print(f"Error writing capture frame {path}: {e}")
+    finally:
+        del frames
+        shm.close()
+
+
+class FrameCapture:
+    def __init__(self, surface, directory, slots, every=1, drop=True):
+        self.every = every
+        self.drop = drop
+        self.directory = os.path.join(directory, time.strftime('clip_%Y%m%d_%H%M%S'))
+        self.frame = 0
+        self.captured = 0
+        self.dropped = 0
+        self._process = None
+        if surface.get_bytesize() != 4:
+            print(f"Capture disabled: {surface.get_bitsize()}-bit screen, 32-bit expected")
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        height, pitch = surface.get_height(), surface.get_pitch()
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * height * pitch)
+        self._frames = np.ndarray((slots, height * pitch), dtype=np.uint8, buffer=self._shm.buf)
+        context = multiprocessing.get_context('spawn')
+        self._todo = context.Queue()
+        self._free = context.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._process = context.Process(target=_encode_main, name='capture', daemon=True, args=(
+            self._shm.name, slots, surface.get_size(), pitch, surface.get_masks()[:3], surface.get_shifts()[:3],
+            self.directory, self._todo, self._free))
+        self._process.start()
+
+    def capture(self, surface):
+        """Копия кадра в кольцо (один memcpy буфера экрана); вызывать до flip"""
+        self.frame += 1
+        if self._process is None or (self.frame - 1) % self.every:
+            return
+        try:
+            slot = self._free.get_nowait() if self.drop else self._free.get()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        buffer = surface.get_buffer()
+        np.copyto(self._frames[slot], np.frombuffer(buffer, dtype=np.uint8))
+        del buffer  # снимает блокировку поверхности до flip
+        self._todo.put((slot, self.frame))
+        self.captured += 1
+
+    def close(self):
+        """Дожидается записи кадров из очереди и останавливает кодировщик"""
+        if self._process is None:
+            return
+        self._todo.put(None)
+        self._process.join()
+        self._process = None
+        del self._frames
+        self._shm.close()
+        self._shm.unlink()
+        print(f"Capture {self.directory}: {self.captured} frames written, {self.dropped} dropped")
@@ -22,47 +22,16 @@ def adjust_hue_saturation(surface, color_range, hue_shift=0, saturation_scale=1.
     # Создаем копию массива пикселей
     pixel_array = pygame.surfarray.pixels3d(surface).copy()
     has_alpha = surface.get_bytesize() == 4
-    
-    if has_alpha:
-        alpha_array = pygame.surfarray.pixels_alpha(surface).copy()
-    
-    # Находим все пиксели в начальном диапазоне color_range (в RGB)
-    start_pixels_mask = find_pixels_in_color_range(pixel_array, color_range, has_alpha, alpha_array)
-    
-    if not np.any(start_pixels_mask):
+    alpha_array = pygame.surfarray.pixels_alpha(surface).copy() if has_alpha else None
+
+    region_mask = find_hsv_region(pixel_array, alpha_array, color_range,
+                                  h_tolerance, s_tolerance, v_tolerance, connectivity)
+    if region_mask is None:
         # print("Не найдено пикселей в начальном диапазоне цветов")
         return surface
     
-    # Вычисляем средние HSV компоненты начальных пикселей
-    start_pixels = pixel_array[start_pixels_mask]
-    start_pixels_float = start_pixels.astype(np.float32) / 255.0
-    start_hsv = rgb_to_hsv_vectorized(start_pixels_float)
-    
-    avg_hue = np.mean(start_hsv[:, 0])
-    avg_saturation = np.mean(start_hsv[:, 1])
-    avg_value = np.mean(start_hsv[:, 2])
-    
-    # print(f"Средние HSV начальных пикселей:")
-    # print(f"  Hue: {avg_hue:.1f}°")
-    # print(f"  Saturation: {avg_saturation:.3f}")
-    # print(f"  Value: {avg_value:.3f}")
-    
-    # Выращиваем область по схожести всех трех HSV компонент
-    region_mask = grow_region_by_hsv(
-        pixel_array, start_pixels_mask, avg_hue, avg_saturation, avg_value,
-        h_tolerance, s_tolerance, v_tolerance, has_alpha, alpha_array, connectivity
-    )
-    
     # Если нашли область для обработки
     if np.any(region_mask):
-        region_size = np.sum(region_mask)
-        start_pixels_count = np.sum(start_pixels_mask)
-        added_pixels_count = region_size - start_pixels_count
-        
-        # print(f"Начальных пикселей: {start_pixels_count}")
-        # print(f"Добавленных пикселей: {added_pixels_count}")
-        # print(f"Всего обработано: {region_size} пикселей")
-        
         # Конвертируем в float для вычислений
         pixel_array_float = pixel_array.astype(np.float32) / 255.0
         
@@ -95,6 +64,33 @@ def adjust_hue_saturation(surface, color_range, hue_shift=0, saturation_scale=1.
     
     return new_surface
 
+def find_hsv_region(pixel_array, alpha_array, color_range, h_tolerance, s_tolerance, v_tolerance, connectivity=8):
+    """
+    Маска области, выращенной от пикселей из color_range по схожести HSV
+    (None, если начальных пикселей нет). alpha_array — None для поверхностей без альфы.
+    """
+    has_alpha = alpha_array is not None
+    # Находим все пиксели в начальном диапазоне color_range (в RGB)
+    start_pixels_mask = find_pixels_in_color_range(pixel_array, color_range, has_alpha, alpha_array)
+    
+    if not np.any(start_pixels_mask):
+        return None
+    
+    # Вычисляем средние HSV компоненты начальных пикселей
+    start_pixels = pixel_array[start_pixels_mask]
+    start_pixels_float = start_pixels.astype(np.float32) / 255.0
+    start_hsv = rgb_to_hsv_vectorized(start_pixels_float)
+    
+    avg_hue = np.mean(start_hsv[:, 0])
+    avg_saturation = np.mean(start_hsv[:, 1])
+    avg_value = np.mean(start_hsv[:, 2])
+    
+    # Выращиваем область по схожести всех трех HSV компонент
+    return grow_region_by_hsv(
+        pixel_array, start_pixels_mask, avg_hue, avg_saturation, avg_value,
+        h_tolerance, s_tolerance, v_tolerance, has_alpha, alpha_array, connectivity
+    )
+
 def grow_region_by_hsv(pixel_array, start_pixels_mask, target_hue, target_saturation, target_value,
                       h_tolerance, s_tolerance, v_tolerance, has_alpha, alpha_array=None, connectivity=8):
     """
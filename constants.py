@@ -18,6 +18,11 @@ GRASS_MIN_SPAWN_DISTANCE = 500
 GRASS_MAX_SPAWN_DISTANCE = 800
 GRASS_MIN_Y_FRAC = 0.65
 GRASS_MAX_Y_FRAC = 0.99
+# Трава запекается в куски (см. grass.py): длина куска по трассе, число полос перспективы по y_frac
+# и сколько кусков держит общий LRU
+GRASS_CHUNK_DISTANCE = 2048
+GRASS_CHUNK_BANDS = 6
+GRASS_CHUNK_CACHE = 192
 
 HORSE_Y_FRAC = 0.9
 
@@ -30,7 +35,96 @@ TRACK_TOTAL_DISTANCE = 50000
 
 HORSE_MARGIN_RIGHT = 200
 HORSE_MARGIN_LEFT = 200
+# Столкновение с барьером по маскам кадров (pygame.mask); False — по прямоугольникам с отступами выше
+PIXEL_COLLISION = True
 
 AUTO_GAME_RESTART_SEC = 10
 
+# Количество дорожек (до 8, раскладки клавиш — в main.LANE_LAYOUTS)
+LANE_COUNT = 2
+# Сколько нижних дорожек ведут боты в отдельном процессе (см. bot.py)
+BOT_LANE_COUNT = 0
+# Бот разгоняет галоп до этого множителя скорости и опрашивает общую память с этим периодом
+BOT_TARGET_GALLOP_FACTOR = 1.3
+BOT_POLL_SEC = 0.002
+
+# Отсечение спрайтов трассы по экранному x (см. Path._update_visible_sprites): спрайт создается
+# в OFFSCREEN_MARGIN пикселей от края экрана (и еще CULL_PREFETCH_PX впереди по ходу движения),
+# а удаляется только на CULL_HYSTERESIS_PX дальше, чтобы не пересоздаваться у края
 OFFSCREEN_MARGIN = 64
+CULL_PREFETCH_PX = 256
+CULL_HYSTERESIS_PX = 128
+
+# Замер задержки ввода (нажатие -> flip) по дорожкам, отчет сохраняется при выходе
+LATENCY_INSTRUMENTATION = False
+LATENCY_HISTOGRAM_MAX_MS = 250
+
+# Цикл с поздним опросом ввода: ожидание перед опросом, а не после flip
+LOW_LATENCY_LOOP = False
+LOW_LATENCY_MARGIN_SEC = 0.002
+
+# Профилирование кадра: кольцевой буфер замеров, оверлей по F3, экспорт CSV/JSON при выходе
+PROFILING = False
+PROFILE_CAPACITY = 3600
+
+# Граница памяти под спрайты: при превышении после загрузки печатается отчет asset_cache
+SPRITE_MEMORY_BUDGET_MB = 1024
+
+# Запись заездов (seed, план, нажатия) для воспроизведения, см. replay.py
+RECORD_RACES = False
+RECORDINGS_DIR = 'recordings'
+# Предел dt кадра при записи (dt хранится одним байтом в миллисекундах)
+MAX_FRAME_DT_MS = 255
+
+# Сетевой заезд двух автоматов по UDP, см. netcode.py: NET_ROLE = 'host' или 'join' (None — без сети)
+NET_ROLE = None
+NET_LOCAL_PORT = 47001
+NET_PEER_ADDR = ('127.0.0.1', 47002)
+# Дорожка соперника рисуется с задержкой, чтобы было между какими снимками интерполировать
+NET_INTERP_DELAY_SEC = 0.1
+NET_SNAPSHOT_EVERY = 2
+# Имитация плохой сети (доля потерь, задержка и джиттер в секундах)
+NET_SIM_LOSS = 0.0
+NET_SIM_LATENCY_SEC = 0.0
+NET_SIM_JITTER_SEC = 0.0
+
+# Результаты заездов в SQLite (см. results.py); None — не сохранять
+RESULTS_DB = 'results.sqlite3'
+RESULTS_BATCH_SIZE = 64
+RESULTS_FLUSH_SEC = 1.0
+
+# Бандл декодированных картинок assets/ (python asset_bundle.py build), открывается через mmap;
+# если файла нет — PNG с диска. После изменения картинок бандл надо пересобрать
+ASSET_BUNDLE = 'assets.bundle'
+
+# Горячая перезагрузка измененных PNG из assets без перезапуска игры (см. hot_reload.py)
+HOT_RELOAD = False
+HOT_RELOAD_INTERVAL_SEC = 0.5
+
+# Кадры лошади в 8-битной общей палитре: цвет жокея — своя палитра, а не тонированная копия кадров
+# (прозрачность через colorkey, см. indexed_frames.py)
+HORSE_PALETTE_MODE = False
+# Кадры лошади обрезаются по общей рамке непрозрачных пикселей каждой анимации (см. Horse.trim_frames)
+TRIM_HORSE_FRAMES = True
+JACKET_PALETTE_SIZE = 64
+
+# Телеметрия (см. telemetry.py): покадровые трассы дорожек в кольце numpy-блоков, файл .npz на заезд
+TELEMETRY = False
+TELEMETRY_DIR = 'telemetry'
+TELEMETRY_BLOCK_FRAMES = 600
+TELEMETRY_BLOCKS = 8
+
+# Запись кадров в PNG (см. capture.py): слотов в кольце общей памяти и каждый какой кадр писать;
+# кадры сверх кольца пропускаются, игра кодировщик не ждет
+CAPTURE = False
+CAPTURE_DIR = 'captures'
+CAPTURE_SLOTS = 8
+CAPTURE_EVERY = 1
+
+# Адаптивное качество (см. quality.py): бюджет времени работы кадра и окно усреднения
+ADAPTIVE_QUALITY = True
+QUALITY_BUDGET_MS = 14.0
+QUALITY_WINDOW_FRAMES = 30
+# Подъем качества — после стольких окон подряд со средним ниже этой доли бюджета
+QUALITY_UP_FRACTION = 0.6
+QUALITY_UP_WINDOWS = 4
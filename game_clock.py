@@ -0,0 +1,79 @@
+import time
+from abc import ABC, abstractmethod
+
+import pygame
+
+from constants import MAX_FRAME_DT_MS
+
+
+class GameClock(ABC):
+    """Время симуляции. Все игровые таймеры (отсчет, idle, авто-рестарт) читают now(),
+    а кадр получает dt из tick(), поэтому время можно ускорять, останавливать
+    и шагать вручную."""
+
+    def __init__(self):
+        self._time = 0.0
+        self.paused = False
+        # Округлять dt до целых миллисекунд (не больше MAX_FRAME_DT_MS) — так dt
+        # каждого кадра записывается в replay одним байтом и воспроизводится точно
+        self.quantize_ms = False
+
+    def now(self):
+        return self._time
+
+    def set_time(self, t):
+        self._time = t
+
+    def tick(self, fps):
+        """Ждет следующий кадр и возвращает dt симуляции в секундах"""
+        dt = self._frame_dt(fps)
+        if self.paused:
+            return 0.0
+        if self.quantize_ms:
+            dt = min(round(dt * 1000.0), MAX_FRAME_DT_MS) / 1000.0
+        self._time += dt
+        return dt
+
+    def advance(self, dt):
+        self._time += dt
+
+    @abstractmethod
+    def _frame_dt(self, fps):
+        """dt кадра до паузы и квантования, в секундах"""
+
+
+class RealTimeClock(GameClock):
+    """Реальное время: темп кадров задает pygame.time.Clock, dt умножается на scale
+    (scale=10 — в 10 раз быстрее, scale=0.5 — вдвое медленнее)"""
+
+    def __init__(self, scale=1.0):
+        super().__init__()
+        self.scale = scale
+        self._pygame_clock = pygame.time.Clock()
+
+    def _frame_dt(self, fps):
+        return self._pygame_clock.tick(fps) / 1000.0 * self.scale
+
+
+class ManualClock(GameClock):
+    """Время двигается только вызовами tick()/advance(), без ожидания:
+    каждый tick() — ровно step секунд (для тестов и быстрой симуляции)"""
+
+    def __init__(self, step=None):
+        super().__init__()
+        self.step = step
+
+    def _frame_dt(self, fps):
+        if self.step is not None:
+            return self.step
+        return 1.0 / fps if fps else 0.0
+
+
+class SystemClock:
+    """Настенные часы (time.time) для объектов, созданных без часов игры"""
+
+    def now(self):
+        return time.time()
+
+
+SYSTEM_CLOCK = SystemClock()
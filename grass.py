@@ -1,35 +1,162 @@
+"""Декоративная трава, запеченная в куски.
+
+Трава плана раскладывается по GRASS_CHUNK_BANDS полосам y_frac (в каждой полосе
+свой коэффициент перспективы, т.е. своя скорость прокрутки) и по кускам трассы
+длиной GRASS_CHUNK_DISTANCE. Кусок — одна поверхность с RLE по плотной рамке его
+пучков травы; кадр рисует несколько кусков вместо спрайта на каждый пучок.
+Полосы не пересекают линию лошади: каждая целиком позади нее или перед ней,
+и Path ставит куски полосы в свой список отрисовки по глубине.
+Куски запекаются лениво (видимые и следующий по ходу движения) и хранятся
+в общем LRU на GRASS_CHUNK_CACHE кусков: оставшиеся позади вытесняются сами.
+"""
+import bisect
 import os
-import glob
-import random
+from collections import OrderedDict
+
 import pygame
 
+import asset_cache
+from constants import GRASS_CHUNK_BANDS, GRASS_CHUNK_CACHE, GRASS_CHUNK_DISTANCE, GRASS_MAX_Y_FRAC, GRASS_MIN_Y_FRAC, \
+    HORSE_OFFSET_X, HORSE_SHADOW_MAX_Y_FRAC, HORSE_SHADOW_MIN_Y_FRAC, SKY_PROPORTION
 
-class Grass(pygame.sprite.Sprite):
-    def __init__(self, position):
-        super().__init__()
-        
-        image_path = self._choose_random_grass_image()
-        self.image = self._load_image_with_alpha(image_path)
-        self.rect = self.image.get_rect(bottomleft=position)
-        self.pos_x = float(self.rect.x)
+GRASS_FOLDER = os.path.join('assets', 'grass')
 
-    def _choose_random_grass_image(self):
-        folder = os.path.join('assets', 'grass')
-        candidates = sorted(glob.glob(os.path.join(folder, '*.png')))
-        if not candidates:
-            return None
-        return random.choice(candidates)
+# (план, высота дорожки, пикселей на distance, полоса, номер куска, шаг прореживания) -> (поверхность | None, x, y)
+_chunks = OrderedDict()
+_images = None
+
+
+def _band_edges(count):
+    """Полосы (от, до) по y_frac: трава бывает только позади лошади и перед ней (см. TrackPlan.generate),
+    полосы делятся между этими участками пропорционально их высоте"""
+    far = (GRASS_MIN_Y_FRAC, HORSE_SHADOW_MIN_Y_FRAC)
+    near = (HORSE_SHADOW_MAX_Y_FRAC, GRASS_MAX_Y_FRAC)
+    total = (far[1] - far[0]) + (near[1] - near[0])
+    far_count = min(max(round(count * (far[1] - far[0]) / total), 1), count - 1)
+    bands = []
+    for (low, high), band_count in ((far, far_count), (near, count - far_count)):
+        step = (high - low) / band_count
+        bands.extend((low + i * step, low + (i + 1) * step) for i in range(band_count))
+    return bands
+
+
+BANDS = _band_edges(GRASS_CHUNK_BANDS)
+_BAND_LOWS = [low for low, _ in BANDS]
+
+
+def clear():
+    """Сбрасывает куски и картинки (после перезагрузки картинок травы)"""
+    global _images
+    _chunks.clear()
+    _images = None
 
-    def _load_image_with_alpha(self, image_path):
-        if image_path and os.path.exists(image_path):
+
+def _grass_images():
+    global _images
+    if _images is None:
+        images = []
+        for image_path in asset_cache.list_images(GRASS_FOLDER):
             try:
-                image = pygame.image.load(image_path)
-                return image.convert_alpha()
+                images.append(asset_cache.load_image(image_path))
             except pygame.error as e:
                 print(f"Error loading grass image {image_path}: {e}")
-        # Fallback: tiny transparent placeholder with a small green dot
-        placeholder = pygame.Surface((16, 16), pygame.SRCALPHA)
-        pygame.draw.circle(placeholder, (34, 139, 34), (8, 8), 5)
-        return placeholder
+        if not images:
+            # Fallback: tiny transparent placeholder with a small green dot
+            placeholder = pygame.Surface((16, 16), pygame.SRCALPHA)
+            pygame.draw.circle(placeholder, (34, 139, 34), (8, 8), 5)
+            images = [placeholder]
+        _images = images
+    return _images
+
+
+def is_drawn(event, stride):
+    """Прореживание по distance: набор при шаге 4 — подмножество набора при шаге 2,
+    поэтому при смене качества трава только исчезает или появляется, но не перескакивает"""
+    return int(event.distance) % stride == 0
+
 
+class GrassLayer:
+    """Трава одной дорожки: события плана разложены по полосам и кускам один раз на заезд"""
+
+    def __init__(self, plan, lane_height, pixels_per_distance):
+        self.plan = plan
+        self.lane_height = lane_height
+        self.pixels_per_distance = pixels_per_distance
+        sky_height = int(lane_height * SKY_PROPORTION)
+        horse_y = int(lane_height * HORSE_SHADOW_MAX_Y_FRAC)
+        # Пикселей экрана на единицу distance по полосам (перспектива по середине полосы,
+        # как Path._distance_to_screen_x)
+        self.band_scales = []
+        for low, high in BANDS:
+            y = (low + high) / 2 * lane_height
+            perspective = (y - sky_height) / (horse_y - sky_height) if horse_y != sky_height else 0.0
+            self.band_scales.append(pixels_per_distance * perspective)
+        # Глубина полосы для списка отрисовки Path — ее верхний край, от верха дорожки
+        self.band_depths = [int(low * lane_height) for low, _ in BANDS]
+        # Пары (кусок, позиция) по полосам, заполняются в collect() каждый кадр
+        self.band_runs = [[] for _ in BANDS]
+        self._events = {}  # (полоса, номер куска) -> события травы по возрастанию distance
+        for event in plan.grass_events:
+            band = max(bisect.bisect_right(_BAND_LOWS, event.y_frac) - 1, 0)
+            self._events.setdefault((band, int(event.distance // GRASS_CHUNK_DISTANCE)), []).append(event)
+        self.max_width = max(image.get_width() for image in _grass_images())
+        self.blits = 0  # кусков в последнем кадре
+
+    def collect(self, top_y, screen_width, traveled_distance, stride, direction):
+        """Заполняет band_runs видимыми кусками; direction > 0 — движение вправо
+        (следующий кусок готовится справа)"""
+        self.blits = 0
+        for band, scale in enumerate(self.band_scales):
+            run = self.band_runs[band]
+            run.clear()
+            if scale <= 0:
+                continue
+            # Видимы пучки с экранным x от -max_width до правого края экрана
+            first = int((traveled_distance - (HORSE_OFFSET_X + self.max_width) / scale) // GRASS_CHUNK_DISTANCE)
+            last = int((traveled_distance + (screen_width - HORSE_OFFSET_X) / scale) // GRASS_CHUNK_DISTANCE)
+            for index in range(first, last + 1):
+                chunk = self._chunk(band, index, stride)
+                if chunk is not None and chunk[0] is not None:
+                    x = HORSE_OFFSET_X + (index * GRASS_CHUNK_DISTANCE - traveled_distance) * scale
+                    run.append((chunk[0], (round(x) + chunk[1], top_y + chunk[2])))
+                    self.blits += 1
+            # Следующий кусок по ходу движения запекается заранее, пока он за краем экрана
+            self._chunk(band, last + 1 if direction > 0 else first - 1, stride)
+
+    def _chunk(self, band, index, stride):
+        if (band, index) not in self._events:
+            return None
+        key = (self.plan, self.lane_height, self.pixels_per_distance, band, index, stride)
+        chunk = _chunks.get(key)
+        if chunk is None:
+            chunk = self._bake(band, index, stride)
+            _chunks[key] = chunk
+            if len(_chunks) > GRASS_CHUNK_CACHE:
+                _chunks.popitem(last=False)
+        else:
+            _chunks.move_to_end(key)
+        return chunk
 
+    def _bake(self, band, index, stride):
+        """Запекает пучки куска в одну поверхность по их общей рамке -> (поверхность | None, x, y)"""
+        images = _grass_images()
+        scale = self.band_scales[band]
+        origin = index * GRASS_CHUNK_DISTANCE
+        placed = []
+        for event in self._events[(band, index)]:
+            if not is_drawn(event, stride):
+                continue
+            # Картинка пучка — функция события, а не random: куски можно печь в любой момент
+            image = images[hash((event.distance, event.y_frac)) % len(images)]
+            x = round((event.distance - origin) * scale)
+            placed.append((image, image.get_rect(bottomleft=(x, int(event.y_frac * self.lane_height)))))
+        if not placed:
+            return None, 0, 0
+        bounds = placed[0][1].unionall([rect for _, rect in placed[1:]])
+        chunk = pygame.Surface(bounds.size, pygame.SRCALPHA, images[0])  # формат картинок травы
+        # Пучки идут по возрастанию distance: дальний по трассе ложится поверх, как раньше у спрайтов
+        for image, rect in placed:
+            chunk.blit(image, rect.move(-bounds.x, -bounds.y))
+        # RLE: прозрачные промежутки между пучками при blit пропускаются целыми отрезками
+        chunk.set_alpha(255, pygame.RLEACCEL)
+        return chunk, bounds.x, bounds.y
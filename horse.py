@@ -1,47 +1,75 @@
 import numpy as np
 import pygame
 import random
-import time
+import asset_cache
+from game_clock import SYSTEM_CLOCK
+import horse_states
+from horse_states import AnimState, BARRIER, FALL, GALLOP, IDLE, IDLE2, IDLE3, TROT, TURN
 from color_utils import adjust_hue_saturation
-from pygame_animation import AnimationManager
-from constants import HORSE_MARGIN_LEFT, HORSE_MARGIN_RIGHT, IDLE_RANDOM_MIN_INTERVAL, IDLE_RANDOM_MAX_INTERVAL
+import indexed_frames
+from pygame_animation import Animation
+from constants import HORSE_MARGIN_LEFT, HORSE_MARGIN_RIGHT, HORSE_PALETTE_MODE, IDLE_RANDOM_MIN_INTERVAL, IDLE_RANDOM_MAX_INTERVAL, \
+    JACKET_PALETTE_SIZE, TRIM_HORSE_FRAMES
+
+# Куртка жокея: начальный диапазон цветов и допуски HSV для выращивания области
+JACKET_COLOR_RANGE = [(191, 70, 18), (223, 122, 66)]
+JACKET_H_TOLERANCE = 15
+JACKET_S_TOLERANCE = 0.24
+JACKET_V_TOLERANCE = 0.26
 
 
 class Horse(pygame.sprite.Sprite):
-    def __init__(self, position, jacket_color_shift=0):
+    # Состояние лошади хранится в слотах: атрибуты читаются каждый кадр
+    __slots__ = ('clock', 'jacket_color_shift', 'animations', 'facing_right', 'gallop_speed_factor',
+                 'current_animation', 'queued_animation', 'image', 'rect', 'image_rect',
+                 'idle_start_time', 'next_idle_change_time', 'palette')
+
+    # jacket_color_shift -> кадры анимаций по AnimState, общие для всех экземпляров
+    _frames_by_shift = {}
+    # Режим палитры: одни 8-битные кадры на все цвета, цвет жокея — палитра (см. indexed_frames)
+    use_palette = HORSE_PALETTE_MODE
+    _indexed = None  # (кадры по AnimState, базовая палитра)
+    _palettes_by_shift = {}
+    # (AnimState, номер кадра, отражен) -> pygame.mask.Mask; маска зависит только от прозрачности,
+    # поэтому одна на кадр для всех цветов жокея и для режима палитры
+    _masks = {}
+    # Верх барьера на холсте -> Horse.jump_clearance (считается по маскам один раз)
+    _clearances = {}
+    # Обрезка прозрачных полей: кадры анимации хранятся по общей рамке непрозрачных пикселей
+    # всех ее кадров. rect — по-прежнему весь холст кадра (якорь bottomleft, отступы
+    # HORSE_MARGIN_*, флаг), а картинка рисуется в image_rect — рамке внутри холста
+    trim_frames = TRIM_HORSE_FRAMES
+    _source = None  # кадры по AnimState до тонировки (обрезанные, если trim_frames)
+    _crops = None  # AnimState -> pygame.Rect рамки на холсте
+    _canvas_size = None
+
+    def __init__(self, position, jacket_color_shift=0, clock=SYSTEM_CLOCK):
         super().__init__()
         
+        self.clock = clock
         self.jacket_color_shift = jacket_color_shift
         
-        # Загрузка анимаций через AnimationManager
-        self.animations = {
-            'idle': AnimationManager.load_animation('assets/horse/idle', fps=8, loop=True),
-            'idle2': AnimationManager.load_animation('assets/horse/idle2', fps=8, loop=False),
-            'idle3': AnimationManager.load_animation('assets/horse/idle3', fps=8, loop=False),
-            'start_moving': AnimationManager.load_animation('assets/horse/start_moving', fps=10, loop=False),
-            'stop_moving': AnimationManager.load_animation('assets/horse/stop_moving', fps=16, loop=False),
-            'walk': AnimationManager.load_animation('assets/horse/walk', fps=10, loop=True),
-            'trot': AnimationManager.load_animation('assets/horse/trot', fps=14, loop=True),
-            'gallop': AnimationManager.load_animation('assets/horse/gallop', fps=25, loop=True),
-            'barrier': AnimationManager.load_animation('assets/horse/barrier', fps=50, loop=False),
-            'turn': AnimationManager.load_animation('assets/horse/turn', fps=16, loop=False),
-            'fall': AnimationManager.load_animation('assets/horse/fall', fps=16, loop=False),
-        }
+        # Кадры общие для всех лошадей с тем же цветом жокея,
+        # у каждой лошади только собственное состояние анимаций (индекс — AnimState)
+        frames = Horse._load_frames(jacket_color_shift)
+        self.palette = Horse._load_palette(jacket_color_shift) if Horse.use_palette else None
+        self.animations = [
+            Animation(frames[state], horse_states.FPS[state], horse_states.LOOP[state])
+            for state in AnimState
+        ]
         
         self.facing_right = True
         self.gallop_speed_factor = 1
 
-        self.current_animation = 'idle'
-        
-        # Применяем цветовую трансформацию к анимациям
-        if jacket_color_shift != 0:
-            self._apply_color_tint()
+        self.current_animation = IDLE
         
-        self.image = self.animations[self.current_animation].get_current_frame()
-        self.rect = self.image.get_rect(bottomleft=position)
+        self.rect = pygame.Rect((0, 0), Horse._canvas_size)
+        self.rect.bottomleft = position
+        self.image_rect = self.rect.copy()
+        self._update_image(self.animations[self.current_animation])
         
         # Переменные для случайной смены idle анимации
-        self.idle_start_time = time.time()
+        self.idle_start_time = self.clock.now()
         self.next_idle_change_time = self._get_next_idle_change_time()
         
         # Очередь для последующего переключения анимации
@@ -51,45 +79,71 @@ class Horse(pygame.sprite.Sprite):
         self.animations[self.current_animation].play()
     
     def update(self, dt):
+        animation = self.animations[self.current_animation]
         # Обновляем текущую анимацию (dt - delta time)
-        self.animations[self.current_animation].update(dt)
-
-        self.image = self.animations[self.current_animation].get_current_frame()
-        if not self.facing_right and self.current_animation != 'turn' or \
-                self.facing_right and self.current_animation == 'turn':
-            self.image = pygame.transform.flip(self.image, True, False)
+        animation.update(dt)
+        self._update_image(animation)
         
         # Если играется переходная анимация, проверяем завершение и выполняем запланированное переключение
-        if self.animations[self.current_animation].is_finished:
-            if self.queued_animation:
+        if animation.is_finished:
+            if self.queued_animation is not None:
                 next_anim = self.queued_animation
                 self.queued_animation = None
                 self.set_animation(next_anim)
             else:
-                self.set_animation('idle')
+                self.set_animation(IDLE)
         
         # Проверяем случайную смену idle анимации
         self._check_idle_random_change()
 
+    def _update_image(self, animation):
+        self.image = animation.get_current_frame()
+        crop = Horse._crops[self.current_animation]
+        if self.facing_right == (self.current_animation == TURN):
+            self.image = pygame.transform.flip(self.image, True, False)
+            # Отраженная рамка отсчитывается от правого края холста
+            x = self.rect.width - crop.right
+        else:
+            x = crop.x
+        image_rect = self.image_rect
+        image_rect.x = self.rect.x + x
+        image_rect.y = self.rect.y + crop.y
+        image_rect.size = self.image.get_size()
+
+    def apply_state(self, state, frame, facing_right, gallop_speed_factor):
+        """Выставляет состояние, полученное извне (соперник по сети), без собственной логики лошади"""
+        self.set_animation(state)
+        animation = self.animations[state]
+        animation.current_frame = min(frame, len(animation.frames) - 1)
+        self.facing_right = facing_right
+        self.gallop_speed_factor = gallop_speed_factor
+        self._update_image(animation)
+
     def draw(self, surface):
-        surface.blit(self.image, self.rect)
+        self.apply_palette()
+        surface.blit(self.image, self.image_rect)
         # pygame.draw.line(surface, (100, 100, 100), (self.rect.left + HORSE_MARGIN_RIGHT, 0), (self.rect.left + HORSE_MARGIN_RIGHT, 1000), 1)
         # pygame.draw.line(surface, (100, 100, 100), (self.rect.right - HORSE_MARGIN_LEFT, 0), (self.rect.right - HORSE_MARGIN_LEFT, 1000), 1)
 
     
-    def set_animation(self, animation_name):
-        if animation_name in self.animations and animation_name != self.current_animation:
+    def apply_palette(self):
+        """Кадры общие для всех цветов: палитра жокея ставится перед каждым blit текущего кадра"""
+        if self.palette is not None:
+            self.image.set_palette(self.palette)
+
+    def set_animation(self, state):
+        if state != self.current_animation:
             # Останавливаем текущую анимацию
             self.animations[self.current_animation].stop()
             
             # Переключаем на новую
-            self.current_animation = animation_name
-            self.animations[self.current_animation].reset()
-            self.animations[self.current_animation].play()
+            self.current_animation = state
+            self.animations[state].reset()
+            self.animations[state].play()
             
             # Если переключаемся на idle, сбрасываем таймер случайной смены
-            if animation_name == 'idle':
-                self.idle_start_time = time.time()
+            if state == IDLE:
+                self.idle_start_time = self.clock.now()
                 self.next_idle_change_time = self._get_next_idle_change_time()
     
     def _get_next_idle_change_time(self):
@@ -98,13 +152,13 @@ class Horse(pygame.sprite.Sprite):
     
     def _check_idle_random_change(self):
         """Проверяет, нужно ли сменить idle анимацию на idle2 или idle3"""
-        if self.current_animation == 'idle':
-            current_time = time.time()
+        if self.current_animation == IDLE:
+            current_time = self.clock.now()
             elapsed_time = current_time - self.idle_start_time
             
             if elapsed_time >= self.next_idle_change_time:
                 # Случайно выбираем между idle2 и idle3
-                random_animation = random.choice(['idle2', 'idle3'])
+                random_animation = random.choice((IDLE2, IDLE3))
                 self.set_animation(random_animation)
                 
                 # Сбрасываем таймер для следующей смены
@@ -112,66 +166,48 @@ class Horse(pygame.sprite.Sprite):
                 self.next_idle_change_time = self._get_next_idle_change_time()
         
         # Если текущая анимация idle2 или idle3 закончилась, возвращаемся к idle
-        elif self.current_animation in ['idle2', 'idle3']:
+        elif self.current_animation == IDLE2 or self.current_animation == IDLE3:
             if self.animations[self.current_animation].is_finished:
-                self.set_animation('idle')
+                self.set_animation(IDLE)
 
     def accelerate(self):
-        if self.current_animation in ['idle', 'idle2', 'idle3']:
-            self.queued_animation = 'walk'
-            self.set_animation('start_moving')
-        elif self.current_animation in ['walk']:
-            self.set_animation('trot')  
-        elif self.current_animation in ['trot']:
-            self.set_animation('gallop')
-        elif self.current_animation in ['gallop']:
-            self.gallop_speed_factor += 0.1
+        state = self.current_animation
+        if state == GALLOP:
+            self.gallop_speed_factor += horse_states.GALLOP_SPEED_STEP
+            return
+        transition = horse_states.ACCELERATE[state]
+        if transition is not None:
+            next_state, queued = transition
+            if queued is not None:
+                self.queued_animation = queued
+            self.set_animation(next_state)
 
     def decelerate(self):
-        if self.current_animation in ['idle', 'idle2', 'idle3']:
-            self.set_animation('turn')
-            self.facing_right = not self.facing_right
-        if self.current_animation in ['walk']:
-            self.queued_animation = 'idle'
-            self.set_animation('stop_moving')
-        elif self.current_animation in ['trot']:
-            self.set_animation('walk')
-        elif self.current_animation in ['gallop']:
+        state = self.current_animation
+        if state == GALLOP:
             if self.gallop_speed_factor > 1:
-                self.gallop_speed_factor -= 0.1
+                self.gallop_speed_factor -= horse_states.GALLOP_SPEED_STEP
             else:
-                self.set_animation('trot')
+                self.set_animation(TROT)
+            return
+        transition = horse_states.DECELERATE[state]
+        if transition is not None:
+            next_state, queued = transition
+            if queued is not None:
+                self.queued_animation = queued
+            self.set_animation(next_state)
+            # Из покоя «замедление» — это разворот
+            if next_state == TURN:
+                self.facing_right = not self.facing_right
 
     def barrier(self):
-        if self.current_animation in ['gallop', 'trot', 'walk']:
+        if horse_states.CAN_JUMP[self.current_animation]:
             self.queued_animation = self.current_animation
-            self.set_animation('barrier')
+            self.set_animation(BARRIER)
 
     def get_speed(self):
         # Пиксели в секунду для сдвига бэкграунда
-        anim = self.current_animation
-        if anim in ['gallop']:
-            return 380 * self.gallop_speed_factor
-        if anim in ['trot']:
-            return 260
-        if anim in ['walk']:
-            return 140
-        if anim in ['start_moving']:
-            return 120
-        if anim in ['stop_moving']:
-            return 80
-        if anim in ['fall']:
-            return 0
-
-        if anim in ['barrier']:
-            if self.queued_animation in ['gallop']:
-                return 380 * self.gallop_speed_factor
-            if self.queued_animation in ['trot']:
-                return 260
-            if self.queued_animation in ['walk']:
-                return 140  
-
-        return 0
+        return horse_states.speed(self.current_animation, self.queued_animation, self.gallop_speed_factor)
 
     def is_start_frame(self, limit):
         return self.animations[self.current_animation].current_frame < limit
@@ -180,30 +216,225 @@ class Horse(pygame.sprite.Sprite):
         return self.animations[self.current_animation].current_frame >= \
             len(self.animations[self.current_animation].frames) - limit
 
+    # Кадров прыжка в начале и в конце, когда лошадь у земли (см. is_near_ground)
+    NEAR_GROUND_FRAMES = 5
+
     def is_near_ground(self):
-        return self.is_start_frame(5) or self.is_end_frame(5)
+        return self.is_start_frame(self.NEAR_GROUND_FRAMES) or self.is_end_frame(self.NEAR_GROUND_FRAMES)
 
     def collide_barrier(self, barrier):
         return self.rect.right - HORSE_MARGIN_RIGHT > barrier.rect.left and \
                     self.rect.left + HORSE_MARGIN_LEFT < barrier.rect.right
 
+    def collide_barrier_mask(self, barrier):
+        """Попиксельное столкновение: сначала пересечение прямоугольников, маски — только при нем"""
+        if not self.image_rect.colliderect(barrier.rect):
+            return False
+        offset = (barrier.rect.x - self.image_rect.x, barrier.rect.y - self.image_rect.y)
+        return self.current_mask().overlap(asset_cache.get_mask(barrier.image), offset) is not None
+
+    def current_mask(self):
+        """Маска текущего кадра (с учетом отражения)"""
+        state = self.current_animation
+        return self.frame_mask(state, self.animations[state].current_frame, self.facing_right == (state == TURN))
+
+    def frame_mask(self, state, index, flipped):
+        """Маска кадра анимации; строится один раз при первом запросе"""
+        key = (state, index, flipped)
+        mask = Horse._masks.get(key)
+        if mask is None:
+            frame = self.animations[state].frames[index]
+            mask = pygame.mask.from_surface(pygame.transform.flip(frame, True, False) if flipped else frame)
+            Horse._masks[key] = mask
+        return mask
+
+    def jump_clearance(self, barrier_top):
+        """Прыжок вправо по маскам кадров для барьера с верхом на barrier_top (y на холсте):
+        (первый и последний кадры BARRIER подряд, в которых лошадь целиком выше барьера,
+        левый и правый края непрозрачных пикселей ниже barrier_top в остальных кадрах
+        прыжка и в галопе — x на холсте) или None, если лошадь не поднимается выше барьера"""
+        if barrier_top not in Horse._clearances:
+            Horse._clearances[barrier_top] = self._measure_clearance(barrier_top)
+        return Horse._clearances[barrier_top]
+
+    def _measure_clearance(self, barrier_top):
+        crops = Horse._crops
+        clear = []
+        for index in range(len(self.animations[BARRIER].frames)):
+            rects = self.frame_mask(BARRIER, index, False).get_bounding_rects()
+            clear.append(not rects or max(rect.bottom for rect in rects) + crops[BARRIER].y <= barrier_top)
+        if True not in clear:
+            return None
+        first = clear.index(True)
+        last = first
+        while last + 1 < len(clear) and clear[last + 1]:
+            last += 1
+        grounded = [(BARRIER, index) for index in range(len(clear)) if not first <= index <= last]
+        grounded += [(GALLOP, index) for index in range(len(self.animations[GALLOP].frames))]
+        left, right = self.rect.width, 0
+        for state, index in grounded:
+            mask = self.frame_mask(state, index, False)
+            band_top = max(barrier_top - crops[state].y, 0)
+            if band_top >= mask.get_size()[1]:
+                continue
+            band = pygame.mask.Mask((mask.get_size()[0], mask.get_size()[1] - band_top), fill=True)
+            for rect in mask.overlap_mask(band, (0, band_top)).get_bounding_rects():
+                left = min(left, rect.left + crops[state].x)
+                right = max(right, rect.right + crops[state].x)
+        return first, last, left, max(left, right)
+
     def passed_flag(self, flag):
         return self.rect.right - HORSE_MARGIN_RIGHT >= flag.rect.left
 
     def make_fall(self):
-        self.set_animation('fall')
+        self.set_animation(FALL)
         self.gallop_speed_factor = 1
         self.queued_animation = None # если упал в прыжке
     
-    def _apply_color_tint(self):
+    @staticmethod
+    def _load_frames(jacket_color_shift):
+        """Возвращает кадры всех анимаций для цвета жокея (загружаются и тонируются один раз)"""
+        if Horse.use_palette:
+            return Horse._load_indexed()[0]
+        frames = Horse._frames_by_shift.get(jacket_color_shift)
+        if frames is None:
+            frames = Horse._load_source()
+            # Применяем цветовую трансформацию к анимациям
+            if jacket_color_shift != 0:
+                frames = Horse._apply_color_tint(frames, jacket_color_shift)
+            Horse._add_frames(jacket_color_shift, frames)
+        return frames
+
+    @staticmethod
+    def prepare_frames(jacket_color_shift):
+        """Тонирует кадры под цвет жокея, не трогая кэши (можно вызывать из фонового потока).
+        Возвращает кадры по AnimState в виде (поверхность, pixel_key) для add_prepared_frames
+        или None, если готовить нечего: режим палитры, цвет уже загружен или исходные кадры не загружены"""
+        source = Horse._source
+        if Horse.use_palette or jacket_color_shift == 0 or source is None \
+                or jacket_color_shift in Horse._frames_by_shift:
+            return None
+        return Horse._tint_frames(source, jacket_color_shift)
+
+    @staticmethod
+    def add_prepared_frames(jacket_color_shift, prepared):
+        """Регистрирует кадры из prepare_frames; только из главного потока"""
+        if jacket_color_shift in Horse._frames_by_shift:
+            return
+        Horse._add_frames(jacket_color_shift, [[asset_cache.dedupe(surface, key) for surface, key in animation_frames]
+                                               for animation_frames in prepared])
+
+    @staticmethod
+    def _add_frames(jacket_color_shift, frames):
+        Horse._frames_by_shift[jacket_color_shift] = frames
+        asset_cache.register_frame_set(f'horse[jacket_color_shift={jacket_color_shift}]', horse_states.NAMES, frames)
+
+    @staticmethod
+    def _load_source():
+        """Кадры по AnimState до тонировки и рамки анимаций на холсте (считаются один раз).
+        Без обрезки — общие списки asset_cache и рамка во весь кадр"""
+        if Horse._source is None:
+            frames = [asset_cache.load_frames(f'assets/horse/{name}') for name in horse_states.NAMES]
+            Horse._canvas_size = frames[IDLE][0].get_size()
+            if Horse.trim_frames:
+                crops = []
+                for animation_frames in frames:
+                    bounds = [frame.get_bounding_rect() for frame in animation_frames]
+                    crop = bounds[0].unionall(bounds[1:])
+                    crops.append(crop if crop.width and crop.height else pygame.Rect(0, 0, 1, 1))
+                frames = [[Horse._crop(frame, crop) for frame in animation_frames]
+                          for animation_frames, crop in zip(frames, crops)]
+                # Полноразмерные кадры больше не нужны
+                for name in horse_states.NAMES:
+                    asset_cache.drop_frames(f'assets/horse/{name}')
+            else:
+                crops = [animation_frames[0].get_rect() for animation_frames in frames]
+            Horse._crops = crops
+            Horse._source = frames
+        return Horse._source
+
+    @staticmethod
+    def _crop(frame, crop):
+        """Кадр, обрезанный по рамке анимации: отдельная компактная поверхность, а не subsurface"""
+        return asset_cache.dedupe(frame.subsurface(crop).copy())
+
+    @staticmethod
+    def _load_indexed():
+        if Horse._indexed is None:
+            frames = Horse._load_source()
+            Horse._indexed = indexed_frames.build_indexed_frames(
+                frames, JACKET_PALETTE_SIZE, JACKET_COLOR_RANGE, JACKET_H_TOLERANCE, JACKET_S_TOLERANCE, JACKET_V_TOLERANCE)
+            asset_cache.register_frame_set('horse[palette]', horse_states.NAMES, Horse._indexed[0])
+        return Horse._indexed
+
+    @staticmethod
+    def _load_palette(jacket_color_shift):
+        palette = Horse._palettes_by_shift.get(jacket_color_shift)
+        if palette is None:
+            palette = indexed_frames.shift_jacket_palette(Horse._load_indexed()[1], JACKET_PALETTE_SIZE, jacket_color_shift)
+            Horse._palettes_by_shift[jacket_color_shift] = palette
+        return palette
+
+    @staticmethod
+    def _apply_color_tint(frames, jacket_color_shift):
         """Применяет цветовую тонировку к анимациям всадника"""
-        for _, animation in self.animations.items():
-        # animation = self.animations["idle"]
-        
+        return [[asset_cache.dedupe(surface, key) for surface, key in animation_frames]
+                for animation_frames in Horse._tint_frames(frames, jacket_color_shift)]
+
+    @staticmethod
+    def _tint_frames(frames, jacket_color_shift):
+        """Тонированные кадры в виде (поверхность, pixel_key); кэши не трогает"""
+        # Исходные кадры дедуплицированы, поэтому одинаковые кадры тонируются один раз
+        tinted_by_source = {}
+        tinted = []
+        for animation_frames in frames:
             tinted_frames = []
-            for frame in animation.frames:
-                tinted_frame = adjust_hue_saturation(frame, [(191, 70, 18), (223, 122, 66)],
-                        hue_shift=self.jacket_color_shift, 
-                        h_tolerance=15, s_tolerance=0.24, v_tolerance=0.26)
+            for frame in animation_frames:
+                tinted_frame = tinted_by_source.get(id(frame))
+                if tinted_frame is None:
+                    surface = Horse.tint_frame(frame, jacket_color_shift)
+                    tinted_frame = (surface, asset_cache.pixel_key(surface))
+                    tinted_by_source[id(frame)] = tinted_frame
                 tinted_frames.append(tinted_frame)
-            animation.frames = tinted_frames
+            tinted.append(tinted_frames)
+        return tinted
+
+    @staticmethod
+    def tint_frame(frame, jacket_color_shift):
+        """Перекрашивает куртку жокея на одном кадре"""
+        return adjust_hue_saturation(frame, JACKET_COLOR_RANGE, hue_shift=jacket_color_shift,
+                                     h_tolerance=JACKET_H_TOLERANCE, s_tolerance=JACKET_S_TOLERANCE,
+                                     v_tolerance=JACKET_V_TOLERANCE)
+
+    @staticmethod
+    def loaded_shifts():
+        """Цвета жокея, для которых кадры уже загружены и тонированы
+        (в режиме палитры тонированных кадров нет; измененные кадры подхватываются после перезапуска)"""
+        if Horse.use_palette:
+            return []
+        return [shift for shift in list(Horse._frames_by_shift) if shift != 0]
+
+    @staticmethod
+    def replace_frame(state, index, tinted_by_shift):
+        """Подменяет тонированные кадры анимации state на позиции index и сбрасывает его маски.
+        Кадры без тонировки — общие списки asset_cache (их подменяет asset_cache.replace_image),
+        а при обрезке — обрезанные копии Horse: их hot_reload передает под цветом 0"""
+        Horse._masks.pop((state, index, False), None)
+        Horse._masks.pop((state, index, True), None)
+        Horse._clearances.clear()
+        for jacket_color_shift, (surface, key) in tinted_by_shift.items():
+            if jacket_color_shift == 0:
+                frames = Horse._source if Horse.trim_frames else None
+            else:
+                frames = Horse._frames_by_shift.get(jacket_color_shift)
+            if frames is None or index >= len(frames[state]):
+                continue
+            if Horse.trim_frames:
+                # Рамка анимации не пересчитывается: что вышло за нее, видно только после перезапуска
+                crop = Horse._crops[state]
+                if not crop.contains(surface.get_bounding_rect()):
+                    print(f"Reloaded frame {index} of {horse_states.NAMES[state]} exceeds the trimmed bounds, "
+                          f"restart the game to re-trim")
+                frames[state][index] = Horse._crop(surface, crop)
+            else:
+                frames[state][index] = asset_cache.dedupe(surface, key)
@@ -0,0 +1,80 @@
+"""Таблицы состояний анимации лошади.
+
+Модуль не зависит от pygame, поэтому таблицы можно использовать в коде
+без отрисовки (боты, сетевой код, анализ телеметрии).
+"""
+from enum import IntEnum
+
+
+class AnimState(IntEnum):
+    IDLE = 0
+    IDLE2 = 1
+    IDLE3 = 2
+    START_MOVING = 3
+    STOP_MOVING = 4
+    WALK = 5
+    TROT = 6
+    GALLOP = 7
+    BARRIER = 8
+    TURN = 9
+    FALL = 10
+
+
+IDLE = AnimState.IDLE
+IDLE2 = AnimState.IDLE2
+IDLE3 = AnimState.IDLE3
+START_MOVING = AnimState.START_MOVING
+STOP_MOVING = AnimState.STOP_MOVING
+WALK = AnimState.WALK
+TROT = AnimState.TROT
+GALLOP = AnimState.GALLOP
+BARRIER = AnimState.BARRIER
+TURN = AnimState.TURN
+FALL = AnimState.FALL
+
+STATE_COUNT = len(AnimState)
+
+# Имя анимации (папка в assets/horse) для каждого состояния
+NAMES = tuple(state.name.lower() for state in AnimState)
+
+# fps и зацикленность анимации для каждого состояния
+FPS = (8, 8, 8, 10, 16, 10, 14, 25, 50, 16, 16)
+LOOP = (True, False, False, False, False, True, True, True, False, False, False)
+
+# Базовая скорость (пиксели в секунду), для GALLOP умножается на gallop_speed_factor
+SPEED = (0, 0, 0, 120, 80, 140, 260, 380, 0, 0, 0)
+
+# Признаки состояний
+IS_IDLE = tuple(state in (IDLE, IDLE2, IDLE3) for state in AnimState)
+CAN_JUMP = tuple(state in (WALK, TROT, GALLOP) for state in AnimState)
+# Состояния, в которых барьер сбивает лошадь (BARRIER — только у земли, см. Path.update)
+COLLIDES = tuple(state in (TROT, GALLOP) for state in AnimState)
+
+# Переходы: состояние -> (новое состояние, отложенное состояние) или None
+ACCELERATE = tuple(
+    (START_MOVING, WALK) if IS_IDLE[state] else
+    (TROT, None) if state == WALK else
+    (GALLOP, None) if state == TROT else
+    None
+    for state in AnimState
+)
+DECELERATE = tuple(
+    (TURN, None) if IS_IDLE[state] else
+    (STOP_MOVING, IDLE) if state == WALK else
+    (WALK, None) if state == TROT else
+    None
+    for state in AnimState
+)
+
+GALLOP_SPEED_STEP = 0.1
+
+
+def speed(state, queued_state, gallop_speed_factor):
+    """Скорость для состояния; в прыжке лошадь сохраняет скорость аллюра, с которого прыгнула"""
+    if state == BARRIER:
+        if queued_state is None or not CAN_JUMP[queued_state]:
+            return 0
+        state = queued_state
+    if state == GALLOP:
+        return SPEED[GALLOP] * gallop_speed_factor
+    return SPEED[state]
@@ -0,0 +1,154 @@
+"""Горячая перезагрузка ассетов для работы художников.
+
+Фоновый поток раз в HOT_RELOAD_INTERVAL_SEC сверяет mtime и размер PNG в папках
+assets/horse/*, grass, barrier, backgrounds и flag. Измененный файл декодируется,
+конвертируется, масштабируется (небо) и тонируется (кадры лошади) под все загруженные
+цвета жокея прямо в потоке; главный поток только забирает готовые поверхности
+в apply_pending() между кадрами и подменяет ссылки — без ожидания диска и тонировки.
+В режиме палитры (HORSE_PALETTE_MODE) кадры лошади не перезагружаются: 8-битные кадры
+с общей палитрой строятся один раз, измененный кадр виден только после перезапуска.
+"""
+import os
+import queue
+import threading
+
+import pygame
+
+import asset_cache
+import grass
+import horse_states
+from horse import Horse
+
+HORSE_FOLDER = os.path.join('assets', 'horse')
+FLAT_FOLDERS = [os.path.join('assets', name) for name in ('grass', 'barrier', 'backgrounds', 'flag')]
+
+
+def _scan(folder):
+    """{путь: (mtime_ns, размер)} для PNG в папке"""
+    files = {}
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return files
+    for entry in entries:
+        if entry.name.endswith('.png'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files[os.path.join(folder, entry.name)] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class AssetReloader:
+    def __init__(self, interval):
+        self.interval = interval
+        self.folders = [os.path.join(HORSE_FOLDER, name) for name in horse_states.NAMES] + FLAT_FOLDERS
+        self._ready = queue.SimpleQueue()  # готовые подмены для главного потока
+        self._stop = threading.Event()
+        self.reloaded = 0
+        self._thread = threading.Thread(target=self._worker, name='asset-reloader', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    # --- фоновый поток ---
+
+    def _worker(self):
+        known = {folder: _scan(folder) for folder in self.folders}
+        # Файл берется в работу, когда его подпись не менялась целый интервал (запись завершена)
+        pending = {}
+        while not self._stop.wait(self.interval):
+            for folder in self.folders:
+                current = _scan(folder)
+                previous = known[folder]
+                if set(current) != set(previous):
+                    self._ready.put(('list', folder, None))
+                for path, signature in current.items():
+                    if path in previous and previous[path] != signature:
+                        pending[path] = signature
+                        previous[path] = signature
+                    elif pending.get(path) == signature:
+                        del pending[path]
+                        self._reload(folder, path)
+                known[folder] = current
+                for path in list(pending):
+                    if os.path.dirname(path) == folder and path not in current:
+                        del pending[path]
+
+    def _reload(self, folder, path):
+        if Horse.use_palette and os.path.dirname(folder) == HORSE_FOLDER:
+            self._ready.put(('restart', path, None))
+            return
+        try:
+            image = pygame.image.load(path)
+        except pygame.error as e:
+            print(f"Error reloading image {path}: {e}")
+            return
+        # Нужны те же варианты, в которых файл уже загружен (с альфой для спрайтов, без — для неба)
+        alphas = {alpha for key_path, alpha in asset_cache.cached_image_keys() if key_path == path}
+        if Horse.trim_frames and os.path.dirname(folder) == HORSE_FOLDER:
+            # Полноразмерные кадры лошади выгружены из кэша (см. Horse._load_source), но нужны для обрезки
+            alphas.add(True)
+        surfaces = {}
+        for alpha in alphas:
+            surface = image.convert_alpha() if alpha else image.convert()
+            surfaces[alpha] = (surface, asset_cache.pixel_key(surface))
+        # Масштабированные копии (небо) готовятся здесь же, чтобы отрисовка не масштабировала сама
+        scaled = {}
+        for key in asset_cache.cached_scaled_keys():
+            key_path, alpha, size, flip_x, smooth = key
+            if key_path == path and alpha in surfaces:
+                try:
+                    surface = pygame.transform.smoothscale(surfaces[alpha][0], size) if smooth \
+                        else pygame.transform.scale(surfaces[alpha][0], size)
+                except ValueError:
+                    surface = pygame.transform.scale(surfaces[alpha][0], size)
+                scaled[key] = pygame.transform.flip(surface, True, False) if flip_x else surface
+        tinted = {}
+        if os.path.dirname(folder) == HORSE_FOLDER and True in surfaces:
+            frame = surfaces[True][0]
+            if Horse.trim_frames:
+                # Обрезанные кадры без тонировки — собственные списки Horse, а не asset_cache
+                tinted[0] = surfaces[True]
+            for shift in Horse.loaded_shifts():
+                surface = Horse.tint_frame(frame, shift)
+                tinted[shift] = (surface, asset_cache.pixel_key(surface))
+        self._ready.put(('image', path, (surfaces, scaled, tinted)))
+
+    # --- главный поток ---
+
+    def apply_pending(self, lanes):
+        """Подменяет готовые поверхности; вызывается между кадрами и никогда не ждет"""
+        while True:
+            try:
+                kind, path, payload = self._ready.get_nowait()
+            except queue.Empty:
+                return
+            if kind == 'list':
+                changed = asset_cache.refresh_image_list(path)
+                if changed and path == grass.GRASS_FOLDER:
+                    grass.clear()
+                if changed and os.path.dirname(path) == HORSE_FOLDER:
+                    print(f"Frames added or removed in {path}: restart the game to pick them up")
+                continue
+            if kind == 'restart':
+                print(f"Changed {path} in palette mode: restart the game to pick it up")
+                continue
+            surfaces, scaled, tinted = payload
+            replaced = asset_cache.replace_image(path, surfaces, scaled)
+            folder = os.path.dirname(path)
+            if os.path.dirname(folder) == HORSE_FOLDER:
+                state = horse_states.NAMES.index(os.path.basename(folder))
+                files = asset_cache.list_images(folder)
+                if path in files:
+                    Horse.replace_frame(state, files.index(path), tinted)
+            if replaced:
+                lanes.replace_surfaces(replaced)
+            if folder == grass.GRASS_FOLDER:
+                # Куски травы запечены из старых картинок — перепекаются при следующей отрисовке
+                grass.clear()
+            self.reloaded += 1
+            print(f"Reloaded {path}")
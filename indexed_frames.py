@@ -0,0 +1,109 @@
+"""8-битные кадры лошади с общей палитрой: цвет жокея — это палитра, а не копия кадров.
+
+Все кадры лошади квантуются в одну палитру из 256 цветов:
+    0                         — прозрачный (colorkey),
+    1 .. JACKET_PALETTE_SIZE  — цвета куртки жокея,
+    остальные                 — все прочие пиксели.
+Область куртки на каждом кадре находится один раз тем же поиском, что и при тонировке
+(color_utils.find_hsv_region), поэтому пиксели куртки ссылаются только на свои записи
+палитры. Новый цвет жокея — сдвиг тона этих записей: 256 цветов вместо набора кадров.
+
+Цена: вместо альфа-канала — colorkey (полупрозрачные края становятся жесткими),
+и не более 255 цветов на все кадры.
+"""
+import numpy as np
+import pygame
+
+from color_utils import find_hsv_region, hsv_to_rgb_vectorized, rgb_to_hsv_vectorized
+
+TRANSPARENT = 0
+# Цвет прозрачной записи палитры, не встречающийся в кадрах
+_TRANSPARENT_COLOR = (255, 0, 255)
+# Цвета группируются по кубу 32x32x32 (5 бит на канал)
+_CUBE_BITS = 5
+_CUBE_SIZE = 1 << (3 * _CUBE_BITS)
+
+
+def _cube_index(rgb):
+    shift = 8 - _CUBE_BITS
+    rgb = rgb.astype(np.int32) >> shift
+    return (rgb[..., 0] << (2 * _CUBE_BITS)) | (rgb[..., 1] << _CUBE_BITS) | rgb[..., 2]
+
+
+def _choose_entries(counts, sums, size):
+    """Самые частые ячейки куба -> (цвета палитры, LUT ячейка -> номер записи в группе)"""
+    occupied = np.flatnonzero(counts)
+    if len(occupied) == 0:
+        return np.zeros((0, 3), dtype=np.uint8), np.zeros(_CUBE_SIZE, dtype=np.int32)
+    chosen = occupied[np.argsort(counts[occupied])[::-1][:size]]
+    colors = sums[chosen] / counts[chosen, None]
+    # Каждая занятая ячейка — к ближайшему выбранному цвету (по среднему цвету ячейки)
+    cell_colors = sums[occupied] / counts[occupied, None]
+    lut = np.zeros(_CUBE_SIZE, dtype=np.int32)
+    for start in range(0, len(occupied), 4096):
+        block = cell_colors[start:start + 4096]
+        distances = ((block[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2)
+        lut[occupied[start:start + 4096]] = distances.argmin(axis=1)
+    return np.clip(np.rint(colors), 0, 255).astype(np.uint8), lut
+
+
+def build_indexed_frames(frames, jacket_palette_size, color_range, h_tolerance, s_tolerance, v_tolerance):
+    """Квантует кадры (список списков по анимациям) в 8-битные поверхности с общей палитрой.
+    Возвращает (кадры того же вида, базовая палитра — список 256 RGB)"""
+    unique = list({id(frame): frame for animation_frames in frames for frame in animation_frames}.values())
+    jacket_counts = np.zeros(_CUBE_SIZE, dtype=np.int64)
+    jacket_sums = np.zeros((_CUBE_SIZE, 3), dtype=np.float64)
+    body_counts = np.zeros(_CUBE_SIZE, dtype=np.int64)
+    body_sums = np.zeros((_CUBE_SIZE, 3), dtype=np.float64)
+    jacket_pixels = []  # номера пикселей куртки по кадрам (область ищется один раз)
+    for frame in unique:
+        rgb = pygame.surfarray.array3d(frame)
+        alpha = pygame.surfarray.array_alpha(frame)
+        region = find_hsv_region(rgb, alpha, color_range, h_tolerance, s_tolerance, v_tolerance)
+        opaque = alpha.ravel() >= 128
+        jacket = np.zeros(opaque.shape, dtype=bool)
+        if region is not None:
+            jacket = region.ravel() & opaque
+        jacket_pixels.append(np.flatnonzero(jacket))
+        cells = _cube_index(rgb).ravel()
+        flat_rgb = rgb.reshape(-1, 3)
+        body = opaque & ~jacket
+        for mask, counts, sums in ((jacket, jacket_counts, jacket_sums), (body, body_counts, body_sums)):
+            counts += np.bincount(cells[mask], minlength=_CUBE_SIZE)
+            for channel in range(3):
+                sums[:, channel] += np.bincount(cells[mask], weights=flat_rgb[mask, channel], minlength=_CUBE_SIZE)
+
+    jacket_colors, jacket_lut = _choose_entries(jacket_counts, jacket_sums, jacket_palette_size)
+    body_colors, body_lut = _choose_entries(body_counts, body_sums, 255 - jacket_palette_size)
+    palette = [_TRANSPARENT_COLOR] * 256
+    for i, color in enumerate(jacket_colors):
+        palette[1 + i] = tuple(int(c) for c in color)
+    for i, color in enumerate(body_colors):
+        palette[1 + jacket_palette_size + i] = tuple(int(c) for c in color)
+
+    indexed_by_source = {}
+    for frame, jacket in zip(unique, jacket_pixels):
+        rgb = pygame.surfarray.array3d(frame)
+        alpha = pygame.surfarray.array_alpha(frame)
+        cells = _cube_index(rgb).ravel()
+        indices = (1 + jacket_palette_size + body_lut[cells]).astype(np.uint8)
+        indices[jacket] = (1 + jacket_lut[cells[jacket]]).astype(np.uint8)
+        indices[alpha.ravel() < 128] = TRANSPARENT
+        surface = pygame.Surface(frame.get_size(), 0, 8)
+        surface.set_palette(palette)
+        pygame.surfarray.blit_array(surface, indices.reshape(alpha.shape))
+        surface.set_colorkey(TRANSPARENT)
+        indexed_by_source[id(frame)] = surface
+    indexed = [[indexed_by_source[id(frame)] for frame in animation_frames] for animation_frames in frames]
+    return indexed, palette
+
+
+def shift_jacket_palette(palette, jacket_palette_size, hue_shift):
+    """Палитра с цветом жокея, сдвинутым на hue_shift градусов (как adjust_hue_saturation)"""
+    jacket = np.array(palette[1:1 + jacket_palette_size], dtype=np.float32) / 255.0
+    hsv = rgb_to_hsv_vectorized(jacket)
+    hsv[:, 0] = (hsv[:, 0] + hue_shift) % 360
+    rgb = (hsv_to_rgb_vectorized(hsv) * 255).astype(np.uint8)
+    shifted = list(palette)
+    shifted[1:1 + jacket_palette_size] = [tuple(int(c) for c in color) for color in rgb]
+    return shifted
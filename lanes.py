@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+
+import pygame
+
+import quality
+from constants import SKY_PROPORTION
+from controls import Controls
+from netcode import RemotePath
+from path import Path
+
+
+@dataclass(frozen=True)
+class LaneConfig:
+    controls: Controls
+    jacket_color_shift: float = 0
+    # Дорожка соперника в сетевом заезде: состояние приходит по сети (см. netcode.RemotePath)
+    remote: bool = False
+    # Дорожкой управляет бот (см. bot.py): нажатия приходят в игру как обычные KEYDOWN
+    bot: bool = False
+
+
+class LaneManager:
+    """Делит экран на N горизонтальных дорожек и управляет их Path.
+
+    Неизменяемые ресурсы (кадры лошадей, небо, спрайты трассы) и данные плана
+    общие для всех дорожек, поэтому дорожка стоит только состояния своей лошади и отрисовки.
+    """
+
+    def __init__(self, screen_width, screen_height, lane_configs):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.lane_configs = list(lane_configs)
+        self.paths = []
+        # Профайлер кадра, общий для всех дорожек (None — замеры выключены)
+        self.profiler = None
+        # Сетевая сессия для дорожек соперника (None — без сети)
+        self.net = None
+        # Уровень качества отрисовки, общий для всех дорожек (см. quality.py)
+        self.quality = quality.LEVELS[0]
+
+    def lane_bounds(self, index):
+        """Возвращает (top_y, bottom_y) для дорожки index"""
+        count = len(self.lane_configs)
+        top_y = self.screen_height * index // count
+        bottom_y = self.screen_height * (index + 1) // count
+        return top_y, bottom_y
+
+    def sky_heights(self):
+        """Высоты неба по дорожкам — под них масштабируется фон (см. Path._ensure_sky_scaled)"""
+        heights = set()
+        for index in range(len(self.lane_configs)):
+            top_y, bottom_y = self.lane_bounds(index)
+            heights.add(int((bottom_y - top_y) * SKY_PROPORTION))
+        return heights
+
+    def build(self, race_controller, plan, clock):
+        """Пересоздает дорожки под новый заезд с общим планом и часами игры"""
+        self.paths = []
+        for index, config in enumerate(self.lane_configs):
+            top_y, bottom_y = self.lane_bounds(index)
+            kwargs = dict(top_y=top_y, bottom_y=bottom_y, screen_width=self.screen_width,
+                controls=config.controls, race_controller=race_controller, plan=plan,
+                jacket_color_shift=config.jacket_color_shift, clock=clock)
+            if config.remote:
+                self.paths.append(RemotePath(net=self.net, **kwargs))
+            else:
+                self.paths.append(Path(**kwargs))
+            self.paths[-1].profiler = self.profiler
+            self.paths[-1].lane_index = index
+            self.paths[-1].set_quality(self.quality)
+
+    def handle_event(self, event):
+        for path in self.paths:
+            path.handle_event(event)
+
+    def update(self, dt):
+        for path in self.paths:
+            path.update(dt)
+
+    def set_quality(self, level):
+        self.quality = level
+        for path in self.paths:
+            path.set_quality(level)
+
+    def replace_surfaces(self, replaced):
+        for path in self.paths:
+            path.replace_surfaces(replaced)
+
+    def draw(self, surface):
+        for path in self.paths:
+            path.draw(surface)
+
+        # Разделительные линии между дорожками
+        for index in range(1, len(self.paths)):
+            y = self.paths[index].top_y
+            pygame.draw.line(surface, (100, 100, 100), (0, y), (self.screen_width, y), 3)
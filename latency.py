@@ -0,0 +1,96 @@
+import json
+import time
+
+from constants import LATENCY_HISTOGRAM_MAX_MS
+
+
+def _horse_state(horse):
+    return horse.current_animation, horse.facing_right, horse.gallop_speed_factor, horse.queued_animation
+
+
+class LatencyTracker:
+    """Задержка от нажатия клавиши до flip кадра, который первым показывает результат.
+
+    pygame не сообщает время появления события, поэтому для каждого нажатия
+    записываются две величины: от опроса очереди событий до flip (нижняя оценка)
+    и от предыдущего опроса до flip (верхняя оценка: событие пришло где-то между опросами).
+    Гистограммы ведутся по дорожкам с шагом 1 мс.
+    """
+
+    def __init__(self, lane_count, loop_mode):
+        self.loop_mode = loop_mode
+        size = LATENCY_HISTOGRAM_MAX_MS + 1  # последний элемент — всё, что дольше
+        self.histograms = [[0] * size for _ in range(lane_count)]
+        self.upper_histograms = [[0] * size for _ in range(lane_count)]
+        self._poll_time = None
+        self._prev_poll_time = None
+        self._pending = []  # (lane, время опроса, время предыдущего опроса)
+
+    def events_polled(self, poll_time):
+        self._prev_poll_time = self._poll_time if self._poll_time is not None else poll_time
+        self._poll_time = poll_time
+
+    def route_event(self, event, paths):
+        """Передает событие дорожкам и запоминает те, где оно изменило состояние лошади"""
+        for lane, path in enumerate(paths):
+            before = _horse_state(path.horse)
+            path.handle_event(event)
+            if _horse_state(path.horse) != before:
+                self._pending.append((lane, self._poll_time, self._prev_poll_time))
+
+    def frame_presented(self, flip_time):
+        """Вызывается сразу после display.flip: все ожидающие нажатия видны в этом кадре"""
+        if not self._pending:
+            return
+        for lane, poll_time, prev_poll_time in self._pending:
+            self._add(self.histograms[lane], flip_time - poll_time)
+            self._add(self.upper_histograms[lane], flip_time - prev_poll_time)
+        self._pending.clear()
+
+    def _add(self, histogram, seconds):
+        bucket = min(int(seconds * 1000.0), LATENCY_HISTOGRAM_MAX_MS)
+        histogram[bucket] += 1
+
+    @staticmethod
+    def _percentile(histogram, q):
+        total = sum(histogram)
+        if total == 0:
+            return None
+        threshold = q * total
+        count = 0
+        for bucket, n in enumerate(histogram):
+            count += n
+            if count >= threshold:
+                return bucket
+        return len(histogram) - 1
+
+    def summary(self):
+        lanes = []
+        for lane, (histogram, upper) in enumerate(zip(self.histograms, self.upper_histograms)):
+            lanes.append({
+                'lane': lane,
+                'samples': sum(histogram),
+                'p50_ms': self._percentile(histogram, 0.5),
+                'p99_ms': self._percentile(histogram, 0.99),
+                'upper_p50_ms': self._percentile(upper, 0.5),
+                'upper_p99_ms': self._percentile(upper, 0.99),
+            })
+        return lanes
+
+    def dump(self, path=None):
+        """Печатает сводку и сохраняет гистограммы в JSON"""
+        if path is None:
+            path = time.strftime('latency_%Y%m%d_%H%M%S.json')
+        report = {
+            'loop_mode': self.loop_mode,
+            'bucket_ms': 1,
+            'summary': self.summary(),
+            'histograms': self.histograms,
+            'upper_histograms': self.upper_histograms,
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f)
+        for lane in report['summary']:
+            print(f"Latency lane {lane['lane']} ({self.loop_mode}): {lane['samples']} presses, "
+                  f"p50 {lane['p50_ms']}..{lane['upper_p50_ms']} ms, p99 {lane['p99_ms']}..{lane['upper_p99_ms']} ms")
+        return path
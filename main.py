@@ -1,118 +1,423 @@
-import pygame
+import os
+import random
 import time
+import pygame
 
-from path import Path
+import asset_cache
+import horse_states
+from bot import BotHost
+from capture import FrameCapture
 from controls import Controls
-from constants import AUTO_GAME_RESTART_SEC, BARRIER_MAX_SPAWN_DISTANCE, BARRIER_MIN_SPAWN_DISTANCE, FPS, GRASS_MAX_SPAWN_DISTANCE, GRASS_MIN_SPAWN_DISTANCE, TRACK_TOTAL_DISTANCE
-from track_plan import TrackPlan
+from constants import ADAPTIVE_QUALITY, ASSET_BUNDLE, AUTO_GAME_RESTART_SEC, BOT_LANE_COUNT, BOT_POLL_SEC, BOT_TARGET_GALLOP_FACTOR, CAPTURE, \
+    CAPTURE_DIR, CAPTURE_EVERY, CAPTURE_SLOTS, FPS, HOT_RELOAD, HOT_RELOAD_INTERVAL_SEC, HORSE_MARGIN_LEFT, HORSE_MARGIN_RIGHT, LANE_COUNT, \
+    LATENCY_INSTRUMENTATION, LOW_LATENCY_LOOP, LOW_LATENCY_MARGIN_SEC, NET_LOCAL_PORT, NET_PEER_ADDR, NET_ROLE, \
+    NET_SIM_JITTER_SEC, NET_SIM_LATENCY_SEC, NET_SIM_LOSS, PROFILE_CAPACITY, PROFILING, \
+    QUALITY_BUDGET_MS, QUALITY_UP_FRACTION, QUALITY_UP_WINDOWS, QUALITY_WINDOW_FRAMES, RECORD_RACES, RECORDINGS_DIR, RESULTS_DB, SPRITE_MEMORY_BUDGET_MB, \
+    TELEMETRY, TELEMETRY_BLOCK_FRAMES, TELEMETRY_BLOCKS, TELEMETRY_DIR
+from game_clock import RealTimeClock
+from horse import Horse
+from hot_reload import AssetReloader
+from lanes import LaneConfig, LaneManager
+from latency import LatencyTracker
+from netcode import NetRaceController, NetSession
+from path import Path
+from profiler import FrameProfiler
+from quality import QualityGovernor
 from race_controller import RaceController
+from race_prep import RacePreparer, generate_plan
+from replay import RaceRecorder, encode_key
+from results import LaneResult, RaceResult, ResultsStore
+from telemetry import TelemetryRecorder
+
+
+# Раскладки клавиш (влево, вправо, прыжок) и цвет жокея для дорожек сверху вниз
+LANE_LAYOUTS = [
+    ((pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP), 90),
+    ((pygame.K_a, pygame.K_d, pygame.K_w), 0),
+    ((pygame.K_j, pygame.K_l, pygame.K_i), 180),
+    ((pygame.K_KP4, pygame.K_KP6, pygame.K_KP8), 270),
+    ((pygame.K_f, pygame.K_h, pygame.K_t), 45),
+    ((pygame.K_z, pygame.K_c, pygame.K_x), 135),
+    ((pygame.K_KP1, pygame.K_KP3, pygame.K_KP2), 225),
+    ((pygame.K_COMMA, pygame.K_SLASH, pygame.K_PERIOD), 315),
+]
+
+
+def default_lane_configs(count=LANE_COUNT, bot_count=BOT_LANE_COUNT):
+    """Последние bot_count дорожек ведут боты (их клавиши — обычные раскладки дорожек)"""
+    return [LaneConfig(Controls(left=left, right=right, jump=jump), jacket_color_shift=shift, bot=index >= count - bot_count)
+            for index, ((left, right, jump), shift) in enumerate(LANE_LAYOUTS[:count])]
+
+
+def net_lane_configs(is_host):
+    """Своя дорожка сверху с первой раскладкой, дорожка соперника снизу.
+    Цвет жокея закреплен за ролью, чтобы на обоих автоматах лошади выглядели одинаково"""
+    host_shift, join_shift = LANE_LAYOUTS[0][1], LANE_LAYOUTS[1][1]
+    (left, right, jump), _ = LANE_LAYOUTS[0]
+    return [LaneConfig(Controls(left=left, right=right, jump=jump), host_shift if is_host else join_shift),
+            LaneConfig(Controls(left=None, right=None, jump=None), join_shift if is_host else host_shift, remote=True)]
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, lane_configs=None, clock=None, screen_size=None, record=RECORD_RACES, net_role=NET_ROLE,
+                 results_db=RESULTS_DB):
         pygame.init()
-        # Получаем размеры экрана для полноэкранного режима
-        self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        # Получаем размеры экрана для полноэкранного режима (screen_size — окно заданного размера, для replay)
+        if screen_size is None:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            self.screen = pygame.display.set_mode(screen_size)
+        if ASSET_BUNDLE is not None and os.path.exists(ASSET_BUNDLE):
+            asset_cache.open_bundle(ASSET_BUNDLE)
         self.screen_width = self.screen.get_width()
         self.screen_height = self.screen.get_height()
-        self.clock = pygame.time.Clock()
+        # Часы игры: реальное, ускоренное или ручное время (см. game_clock)
+        self.clock = clock if clock is not None else RealTimeClock()
+        # Запись заездов для воспроизведения (см. replay.py)
+        self.record = record
+        self.recorder = None
+        if record:
+            self.clock.quantize_ms = True
+        # Итоги заездов пишутся в SQLite фоновым потоком (см. results.py)
+        self.results = ResultsStore(results_db) if results_db is not None else None
+        self.race_controller = None
+        self.race_seed = None
+        self.race_started_at = None
         
-        # Создаем объекты управления для лошадей
-        self.controls1 = Controls(
-            left=pygame.K_LEFT,
-            right=pygame.K_RIGHT,
-            jump=pygame.K_UP
-        )
-        self.controls2 = Controls(
-            left=pygame.K_a,
-            right=pygame.K_d,
-            jump=pygame.K_w
-        )
+        # Сетевой заезд (см. netcode.py): хост выбирает seed заезда, клиент ждет его START
+        self.net = None
+        if net_role is not None:
+            self.net = NetSession(NET_LOCAL_PORT, NET_PEER_ADDR, self.clock, net_role == 'host',
+                                  NET_SIM_LOSS, NET_SIM_LATENCY_SEC, NET_SIM_JITTER_SEC)
+            if lane_configs is None:
+                lane_configs = net_lane_configs(self.net.is_host)
+
+        # Дорожки с собственным управлением и цветом жокея
+        self.lanes = LaneManager(self.screen_width, self.screen_height,
+            lane_configs if lane_configs is not None else default_lane_configs())
+        self.lanes.net = self.net
+        if self.net is not None:
+            self._net_local_lane = next(i for i, config in enumerate(self.lanes.lane_configs) if not config.remote)
+        # Боты-соперники в отдельном процессе (см. bot.py)
+        bot_lanes = [i for i, config in enumerate(self.lanes.lane_configs) if config.bot]
+        self.bots = BotHost(bot_lanes, BOT_TARGET_GALLOP_FACTOR, BOT_POLL_SEC) if bot_lanes else None
+        # Следующий заезд готовится в фоне во время экрана победы (см. race_prep.py)
+        self.next_race = None
+        # Оверлей обратного отсчета: затемнение под размер экрана и надписи строятся один раз
+        self._countdown_overlay = None
+        self._countdown_texts = {}  # (текст, размер шрифта) -> (надпись, тень)
 
         # Для передачи delta time
         self.dt = 0
+        self.running = False
+        
+        # Замер задержки ввода (см. latency.py)
+        self.latency = LatencyTracker(len(self.lanes.lane_configs), 'low_latency' if LOW_LATENCY_LOOP else 'standard') \
+            if LATENCY_INSTRUMENTATION else None
+
+        # Профайлер кадра (см. profiler.py); оверлей переключается по F3
+        self.profiler = FrameProfiler(len(self.lanes.lane_configs), PROFILE_CAPACITY) if PROFILING else None
+        self.lanes.profiler = self.profiler
+
+        # Покадровые трассы дорожек, файл на заезд пишется в фоне (см. telemetry.py)
+        self.telemetry = TelemetryRecorder(len(self.lanes.lane_configs), TELEMETRY_DIR, TELEMETRY_BLOCK_FRAMES,
+                                           TELEMETRY_BLOCKS) if TELEMETRY else None
+
+        # Запись кадров в PNG фоновым процессом, без остановки цикла (см. capture.py)
+        self.capture = FrameCapture(self.screen, CAPTURE_DIR, CAPTURE_SLOTS, CAPTURE_EVERY) if CAPTURE else None
+
+        # Качество отрисовки подстраивается под измеренное время кадра (см. quality.py)
+        self.quality = QualityGovernor(QUALITY_BUDGET_MS / 1000, QUALITY_WINDOW_FRAMES, QUALITY_UP_FRACTION,
+                                       QUALITY_UP_WINDOWS) if ADAPTIVE_QUALITY else None
         
         # Инициализация состояния заезда — без дублирования логики
         self._reset_game()
+        self._check_sprite_memory()
+
+        # Слежение за assets: измененные PNG подгружаются в фоне и подменяются между кадрами
+        self.hot_reload = AssetReloader(HOT_RELOAD_INTERVAL_SEC) if HOT_RELOAD else None
    
     def run(self):
-        running = True
-        while running:
-            # Расчет delta time
-            self.dt = self.clock.tick(FPS) / 1000.0  # в секундах
-            
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    # Выход из полноэкранного режима по ESC
-                    if event.key == pygame.K_ESCAPE:
-                        running = False
-                    if not self.countdown_active:
-                        # Передаем события в Path для обработки
-                        self.path1.handle_event(event)
-                        self.path2.handle_event(event)
-
-            # Обновление с передачей delta time
-            self.path1.update(self.dt)
-            self.path2.update(self.dt)
-            
-            # Отрисовка (фон рисуют сами Path: небо и почву)
-            self.screen.fill((0, 0, 0))
-            # Рисуем обе дорожки
-            self.path1.draw(self.screen)
-            self.path2.draw(self.screen)
-            
-            # Рисуем разделительную линию между дорожками
-            mid_y = self.screen_height // 2
-            pygame.draw.line(self.screen, (100, 100, 100), (0, mid_y), (self.screen_width, mid_y), 3)
-            
-            # Рисуем оверлей обратного отсчета, если активен
-            if self.countdown_active:
-                self._draw_countdown_overlay()
+        self.running = True
+        if LOW_LATENCY_LOOP:
+            self._run_low_latency()
+        else:
+            while self.running:
+                # Расчет delta time (в секундах времени игры)
+                self.dt = self.clock.tick(FPS)
+                self.frame(self._poll_events())
+        if self.recorder is not None:
+            self._save_recording()
+        if self.results is not None:
+            self._record_result()
+            self.results.close()
+        if self.hot_reload is not None:
+            self.hot_reload.close()
+        if self.bots is not None:
+            self.bots.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.capture is not None:
+            self.capture.close()
+        if self.latency is not None:
+            self.latency.dump()
+        if self.profiler is not None:
+            self.profiler.export()
+
+    def _run_low_latency(self):
+        """Цикл с поздним опросом: ожидание до момента «flip минус оценка времени кадра»,
+        затем опрос ввода, обновление и отрисовка без паузы между ними"""
+        frame_period = 1.0 / FPS
+        work_estimate = 0.0
+        last_flip = time.perf_counter()
+        while self.running:
+            wait = last_flip + frame_period - work_estimate - LOW_LATENCY_MARGIN_SEC - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            # Темп уже задан ожиданием выше, часы только измеряют dt
+            self.dt = self.clock.tick(0)
+            start = time.perf_counter()
+            self.frame(self._poll_events())
+            last_flip = time.perf_counter()
+            # Оценка сверху: быстро растет на тяжелых кадрах и медленно убывает
+            work_estimate = max(last_flip - start, work_estimate * 0.95)
+
+    def _poll_events(self):
+        events = pygame.event.get()
+        if self.latency is not None:
+            self.latency.events_polled(time.perf_counter())
+        return events
+
+    def frame(self, events, render=True):
+        """Один кадр игры; с render=False только симуляция (быстрый прогон без отрисовки)"""
+        frame_start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+        if self.recorder is not None:
+            self.recorder.step(self.dt)
+        if self.hot_reload is not None:
+            self.hot_reload.apply_pending(self.lanes)
+
+        if self.net is not None:
+            self.net.poll()
+            if not self.net.is_host:
+                seed = self.net.take_started_race()
+                if seed is not None:
+                    self._start_net_race(seed)
+
+        if self.bots is not None:
+            # Нажатия ботов — обычные KEYDOWN: обрабатываются и записываются так же, как клавиатура
+            events = list(events) + [pygame.event.Event(pygame.KEYDOWN, key=key)
+                                     for key in self.bots.take_presses(self.lanes.lane_configs)]
+
+        for event in events:
+            self._handle_event(event)
+
+        # Обновление с передачей delta time
+        self.lanes.update(self.dt)
+        if self.telemetry is not None:
+            self.telemetry.record(self.clock.now(), self.dt, self.lanes.paths)
+
+        if self.bots is not None:
+            self.bots.publish(self.lanes.paths, not self.countdown_active and self.race_controller.get_winner() is None,
+                              *self._bot_geometry)
+
+        if self.net is not None:
+            local = self.lanes.paths[self._net_local_lane]
+            self.race_controller.settle(self.lanes.paths)
+            self.net.send_frame(local, self.race_controller.finished.get(local))
+
+        if self.next_race is None and self.race_controller.get_winner() is not None \
+                and (self.net is None or self.net.is_host):
+            self.next_race = RacePreparer(random.getrandbits(32), self.lanes.sky_heights(),
+                                          {config.jacket_color_shift for config in self.lanes.lane_configs})
+
+        if render:
+            self._draw()
+            if self.profiler is not None:
+                if self.profiler.overlay_visible:
+                    self.profiler.draw_overlay(self.screen)
+                t_flip = time.perf_counter()
+            capture_sec = 0.0
+            if self.capture is not None:
+                t_capture = time.perf_counter()
+                self.capture.capture(self.screen)
+                # Запись (с drop=False — ожидание кодировщика) не должна снижать качество отрисовки
+                capture_sec = time.perf_counter() - t_capture
             pygame.display.flip()
+            if self.latency is not None:
+                self.latency.frame_presented(time.perf_counter())
+            if self.profiler is not None:
+                self.profiler.end_frame(time.perf_counter() - t_flip)
+            if self.quality is not None:
+                level = self.quality.frame_done(time.perf_counter() - frame_start - capture_sec)
+                if level is not None:
+                    self.lanes.set_quality(level)
+        elif self.profiler is not None:
+            self.profiler.end_frame(0.0)
 
-            # Автоматический рестарт через 10 секунд после победы
-            if self.race_controller.should_auto_restart(AUTO_GAME_RESTART_SEC):
-                self._reset_game()
+        # Автоматический рестарт через 10 секунд после победы (в сетевом заезде — только у хоста)
+        if (self.net is None or self.net.is_host) and self.race_controller.should_auto_restart(AUTO_GAME_RESTART_SEC):
+            self._reset_game()
 
-            # Проверяем завершение обратного отсчета
-            if self.countdown_active and self.countdown_start_time is not None:
-                elapsed = time.time() - self.countdown_start_time
-                if elapsed >= 4.0:
-                    # 3,2,1,СТАРТ по 1с каждый
-                    self.countdown_active = False
+        # Проверяем завершение обратного отсчета
+        if self.countdown_active and self.countdown_start_time is not None:
+            elapsed = self.clock.now() - self.countdown_start_time
+            if elapsed >= 4.0:
+                # 3,2,1,СТАРТ по 1с каждый
+                self.countdown_active = False
+                self.race_controller.start()
+                self.race_started_at = time.time()
 
-    def _reset_game(self):
-        self.race_controller = RaceController()
+    def _handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == pygame.KEYDOWN:
+            # Выход из полноэкранного режима по ESC
+            if event.key == pygame.K_ESCAPE:
+                self.running = False
+            if event.key == pygame.K_F3 and self.profiler is not None:
+                self.profiler.toggle_overlay()
+            if not self.countdown_active:
+                # Передаем события в Path для обработки
+                if self.recorder is not None:
+                    self.recorder.key_pressed(event.key)
+                if self.net is not None:
+                    for code in encode_key(self.lanes.lane_configs, event.key):
+                        self.net.key_pressed(code)
+                if self.latency is not None:
+                    self.latency.route_event(event, self.lanes.paths)
+                else:
+                    self.lanes.handle_event(event)
+
+    def _draw(self):
+        # Отрисовка (фон рисуют сами Path: небо и почву)
+        self.screen.fill((0, 0, 0))
+        # Рисуем все дорожки и разделительные линии между ними
+        self.lanes.draw(self.screen)
         
-        # Пересоздаем дорожки и лошадей
-        mid_y = self.screen_height // 2
-        # Новый общий план
-
-        plan = TrackPlan.generate(
-            total_distance=TRACK_TOTAL_DISTANCE,
-            min_grass_spacing=GRASS_MIN_SPAWN_DISTANCE,
-            max_grass_spacing=GRASS_MAX_SPAWN_DISTANCE,
-            min_barrier_spacing=BARRIER_MIN_SPAWN_DISTANCE,
-            max_barrier_spacing=BARRIER_MAX_SPAWN_DISTANCE,
-        )
-
-        self.path1 = Path(top_y=0, bottom_y=mid_y, screen_width=self.screen_width, controls=self.controls1,
-            race_controller=self.race_controller, plan=plan, jacket_color_shift=90)
-
-        self.path2 = Path(top_y=mid_y, bottom_y=self.screen_height, screen_width=self.screen_width, controls=self.controls2,
-            race_controller=self.race_controller, plan=plan, jacket_color_shift=0)
+        # Рисуем оверлей обратного отсчета, если активен
+        if self.countdown_active:
+            self._draw_countdown_overlay()
+
+    def _reset_game(self):
+        if self.recorder is not None:
+            self._save_recording()
+        if self.results is not None:
+            self._record_result()
+
+        if self.net is not None and not self.net.is_host:
+            seed = self._wait_net_race()
+            plan = generate_plan(seed)
+        elif self.next_race is not None:
+            # План и ресурсы уже готовы: рестарт — только создание легких объектов заезда
+            seed, plan = self.next_race.result()
+            self.next_race = None
+        else:
+            seed = random.getrandbits(32)
+            plan = generate_plan(seed)
+        if self.net is not None and self.net.is_host:
+            self.net.start_race(seed)
+        self.start_race(plan, seed)
+
+    def _start_net_race(self, seed):
+        """Клиент: хост начал новый заезд; план генерируется из seed хоста, трасса та же"""
+        if self.recorder is not None:
+            self._save_recording()
+        if self.results is not None:
+            self._record_result()
+        self.start_race(generate_plan(seed), seed)
+
+    def _wait_net_race(self):
+        """Клиент: ждет START от хоста (окно при этом не обрабатывает ничего, кроме выхода)"""
+        print(f"Waiting for host {NET_PEER_ADDR[0]}:{NET_PEER_ADDR[1]}...")
+        while True:
+            self.net.poll()
+            seed = self.net.take_started_race()
+            if seed is not None:
+                return seed
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    raise SystemExit
+            time.sleep(0.01)
+
+    def start_race(self, plan, seed):
+        """Начинает заезд по плану; весь дальнейший random заезда определяется seed"""
+        random.seed(seed)
+        self.race_seed = seed
+        self.race_controller = NetRaceController(self.clock, self.net) if self.net is not None \
+            else RaceController(self.clock)
+
+        # Пересоздаем дорожки и лошадей (ресурсы берутся из общего кэша)
+        self.lanes.build(self.race_controller, plan, self.clock)
+        if self.telemetry is not None:
+            self.telemetry.begin_race(seed, plan)
+        if self.bots is not None:
+            self._bot_geometry = self._measure_bot_geometry()
         
         # Новый обратный отсчет
         self._start_countdown()
 
+        if self.record:
+            self.recorder = RaceRecorder(seed, plan, (self.screen_width, self.screen_height),
+                                         self.lanes.lane_configs, self.clock.now())
+
+    def _measure_bot_geometry(self):
+        """Геометрия прыжка для ботов: время отрыва и приземления (лошадь в воздухе между ними),
+        зона столкновения в кадре и самый широкий барьер. По прямоугольникам лошадь в воздухе
+        вне NEAR_GROUND_FRAMES кадров с краев прыжка (см. Horse.is_near_ground), по маскам —
+        в кадрах, где она выше самого высокого барьера (см. Horse.jump_clearance)"""
+        path = self.lanes.paths[self.bots.lanes[0]]
+        horse = path.horse
+        jump_frames = len(horse.animations[horse_states.BARRIER].frames)
+        fps = horse_states.FPS[horse_states.BARRIER]
+        barriers = [asset_cache.load_image(image_path)
+                    for image_path in asset_cache.list_images(os.path.join('assets', 'barrier'))]
+        barrier_width = max((barrier.get_width() for barrier in barriers), default=32)
+        if Path.pixel_collision and barriers:
+            # Верх непрозрачной части самого высокого барьера на холсте лошади
+            barrier_height = max(barrier.get_height() - barrier.get_bounding_rect().top for barrier in barriers)
+            clearance = horse.jump_clearance(path.barrier_bottom() - barrier_height - horse.rect.top)
+            if clearance is not None:
+                first, last, zone_left, zone_right = clearance
+                return first / fps, (last + 1) / fps, zone_left, zone_right, barrier_width
+            print("Warning: horse jump frames never clear the barriers, bots use the rect jump timing")
+        near = Horse.NEAR_GROUND_FRAMES
+        return (near / fps, (jump_frames - near) / fps, HORSE_MARGIN_LEFT, horse.rect.width - HORSE_MARGIN_RIGHT,
+                barrier_width)
+
+    def _save_recording(self):
+        self.recorder.finish(self.lanes.paths, self.race_controller)
+        self.recorder.save(RECORDINGS_DIR)
+        self.recorder = None
+
+    def _record_result(self):
+        """Ставит итог текущего заезда в очередь записи (заезды, не дошедшие до старта, не пишутся)"""
+        if self.race_controller is None or not self.race_controller.is_started():
+            return
+        paths = self.lanes.paths
+        winner = self.race_controller.get_winner()
+        self.results.record(RaceResult(
+            started_at=self.race_started_at,
+            duration_sec=self.race_controller.race_duration(),
+            winner_lane=paths.index(winner) if winner in paths else -1,
+            seed=self.race_seed,
+            lanes=tuple(LaneResult(config.jacket_color_shift, path.falls, path.traveled_distance)
+                        for config, path in zip(self.lanes.lane_configs, paths))))
+
+    def _check_sprite_memory(self):
+        report = asset_cache.memory_report()
+        if report['total_bytes'] > SPRITE_MEMORY_BUDGET_MB * 1024 * 1024:
+            print(f"Warning: sprite memory {report['total_bytes'] / (1024 * 1024):.0f} MB "
+                  f"exceeds budget {SPRITE_MEMORY_BUDGET_MB} MB")
+            asset_cache.print_memory_report(report)
+
     def _start_countdown(self):
         self.countdown_active = True
-        self.countdown_start_time = time.time()
+        self.countdown_start_time = self.clock.now()
 
     def _draw_countdown_overlay(self):
-        elapsed = time.time() - self.countdown_start_time if self.countdown_start_time else 0
+        elapsed = self.clock.now() - self.countdown_start_time if self.countdown_start_time else 0
         # 0-1: '3', 1-2: '2', 2-3: '1', 3-4: 'СТАРТ'
         if elapsed < 1.0:
             text = "3"
@@ -126,20 +431,28 @@ class Game:
             text = ""
         
         if text:
-            # Полупрозрачный черный фон на весь экран
-            overlay = pygame.Surface((self.screen_width, self.screen_height))
-            overlay.set_alpha(180)
-            overlay.fill((0, 0, 0))
-            self.screen.blit(overlay, (0, 0))
+            blend = self.lanes.quality.overlay_blend
+            if blend:
+                # Полупрозрачный черный фон на весь экран
+                size = (self.screen_width, self.screen_height)
+                if self._countdown_overlay is None or self._countdown_overlay.get_size() != size:
+                    self._countdown_overlay = pygame.Surface(size)
+                    self._countdown_overlay.set_alpha(180)
+                    self._countdown_overlay.fill((0, 0, 0))
+                self.screen.blit(self._countdown_overlay, (0, 0))
             
             # Большой шрифт, центр экрана
             base_size = int(min(self.screen_width, self.screen_height) * (0.4 if text != 'СТАРТ' else 0.25))
-            font = pygame.font.SysFont(None, base_size)
-            text_surface = font.render(text, True, (255, 255, 255))
-            shadow_surface = font.render(text, True, (0, 0, 0))
+            rendered = self._countdown_texts.get((text, base_size))
+            if rendered is None:
+                font = pygame.font.SysFont(None, base_size)
+                rendered = (font.render(text, True, (255, 255, 255)), font.render(text, True, (0, 0, 0)))
+                self._countdown_texts[(text, base_size)] = rendered
+            text_surface, shadow_surface = rendered
             rect = text_surface.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
-            shadow_rect = shadow_surface.get_rect(center=(self.screen_width // 2 + 6, self.screen_height // 2 + 6))
-            self.screen.blit(shadow_surface, shadow_rect)
+            if blend:
+                shadow_rect = shadow_surface.get_rect(center=(self.screen_width // 2 + 6, self.screen_height // 2 + 6))
+                self.screen.blit(shadow_surface, shadow_rect)
             self.screen.blit(text_surface, rect)
 
 if __name__ == "__main__":
@@ -0,0 +1,578 @@
+"""Сетевой заезд двух автоматов по UDP.
+
+Каждый автомат симулирует только свою лошадь и отправляет сопернику
+свои нажатия и компактные снимки состояния (анимация, кадр, дистанция,
+gallop_speed_factor). Дистанция кодируется дельтой к последнему снимку,
+подтвержденному соперником. Дорожка соперника (RemotePath) рисуется по
+снимкам с интерполяцией на NET_INTERP_DELAY_SEC в прошлое.
+
+План трассы общий: хост выбирает seed и рассылает START, оба генерируют
+TrackPlan из одного seed.
+
+Победителя решает только хост (NetRaceController): клиент передает в снимках
+момент пересечения флага по своим часам, хост переводит его на свои часы
+(смещение часов минус половина RTT) и сравнивает со своим финишем, а решение
+рассылает пакетом RESULT. Пока соперник не финишировал, хост ждет снимка
+соперника новее своего финиша: только он доказывает, что соперник не успел раньше.
+
+Проверка на одной машине (два процесса на loopback, без окна):
+
+    python netcode.py selftest --loss 0.1 --latency 0.05 --jitter 0.02
+"""
+import argparse
+import heapq
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+import horse_states
+from constants import HORSE_SHADOW_MAX_Y_FRAC, NET_INTERP_DELAY_SEC, NET_SNAPSHOT_EVERY, SKY_PROPORTION
+from path import Path
+from race_controller import RaceController
+
+PACKET_STATE = 1
+PACKET_START = 2
+PACKET_START_ACK = 3
+PACKET_RESULT = 4
+PACKET_RESULT_ACK = 5
+
+# тип, номер заезда, seq, ack (seq последнего сохраненного снимка соперника), время отправителя в мс
+_HEADER = struct.Struct('<BBHHI')
+_START = struct.Struct('<BBI')
+# тип, номер заезда, победитель (RESULT_HOST или RESULT_JOIN)
+_RESULT = struct.Struct('<BBB')
+RESULT_HOST = 0
+RESULT_JOIN = 1
+# base_seq снимка: NO_SNAPSHOT — снимка нет, FULL_SNAPSHOT — полный, иначе дельта к снимку base_seq
+NO_SNAPSHOT = 0xFFFF
+FULL_SNAPSHOT = 0xFFFE
+_SNAPSHOT_BASE = struct.Struct('<H')
+# состояние (4 бита) | facing_right << 4 | finished << 5, кадр, gallop_speed_factor * 10
+# (при finished за снимком идет _FINISH)
+_SNAPSHOT_FULL = struct.Struct('<BBfB')
+# то же, но дистанция — дельта к базовому снимку в 1/16 пикселя
+_SNAPSHOT_DELTA = struct.Struct('<BBhB')
+_DELTA_SCALE = 16.0
+# момент пересечения флага по часам отправителя в мс
+_FINISH = struct.Struct('<I')
+# Нажатия: номер первого, количество, коды (повторяются последние INPUT_REDUNDANCY на случай потерь)
+_INPUTS = struct.Struct('<HB')
+INPUT_REDUNDANCY = 8
+
+START_RESEND_SEC = 0.2
+MAX_EXTRAPOLATION_SEC = 0.25
+# Хост объявляет свою победу без снимка соперника новее финиша, если соперник молчит дольше
+RESULT_WAIT_MAX_SEC = 1.0
+
+
+def _seq_newer(a, b):
+    """a новее b с учетом переполнения 16-битного счетчика"""
+    return a != b and ((a - b) & 0xFFFF) < 0x8000
+
+
+class LossyChannel:
+    """Отправка через UDP с имитацией потерь, задержки и джиттера (для проверки без сети)"""
+
+    def __init__(self, sock, loss=0.0, latency=0.0, jitter=0.0):
+        self.sock = sock
+        self.loss = loss
+        self.latency = latency
+        self.jitter = jitter
+        self._queue = []  # (время отправки, порядковый номер, данные, адрес)
+        self._counter = 0
+
+    def send(self, data, addr):
+        if self.loss and random.random() < self.loss:
+            return
+        if not self.latency and not self.jitter:
+            self._sendto(data, addr)
+            return
+        due = time.perf_counter() + max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        self._counter += 1
+        heapq.heappush(self._queue, (due, self._counter, data, addr))
+
+    def flush(self):
+        now = time.perf_counter()
+        while self._queue and self._queue[0][0] <= now:
+            _, _, data, addr = heapq.heappop(self._queue)
+            self._sendto(data, addr)
+
+    def _sendto(self, data, addr):
+        try:
+            self.sock.sendto(data, addr)
+        except OSError:
+            pass  # соперник еще не слушает порт — пакет просто теряется
+
+
+class Snapshot:
+    __slots__ = ('time_ms', 'state', 'frame', 'facing_right', 'finish_ms', 'distance', 'speed_factor')
+
+    def __init__(self, time_ms, state, frame, facing_right, finish_ms, distance, speed_factor):
+        self.time_ms = time_ms
+        self.state = state
+        self.frame = frame
+        self.facing_right = facing_right
+        self.finish_ms = finish_ms  # момент пересечения флага по часам отправителя или None
+        self.distance = distance
+        self.speed_factor = speed_factor
+
+    @property
+    def finished(self):
+        return self.finish_ms is not None
+
+    def flags(self):
+        return int(self.state) | (self.facing_right << 4) | (self.finished << 5)
+
+
+class NetSession:
+    def __init__(self, local_port, peer_addr, clock, is_host, loss=0.0, latency=0.0, jitter=0.0):
+        self.clock = clock
+        self.peer_addr = peer_addr
+        self.is_host = is_host
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('0.0.0.0', local_port))
+        self.sock.setblocking(False)
+        self.channel = LossyChannel(self.sock, loss, latency, jitter)
+
+        self.race_id = 0
+        self.seed = None
+        self._start_acked = True
+        self._last_start_sent = 0.0
+        self._pending_start = None  # seed нового заезда от хоста, еще не начатого
+        self._result = None  # решение хоста о победителе текущего заезда (RESULT_*)
+        self._result_acked = True
+        self._last_result_sent = 0.0
+        self._pending_result = None  # клиент: решение хоста, еще не примененное
+
+        self._seq = 0
+        self._frame = 0
+        self._remote_seq = None  # последний принятый seq соперника
+        self._ack_seq = None  # seq последнего сохраненного снимка соперника — только от него можно считать дельту
+        self._sent_snapshots = {}  # seq -> Snapshot (для дельты, когда соперник подтвердит seq)
+        self._acked_base = None  # (seq, Snapshot) — последний подтвержденный соперником снимок
+        self._received_snapshots = {}  # seq соперника -> Snapshot
+        self._local_inputs = []  # коды нажатий, индекс — номер нажатия
+        self.remote_inputs = []  # нажатия соперника по порядку (для записи и разбора заездов)
+
+        self._buffer = []  # снимки соперника по времени отправителя
+        self._time_offset = None  # локальное время - время соперника (минимум = минимальная задержка)
+        self._rtt_ms = None  # минимальное время до подтверждения своего снимка
+        self._remote_finish_ms = None  # момент финиша соперника по его часам
+        self._remote_seen_ms = None  # время самого нового снимка соперника по его часам
+
+        self.bytes_sent = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.snapshots_dropped = 0
+
+    # --- начало заезда ---
+
+    def start_race(self, seed):
+        """Хост: объявляет новый заезд с seed и повторяет START, пока соперник не подтвердит"""
+        self.race_id = (self.race_id + 1) & 0xFF
+        self.seed = seed
+        self._start_acked = False
+        self._send_start()
+        self._reset_race_state()
+
+    def take_started_race(self):
+        """Соперник-клиент: seed нового заезда, объявленного хостом, или None"""
+        seed, self._pending_start = self._pending_start, None
+        return seed
+
+    def _send_start(self):
+        self._last_start_sent = time.perf_counter()
+        self._send(_START.pack(PACKET_START, self.race_id, self.seed))
+
+    # --- итог заезда ---
+
+    def send_result(self, winner):
+        """Хост: рассылает победителя заезда (RESULT_*) и повторяет, пока соперник не подтвердит"""
+        self._result = winner
+        self._result_acked = False
+        self._send_result()
+
+    def take_result(self):
+        """Клиент: решение хоста о победителе (RESULT_*), пришедшее с прошлого вызова, или None"""
+        result, self._pending_result = self._pending_result, None
+        return result
+
+    def _send_result(self):
+        self._last_result_sent = time.perf_counter()
+        self._send(_RESULT.pack(PACKET_RESULT, self.race_id, self._result))
+
+    def _reset_race_state(self):
+        self._result = None
+        self._result_acked = True
+        self._pending_result = None
+        self._sent_snapshots.clear()
+        self._acked_base = None
+        self._received_snapshots.clear()
+        self._remote_seq = None
+        self._ack_seq = None
+        self._buffer.clear()
+        self._remote_finish_ms = None
+        self._remote_seen_ms = None
+        self._local_inputs.clear()
+        self.remote_inputs.clear()
+
+    # --- отправка ---
+
+    def key_pressed(self, code):
+        self._local_inputs.append(code)
+
+    def send_frame(self, path, finish_time):
+        """Отправляет новые нажатия и, каждые NET_SNAPSHOT_EVERY кадров, снимок состояния дорожки.
+        finish_time — момент пересечения флага своей лошадью по self.clock или None"""
+        if not self._start_acked and time.perf_counter() - self._last_start_sent >= START_RESEND_SEC:
+            self._send_start()
+        if not self._result_acked and time.perf_counter() - self._last_result_sent >= START_RESEND_SEC:
+            self._send_result()
+        self._seq = (self._seq + 1) & 0xFFFF
+        time_ms = int(self.clock.now() * 1000.0) & 0xFFFFFFFF
+        data = bytearray(_HEADER.pack(PACKET_STATE, self.race_id, self._seq,
+                                      self._ack_seq if self._ack_seq is not None else NO_SNAPSHOT, time_ms))
+        first = max(0, len(self._local_inputs) - INPUT_REDUNDANCY)
+        data += _INPUTS.pack(first & 0xFFFF, len(self._local_inputs) - first)
+        data += bytes(self._local_inputs[first:])
+
+        self._frame += 1
+        if self._frame % NET_SNAPSHOT_EVERY == 0:
+            horse = path.horse
+            finish_ms = int(finish_time * 1000.0) & 0xFFFFFFFF if finish_time is not None else None
+            snapshot = Snapshot(time_ms, horse.current_animation,
+                                horse.animations[horse.current_animation].current_frame,
+                                horse.facing_right, finish_ms, path.traveled_distance, horse.gallop_speed_factor)
+            data += self._encode_snapshot(snapshot)
+            # Хранится дистанция, которую восстановит соперник: дельты считаются от нее,
+            # и ошибка округления не копится по цепочке подтвержденных снимков
+            self._sent_snapshots[self._seq] = snapshot
+            # Храним только недавнюю историю для дельт
+            if len(self._sent_snapshots) > 64:
+                for seq in sorted(self._sent_snapshots, key=lambda s: (self._seq - s) & 0xFFFF, reverse=True)[:16]:
+                    del self._sent_snapshots[seq]
+        else:
+            data += _SNAPSHOT_BASE.pack(NO_SNAPSHOT)
+        self._send(bytes(data))
+
+    def _encode_snapshot(self, snapshot):
+        """Кодирует снимок; snapshot.distance заменяется дистанцией, которую восстановит соперник"""
+        speed = min(255, int(round(snapshot.speed_factor * 10)))
+        frame = min(255, snapshot.frame)
+        finish = _FINISH.pack(snapshot.finish_ms) if snapshot.finished else b''
+        if self._acked_base is not None:
+            base_seq, base = self._acked_base
+            delta = round((snapshot.distance - base.distance) * _DELTA_SCALE)
+            if -32768 <= delta <= 32767:
+                snapshot.distance = base.distance + delta / _DELTA_SCALE
+                return _SNAPSHOT_BASE.pack(base_seq) + \
+                    _SNAPSHOT_DELTA.pack(snapshot.flags(), frame, delta, speed) + finish
+        data = _SNAPSHOT_FULL.pack(snapshot.flags(), frame, snapshot.distance, speed)
+        snapshot.distance = _SNAPSHOT_FULL.unpack(data)[2]  # float32
+        return _SNAPSHOT_BASE.pack(FULL_SNAPSHOT) + data + finish
+
+    def _send(self, data):
+        self.bytes_sent += len(data)
+        self.packets_sent += 1
+        self.channel.send(data, self.peer_addr)
+
+    # --- прием ---
+
+    def poll(self):
+        """Обрабатывает все пришедшие пакеты, не блокируя кадр"""
+        self.channel.flush()
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break  # ICMP port unreachable на loopback, пока соперник не запущен
+            self.packets_received += 1
+            if data and data[0] == PACKET_STATE:
+                self._on_state(data)
+            elif data and data[0] == PACKET_START:
+                self._on_start(data)
+            elif data and data[0] == PACKET_START_ACK:
+                _, race_id, _ = _START.unpack_from(data)
+                if race_id == self.race_id:
+                    self._start_acked = True
+            elif data and data[0] == PACKET_RESULT:
+                self._on_result(data)
+            elif data and data[0] == PACKET_RESULT_ACK:
+                _, race_id, _ = _RESULT.unpack_from(data)
+                if race_id == self.race_id:
+                    self._result_acked = True
+
+    def _on_start(self, data):
+        _, race_id, seed = _START.unpack_from(data)
+        self._send(_START.pack(PACKET_START_ACK, race_id, seed))
+        if race_id != self.race_id:
+            self.race_id = race_id
+            self.seed = seed
+            self._pending_start = seed
+            self._reset_race_state()
+
+    def _on_result(self, data):
+        _, race_id, winner = _RESULT.unpack_from(data)
+        if race_id != self.race_id:
+            return  # START этого заезда еще не пришел — хост повторит RESULT
+        self._send(_RESULT.pack(PACKET_RESULT_ACK, race_id, winner))
+        if self._result is None:
+            self._result = winner
+            self._pending_result = winner
+
+    def _on_state(self, data):
+        _, race_id, seq, ack, time_ms = _HEADER.unpack_from(data)
+        if race_id != self.race_id:
+            return
+        offset = _HEADER.size
+
+        if ack != NO_SNAPSHOT and ack in self._sent_snapshots:
+            if self._acked_base is None or _seq_newer(ack, self._acked_base[0]):
+                self._acked_base = (ack, self._sent_snapshots[ack])
+            rtt = self.clock.now() * 1000.0 - self._sent_snapshots[ack].time_ms
+            if self._rtt_ms is None or rtt < self._rtt_ms:
+                self._rtt_ms = rtt
+
+        first, count = _INPUTS.unpack_from(data, offset)
+        offset += _INPUTS.size
+        for i in range(count):
+            if (first + i) & 0xFFFF == len(self.remote_inputs) & 0xFFFF:
+                self.remote_inputs.append(data[offset + i])
+        offset += count
+
+        if self._remote_seq is None or _seq_newer(seq, self._remote_seq):
+            self._remote_seq = seq
+        else:
+            return  # устаревший или повторный пакет: нажатия уже учтены, снимок старее имеющихся
+
+        base_seq, = _SNAPSHOT_BASE.unpack_from(data, offset)
+        offset += _SNAPSHOT_BASE.size
+        if base_seq == NO_SNAPSHOT:
+            return
+        if base_seq == FULL_SNAPSHOT:
+            flags, frame, distance, speed = _SNAPSHOT_FULL.unpack_from(data, offset)
+            offset += _SNAPSHOT_FULL.size
+        else:
+            base = self._received_snapshots.get(base_seq)
+            if base is None:
+                self.snapshots_dropped += 1
+                return
+            flags, frame, delta, speed = _SNAPSHOT_DELTA.unpack_from(data, offset)
+            offset += _SNAPSHOT_DELTA.size
+            distance = base.distance + delta / _DELTA_SCALE
+        finish_ms = _FINISH.unpack_from(data, offset)[0] if flags & 0x20 else None
+        snapshot = Snapshot(time_ms, horse_states.AnimState(flags & 0x0F), frame,
+                            bool(flags & 0x10), finish_ms, distance, speed / 10.0)
+        if finish_ms is not None and self._remote_finish_ms is None:
+            self._remote_finish_ms = finish_ms
+        self._remote_seen_ms = time_ms
+        self._received_snapshots[seq] = snapshot
+        self._ack_seq = seq
+        if len(self._received_snapshots) > 64:
+            oldest = min(self._received_snapshots, key=lambda s: self._received_snapshots[s].time_ms)
+            del self._received_snapshots[oldest]
+
+        offset_estimate = self.clock.now() * 1000.0 - time_ms
+        if self._time_offset is None or offset_estimate < self._time_offset:
+            self._time_offset = offset_estimate
+        self._buffer.append(snapshot)
+        if len(self._buffer) > 32:
+            del self._buffer[:len(self._buffer) - 32]
+
+    # --- финиш соперника ---
+
+    def remote_finish(self):
+        """(момент финиша соперника, время его самого нового снимка) по self.clock в секундах;
+        неизвестное — None. Часы соперника переводятся смещением минус половина RTT"""
+        if self._time_offset is None:
+            return None, None
+        offset_ms = self._time_offset - (self._rtt_ms / 2.0 if self._rtt_ms is not None else 0.0)
+        finish = (self._remote_finish_ms + offset_ms) / 1000.0 if self._remote_finish_ms is not None else None
+        seen = (self._remote_seen_ms + offset_ms) / 1000.0 if self._remote_seen_ms is not None else None
+        return finish, seen
+
+    # --- интерполяция ---
+
+    def sample(self):
+        """Состояние соперника на момент «сейчас минус задержка интерполяции».
+        Возвращает (Snapshot-источник состояния анимации, интерполированная дистанция) или None"""
+        if not self._buffer:
+            return None
+        render_ms = self.clock.now() * 1000.0 - self._time_offset - NET_INTERP_DELAY_SEC * 1000.0
+        buffer = self._buffer
+        if render_ms <= buffer[0].time_ms:
+            return buffer[0], buffer[0].distance
+        for older, newer in zip(buffer, buffer[1:]):
+            if older.time_ms <= render_ms <= newer.time_ms:
+                span = newer.time_ms - older.time_ms
+                t = (render_ms - older.time_ms) / span if span else 1.0
+                return older, older.distance + (newer.distance - older.distance) * t
+        # Снимки кончились: ограниченная экстраполяция по скорости последнего состояния
+        last = buffer[-1]
+        ahead = min(render_ms - last.time_ms, MAX_EXTRAPOLATION_SEC * 1000.0) / 1000.0
+        direction = 1 if last.facing_right else -1
+        return last, last.distance + direction * horse_states.speed(last.state, None, last.speed_factor) * ahead
+
+
+class NetRaceController(RaceController):
+    """Контроллер сетевого заезда: победителя объявляет только хост.
+    declare_winner лишь запоминает момент финиша своей лошади в finished; итог подводит
+    settle: хост сравнивает финиши на своих часах и рассылает решение, клиент его применяет"""
+
+    def __init__(self, clock, net):
+        super().__init__(clock)
+        self.net = net
+        self.finished = {}  # своя дорожка -> момент пересечения флага по self.clock
+
+    def declare_winner(self, path):
+        self.finished.setdefault(path, self.clock.now())
+
+    def settle(self, paths):
+        """Вызывается каждый кадр после обновления дорожек: объявляет победителя, когда он известен"""
+        if self.get_winner() is not None:
+            return
+        remote = next(path for path in paths if isinstance(path, RemotePath))
+        local = next(path for path in paths if not isinstance(path, RemotePath))
+        if not self.net.is_host:
+            result = self.net.take_result()
+            if result is not None:
+                # На клиенте лошадь хоста — на дорожке соперника
+                self._announce(remote if result == RESULT_HOST else local)
+            return
+        local_finish = self.finished.get(local)
+        remote_finish, remote_seen = self.net.remote_finish()
+        if remote_finish is not None and (local_finish is None or remote_finish < local_finish):
+            winner = remote
+        elif local_finish is not None and (remote_finish is not None
+                                           or remote_seen is not None and remote_seen >= local_finish
+                                           or self.clock.now() - local_finish >= RESULT_WAIT_MAX_SEC):
+            winner = local
+        else:
+            return
+        self._announce(winner)
+        self.net.send_result(RESULT_JOIN if winner is remote else RESULT_HOST)
+
+    def _announce(self, winner):
+        super().declare_winner(winner)
+        winner.is_winner = True
+
+
+class RemotePath(Path):
+    """Дорожка соперника: лошадь не управляется локально, состояние приходит по сети"""
+
+    def __init__(self, *args, net=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.net = net
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt):
+        sample = self.net.sample() if self.net is not None else None
+        if sample is not None:
+            snapshot, distance = sample
+            self.traveled_distance = distance
+            if snapshot.state == horse_states.FALL and self.horse.current_animation != horse_states.FALL:
+                self.falls += 1
+            self.horse.apply_state(snapshot.state, snapshot.frame, snapshot.facing_right, snapshot.speed_factor)
+
+        sky_height = int((self.bottom_y - self.top_y) * SKY_PROPORTION)
+        ground_y = self.top_y + sky_height
+        horse_y = self.top_y + int((self.bottom_y - self.top_y) * HORSE_SHADOW_MAX_Y_FRAC)
+        self._update_visible_sprites(ground_y, horse_y, dt)
+
+
+def parse_addr(text):
+    host, port = text.rsplit(':', 1)
+    return host, int(port)
+
+
+def _simulate(args):
+    """Один автомат без окна: своя лошадь по скрипту, дорожка соперника по сети"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from controls import Controls
+    from game_clock import RealTimeClock
+    from track_plan import TrackPlan
+    from constants import BARRIER_MAX_SPAWN_DISTANCE, BARRIER_MIN_SPAWN_DISTANCE, GRASS_MAX_SPAWN_DISTANCE, \
+        GRASS_MIN_SPAWN_DISTANCE, TRACK_TOTAL_DISTANCE
+
+    pygame.init()
+    pygame.display.set_mode((1024, 768))
+    clock = RealTimeClock()
+    net = NetSession(args.port, parse_addr(args.peer), clock, args.role == 'host',
+                     args.loss, args.latency, args.jitter)
+    if net.is_host:
+        net.start_race(random.getrandbits(32))
+    deadline = time.perf_counter() + 10.0
+    while net.seed is None:
+        net.poll()
+        if time.perf_counter() > deadline:
+            print(f"{args.role}: no peer")
+            return 1
+        time.sleep(0.01)
+    random.seed(net.seed)
+    plan = TrackPlan.generate(TRACK_TOTAL_DISTANCE, GRASS_MIN_SPAWN_DISTANCE, GRASS_MAX_SPAWN_DISTANCE,
+                              BARRIER_MIN_SPAWN_DISTANCE, BARRIER_MAX_SPAWN_DISTANCE)
+    race = NetRaceController(clock, net)
+    local = Path(0, 384, 1024, Controls(None, None, None), race, plan, clock=clock)
+    remote = RemotePath(384, 768, 1024, Controls(None, None, None), race, plan, clock=clock, net=net)
+    end = time.perf_counter() + args.seconds
+    frame = 0
+    while time.perf_counter() < end:
+        dt = clock.tick(60)
+        net.poll()
+        if frame % 45 == 0:
+            local.horse.accelerate()
+            net.key_pressed(1)
+        local.update(dt)
+        remote.update(dt)
+        race.settle([local, remote])
+        net.send_frame(local, race.finished.get(local))
+        frame += 1
+    print(f"{args.role}: frames {frame}, sent {net.packets_sent} packets / {net.bytes_sent} B "
+          f"({net.bytes_sent / args.seconds:.0f} B/s, {net.bytes_sent / max(1, net.packets_sent):.1f} B/packet), "
+          f"received {net.packets_received}, snapshots dropped {net.snapshots_dropped}, "
+          f"remote inputs {len(net.remote_inputs)}")
+    print(f"{args.role}: final local distance {local.traveled_distance:.1f}, "
+          f"remote estimate {remote.traveled_distance:.1f}")
+    winner = race.get_winner()
+    print(f"{args.role}: winner {'none' if winner is None else 'local' if winner is local else 'remote'}")
+    return 0
+
+
+def _selftest(args):
+    """Запускает хост и клиента отдельными процессами на loopback"""
+    common = ['--seconds', str(args.seconds), '--loss', str(args.loss),
+              '--latency', str(args.latency), '--jitter', str(args.jitter)]
+    host = subprocess.Popen([sys.executable, __file__, 'sim', '--role', 'host', '--port', '47001',
+                             '--peer', '127.0.0.1:47002'] + common)
+    client = subprocess.Popen([sys.executable, __file__, 'sim', '--role', 'join', '--port', '47002',
+                               '--peer', '127.0.0.1:47001'] + common)
+    return max(host.wait(), client.wait())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Сетевой заезд по UDP: проверка без окна')
+    parser.add_argument('mode', choices=('sim', 'selftest'))
+    parser.add_argument('--role', choices=('host', 'join'), default='host')
+    parser.add_argument('--port', type=int, default=47001)
+    parser.add_argument('--peer', default='127.0.0.1:47002')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--loss', type=float, default=0.0, help='доля теряемых пакетов')
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка, с')
+    parser.add_argument('--jitter', type=float, default=0.0, help='разброс задержки, с')
+    args = parser.parse_args(argv)
+    if args.mode == 'selftest':
+        return _selftest(args)
+    return _simulate(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
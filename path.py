@@ -1,28 +1,50 @@
+import bisect
+import itertools
+import time
 import pygame
 
-from constants import HORSE_OFFSET_X, HORSE_SHADOW_MAX_Y_FRAC, HORSE_SHADOW_MIN_Y_FRAC, HORSE_Y_FRAC, OFFSCREEN_MARGIN, SKY_COLOR, GRASS_COLOR, SKY_PROPORTION
-from grass import Grass
+import asset_cache
+import horse_states
+import profiler
+import quality
+from constants import CULL_HYSTERESIS_PX, CULL_PREFETCH_PX, HORSE_OFFSET_X, HORSE_SHADOW_MAX_Y_FRAC, HORSE_SHADOW_MIN_Y_FRAC, HORSE_Y_FRAC, OFFSCREEN_MARGIN, PIXEL_COLLISION, SKY_COLOR, GRASS_COLOR, SKY_PROPORTION
+from game_clock import SYSTEM_CLOCK
+from grass import GrassLayer
 from barrier import Barrier
 from flag import Flag
 from horse import Horse
 from track_plan import TrackPlan
 
+# Порядок при равной глубине (нижнем крае): как прежний порядок отрисовки групп
+_ORDER_FLAG = 0
+_ORDER_HORSE = 1
+_ORDER_BARRIER = 2
+_ORDER_GRASS = 3
+
 
 class Path:
-    def __init__(self, top_y, bottom_y, screen_width, controls, race_controller, plan: TrackPlan, jacket_color_shift=0):
-        self.horse = Horse((HORSE_OFFSET_X, top_y + int(HORSE_Y_FRAC * (bottom_y - top_y))), jacket_color_shift=jacket_color_shift)
+    # Столкновения по маскам кадров (иначе по прямоугольникам с отступами HORSE_MARGIN_*)
+    pixel_collision = PIXEL_COLLISION
+    # Самая широкая из созданных картинок спрайтов трассы: запас при отсечении еще не созданных
+    _max_sprite_width = 0
+
+    def __init__(self, top_y, bottom_y, screen_width, controls, race_controller, plan: TrackPlan, jacket_color_shift=0,
+                 clock=SYSTEM_CLOCK):
+        self.clock = clock
+        self.horse = Horse((HORSE_OFFSET_X, top_y + int(HORSE_Y_FRAC * (bottom_y - top_y))), jacket_color_shift=jacket_color_shift,
+                           clock=clock)
         self.screen_width = screen_width
         self.controls = controls
         self.race_controller = race_controller
         self.plan = plan
         # Словарь для хранения спрайтов по TrackEvent
         self._sprites_by_event = {}  # TrackEvent -> sprite
-        self.grass_sprites = pygame.sprite.Group()
         self.barrier_sprites = pygame.sprite.Group()
         self.flag_sprites = pygame.sprite.Group()
         self.path_distance = plan.total_distance   
         self.traveled_distance = 0
         self.is_winner = False
+        self.falls = 0
 
         # Границы области для этой дорожки
         self.top_y = top_y
@@ -32,11 +54,43 @@ class Path:
         # Определяет, сколько единиц distance видно на экране
         self._view_distance_range = self.screen_width  # Примерно сколько единиц distance видно на экране
         self._pixels_per_distance = self.screen_width / self._view_distance_range if self._view_distance_range > 0 else 1.0
-
-        self.sky_bg = pygame.image.load(self.plan.sky_background_path).convert()
+        # Трава — запеченные куски по полосам перспективы, а не спрайты
+        self.grass = GrassLayer(plan, bottom_y - top_y, self._pixels_per_distance)
+
+        # Список отрисовки: отрезки пар (поверхность, позиция), упорядоченные по глубине
+        # (нижнему краю на экране); кадр уходит одним Surface.blits. Отрезки спрайтов
+        # добавляются и удаляются при появлении и исчезновении спрайтов, отрезки травы
+        # и неба перезаполняются каждый кадр, а позиции спрайтов — это их же rect
+        self._draw_keys = []
+        self._draw_runs = []
+        self._draw_seq = itertools.count()
+        self._runs_by_event = {}  # TrackEvent -> (ключ, отрезок)
+        self._sky_run = []
+        self._add_run(-1, 0, self._sky_run)
+        self._horse_run = [(self.horse.image, self.horse.image_rect)]
+        self._add_run(self.horse.rect.bottom, _ORDER_HORSE, self._horse_run)
+        for run, depth in zip(self.grass.band_runs, self.grass.band_depths):
+            self._add_run(top_y + depth, _ORDER_GRASS, run)
+
+        # Небо загружается и масштабируется один раз для всех дорожек (см. asset_cache)
+        self.sky_bg = asset_cache.load_image(self.plan.sky_background_path, alpha=False) \
+            if self.plan.sky_background_path else None
         self._sky_bg_scaled = None
+        self._sky_bg_scaled_flipped = None
+        self._win_font = None
+
+        # Уровень качества отрисовки (см. quality.py), меняется через set_quality
+        self.quality = quality.LEVELS[0]
+
+        # Профайлер кадра (profiler.FrameProfiler) и номер дорожки в нем; None — замеры выключены
+        self.profiler = None
+        self.lane_index = 0
 
     def update(self, dt):
+        prof = self.profiler
+        if prof is not None:
+            t_start = time.perf_counter()
+
         speed = self.horse.get_speed()
 
         direction = -1 if self.horse.facing_right else 1
@@ -52,29 +106,45 @@ class Path:
         ground_y = self.top_y + sky_height
         horse_y = self.top_y + int((self.bottom_y - self.top_y) * HORSE_SHADOW_MAX_Y_FRAC)
 
-        # Вычисляем видимые границы трассы и обновляем спрайты
+        # Создаем, двигаем и удаляем спрайты по их положению на экране
         self._update_visible_sprites(ground_y, horse_y, dt)
 
+        if prof is not None:
+            t_visible = time.perf_counter()
+            prof.add(self.lane_index, profiler.VISIBLE_SPRITES, t_visible - t_start)
+            prof.set_sprites(self.lane_index, self.grass.blits, len(self.barrier_sprites), len(self.flag_sprites))
+
         # Проверка коллизий с барьерами
-        if self.horse.current_animation in ['trot', 'gallop'] or \
-                self.horse.current_animation in ['barrier'] and self.horse.is_near_ground():
-            collided = False
-            for barrier in self.barrier_sprites:
-                if self.horse.collide_barrier(barrier):
-                    collided = True
-            if collided:
+        state = self.horse.current_animation
+        # По маскам прыжок проверяется целиком: лошадь падает, только если кадр задел барьер
+        if horse_states.COLLIDES[state] or \
+                state == horse_states.BARRIER and (self.pixel_collision or self.horse.is_near_ground()):
+            collide = self.horse.collide_barrier_mask if self.pixel_collision else self.horse.collide_barrier
+            if any(collide(barrier) for barrier in self.barrier_sprites):
                 self.horse.make_fall()
+                self.falls += 1
+
+        if prof is not None:
+            prof.add(self.lane_index, profiler.COLLISIONS, time.perf_counter() - t_visible)
 
         # Проверка прохождения флага (победа)
         if not self.is_winner and self.race_controller.get_winner() is None:
             for flag in list(self.flag_sprites):
                 if self.horse.passed_flag(flag):
                     self.race_controller.declare_winner(self)
-                    self.is_winner = True
+                    # В сетевом заезде победителя решает хост (см. netcode.NetRaceController)
+                    self.is_winner = self.race_controller.get_winner() is self
                     break
 
         # Обновляем лошадь (анимации и логику)
-        self.horse.update(dt)
+        if prof is not None:
+            t_horse = time.perf_counter()
+            self.horse.update(dt)
+            t_end = time.perf_counter()
+            prof.add(self.lane_index, profiler.HORSE_UPDATE, t_end - t_horse)
+            prof.add(self.lane_index, profiler.PATH_UPDATE, t_end - t_start)
+        else:
+            self.horse.update(dt)
     
     def handle_event(self, event):
         """Обрабатывает события клавиатуры для управления лошадью"""
@@ -93,8 +163,13 @@ class Path:
                 self.horse.barrier()
 
     def draw(self, surface):
+        prof = self.profiler
+        if prof is not None:
+            t_start = time.perf_counter()
+
         sky_height = int((self.bottom_y - self.top_y) * SKY_PROPORTION)
 
+        self._sky_run.clear()
         if sky_height > 0:
             self._draw_sky(surface, sky_height)
 
@@ -103,25 +178,39 @@ class Path:
         if ground_height > 0:
             pygame.draw.rect(surface, GRASS_COLOR, (0, ground_y, self.screen_width, ground_height))
 
-        self.grass_sprites.draw(surface)
-        self.flag_sprites.draw(surface)
-        self.horse.draw(surface)
-        self.barrier_sprites.draw(surface)
+        self.grass.collect(self.top_y, self.screen_width, self.traveled_distance, self.quality.grass_stride,
+                           1 if self.horse.facing_right else -1)
+        self._horse_run[0] = (self.horse.image, self.horse.image_rect)
+        self.horse.apply_palette()
+        surface.blits(itertools.chain.from_iterable(self._draw_runs), doreturn=False)
 
         self._draw_progress_bar(surface)
 
         if self.is_winner:
             self._draw_win_message(surface)
 
+        if prof is not None:
+            prof.add(self.lane_index, profiler.PATH_DRAW, time.perf_counter() - t_start)
+
+    def set_quality(self, level):
+        """Меняет уровень качества (прореживание травы — другие куски в кэше grass, см. draw)"""
+        old = self.quality
+        self.quality = level
+        if level.smooth_sky != old.smooth_sky:
+            # Небо перезапрашивается из кэша: при повышении качества — сглаженная копия
+            self._sky_bg_scaled = None
+            self._sky_bg_scaled_flipped = None
+
     def _draw_sky(self, surface, sky_height):
-        if self.sky_bg is not None:
+        """Картинка неба — в отрезок неба списка отрисовки, заливка — сразу"""
+        if self.sky_bg is not None and self.quality.sky_image:
             self._ensure_sky_scaled(sky_height)
             if self._sky_bg_scaled:
                 tile_w = self._sky_bg_scaled.get_width()
                 if tile_w >= self.screen_width:
                     # Если изображение шире экрана — обрезаем по ширине
                     src_rect = pygame.Rect(0, 0, self.screen_width, sky_height)
-                    surface.blit(self._sky_bg_scaled, (0, self.top_y), src_rect)
+                    self._sky_run.append((self._sky_bg_scaled, (0, self.top_y), src_rect))
                 else:
                     # Если уже — повторяем по горизонтали, чередуя с отражением
                     x = 0
@@ -132,10 +221,10 @@ class Path:
                         draw_w = tile_surface.get_width()
                         if draw_w > remaining:
                             src_rect = pygame.Rect(0, 0, remaining, sky_height)
-                            surface.blit(tile_surface, (x, self.top_y), src_rect)
+                            self._sky_run.append((tile_surface, (x, self.top_y), src_rect))
                             break
                         else:
-                            surface.blit(tile_surface, (x, self.top_y))
+                            self._sky_run.append((tile_surface, (x, self.top_y)))
                         x += draw_w
                         use_flip = not use_flip
             else:
@@ -168,16 +257,25 @@ class Path:
                 pygame.draw.rect(surface, (80, 200, 80), (bar_x, bar_y, fill_w, bar_height))
 
     def _draw_win_message(self, surface):
-        font = pygame.font.SysFont(None, 250)
+        if self._win_font is None:
+            # На узких дорожках (много участников) надпись уменьшается под высоту дорожки
+            self._win_font = pygame.font.SysFont(None, min(250, int((self.bottom_y - self.top_y) * 0.8)))
+        font = self._win_font
         text_surface = font.render("ПОБЕДА", True, (255, 255, 255))
-        shadow_surface = font.render("ПОБЕДА", True, (0, 0, 0))
         center_x = self.screen_width // 2
         center_y = (self.top_y + self.bottom_y) // 2
         text_rect = text_surface.get_rect(center=(center_x, center_y))
-        shadow_rect = shadow_surface.get_rect(center=(center_x + 2, center_y + 2))
-        surface.blit(shadow_surface, shadow_rect)
+        if self.quality.overlay_blend:
+            shadow_surface = font.render("ПОБЕДА", True, (0, 0, 0))
+            shadow_rect = shadow_surface.get_rect(center=(center_x + 2, center_y + 2))
+            surface.blit(shadow_surface, shadow_rect)
         surface.blit(text_surface, text_rect)
 
+    @staticmethod
+    def sky_scaled_size(sky_bg, sky_height):
+        """Размер неба, отмасштабированного по высоте sky_height с сохранением аспекта"""
+        return int(sky_bg.get_width() * (sky_height / float(sky_bg.get_height()))), sky_height
+
     def _ensure_sky_scaled(self, sky_height):
         """Готовит масштабированную версию неба под фиксированную высоту sky_height,
         сохраняя соотношение сторон; ширина может быть больше экрана и будет обрезана при отрисовке."""
@@ -185,34 +283,58 @@ class Path:
             self._sky_bg_scaled = None
             return
         # Масштабируем по высоте, сохраняя аспект
-        src_w = self.sky_bg.get_width()
-        src_h = self.sky_bg.get_height()
-
-        target_h = sky_height
-        target_w = int(src_w * (target_h / float(src_h)))
+        target_w, target_h = Path.sky_scaled_size(self.sky_bg, sky_height)
         # Если уже есть нужного размера — не пересоздаём
         if (self._sky_bg_scaled is None or
             self._sky_bg_scaled.get_height() != target_h or
             self._sky_bg_scaled.get_width() != target_w):
-            try:
-                self._sky_bg_scaled = pygame.transform.smoothscale(self.sky_bg, (target_w, target_h))
-            except Exception:
-                self._sky_bg_scaled = pygame.transform.scale(self.sky_bg, (target_w, target_h))
+            path = self.plan.sky_background_path
+            smooth = self.quality.smooth_sky
+            self._sky_bg_scaled = asset_cache.load_scaled(path, (target_w, target_h), smooth=smooth)
             # Подготовим отраженную версию для чередования
             try:
-                self._sky_bg_scaled_flipped = pygame.transform.flip(self._sky_bg_scaled, True, False)
+                self._sky_bg_scaled_flipped = asset_cache.load_scaled(path, (target_w, target_h), flip_x=True,
+                                                                      smooth=smooth)
             except Exception:
                 self._sky_bg_scaled_flipped = None
 
-    def _calculate_view_bounds(self):
-        """Вычисляет видимые границы трассы на основе текущей позиции"""
-        # traveled_distance увеличивается при движении вправо
-        # Видимая область: события в диапазоне [traveled_distance - margin, traveled_distance + margin]
-        # margin зависит от ширины экрана и коэффициента преобразования
-        left_bound = self.traveled_distance - 2.5 * self._view_distance_range
-        right_bound = self.traveled_distance + 2.5 * self._view_distance_range
-                
-        return left_bound, right_bound
+    def _add_run(self, depth, order, run):
+        key = (depth, order, next(self._draw_seq))  # при равной глубине — в порядке добавления
+        index = bisect.bisect(self._draw_keys, key)
+        self._draw_keys.insert(index, key)
+        self._draw_runs.insert(index, run)
+        return key
+
+    def _remove_run(self, key):
+        index = bisect.bisect_left(self._draw_keys, key)
+        del self._draw_keys[index]
+        del self._draw_runs[index]
+
+    def replace_surfaces(self, replaced):
+        """Подменяет картинки живых спрайтов и неба после горячей перезагрузки ({id(старая): новая})"""
+        for event, sprite in self._sprites_by_event.items():
+            new = replaced.get(id(sprite.image))
+            if new is not None:
+                bottomleft = sprite.rect.bottomleft
+                sprite.image = new
+                sprite.rect = new.get_rect(bottomleft=bottomleft)
+                self._show_sprite_run(event, sprite)
+        new_sky = replaced.get(id(self.sky_bg))
+        if new_sky is not None:
+            self.sky_bg = new_sky
+            self._sky_bg_scaled = None
+            self._sky_bg_scaled_flipped = None
+
+    def barrier_gaps(self, count):
+        """Расстояния в пикселях от левого края лошади до левых краев ближайших count барьеров впереди
+        (барьеры на линии лошади, перспектива 1)"""
+        first = bisect.bisect_right(self.plan.barrier_distances, self.traveled_distance - self.horse.rect.width)
+        return [(distance - self.traveled_distance) * self._pixels_per_distance
+                for distance in self.plan.barrier_distances[first:first + count]]
+
+    def barrier_bottom(self):
+        """Нижний край барьеров на экране (линия лошади)"""
+        return self._sprite_y('barrier')
 
     def _distance_to_screen_x(self, distance: float, y_pos: float, ground_y: float, horse_y: float):
         """Преобразует distance на трассе в позицию X на экране с учетом перспективы"""
@@ -233,69 +355,90 @@ class Path:
         
         return screen_x
 
+    def _sprite_y(self, kind):
+        """Нижний край спрайта события на экране: барьеры — на линии лошади, флаг — дальше"""
+        frac = HORSE_SHADOW_MAX_Y_FRAC if kind == 'barrier' else HORSE_SHADOW_MIN_Y_FRAC
+        return int(self.top_y + frac * (self.bottom_y - self.top_y))
+
     def _update_visible_sprites(self, ground_y: float, horse_y: float, dt: float):
-        """Обновляет спрайты на основе видимых границ трассы"""
-        # Вычисляем видимые границы
-        left_bound, right_bound = self._calculate_view_bounds()
-        
-        # Находим события, которые должны быть видны
-        visible_events = set()
-        for event in self.plan.events:
-            if left_bound <= event.distance <= right_bound:
-                visible_events.add(event)
-                
-                # Создаем или обновляем спрайт для видимого события
-                if event not in self._sprites_by_event:
-                    self._create_sprite_for_event(event, ground_y, horse_y)
-                else:
-                    self._update_sprite_position(event, ground_y, horse_y, dt)
-        
-        # Удаляем спрайты для невидимых событий
-        events_to_remove = []
-        for event, sprite in self._sprites_by_event.items():
-            if event not in visible_events:
-                events_to_remove.append(event)
-        
-        for event in events_to_remove:
+        """Отсечение по экранному x с учетом перспективы: спрайт создается, когда его прямоугольник
+        подходит к экрану ближе OFFSCREEN_MARGIN (впереди по ходу — еще на CULL_PREFETCH_PX),
+        и удаляется на CULL_HYSTERESIS_PX дальше. Живой, но невидимый спрайт не рисуется"""
+        create_left = -OFFSCREEN_MARGIN
+        create_right = self.screen_width + OFFSCREEN_MARGIN
+        if self.horse.facing_right:
+            create_right += CULL_PREFETCH_PX
+        else:
+            create_left -= CULL_PREFETCH_PX
+        keep_left = create_left - CULL_HYSTERESIS_PX
+        keep_right = create_right + CULL_HYSTERESIS_PX
+
+        # События-кандидаты по distance: самый медленный по перспективе спрайт (флаг) и самая
+        # широкая картинка дают самый широкий диапазон
+        slowest = (self._sprite_y('flag') - ground_y) / (horse_y - ground_y) * self._pixels_per_distance
+        left_bound = self.traveled_distance + (keep_left - Path._max_sprite_width - HORSE_OFFSET_X) / slowest
+        right_bound = self.traveled_distance + (keep_right - HORSE_OFFSET_X) / slowest
+        first = bisect.bisect_left(self.plan.sprite_distances, left_bound)
+        last = bisect.bisect_right(self.plan.sprite_distances, right_bound)
+
+        alive = set()
+        for event in self.plan.sprite_events[first:last]:
+            sprite = self._sprites_by_event.get(event)
+            if sprite is None:
+                x = self._distance_to_screen_x(event.distance, self._sprite_y(event.kind), ground_y, horse_y)
+                if not create_left - Path._max_sprite_width < x < create_right:
+                    continue
+                sprite = self._create_sprite_for_event(event, ground_y, horse_y)
+            else:
+                self._update_sprite_position(event, ground_y, horse_y, dt)
+                if sprite.rect.right <= keep_left or sprite.rect.left >= keep_right:
+                    continue
+            alive.add(event)
+            self._show_sprite_run(event, sprite)
+
+        # Удаляем спрайты, ушедшие за зону удержания
+        for event in [event for event in self._sprites_by_event if event not in alive]:
             self._remove_sprite_for_event(event)
 
     def _create_sprite_for_event(self, event, ground_y: float, horse_y: float):
         """Создает спрайт для события"""
-        if event.kind == 'grass':
-            y = int(self.top_y + event.y_frac * (self.bottom_y - self.top_y))
-            x = self._distance_to_screen_x(event.distance, y, ground_y, horse_y)
-            sprite = Grass((x, y))
-            self._sprites_by_event[event] = sprite
-            self.grass_sprites.add(sprite)
-        elif event.kind == 'barrier':
-            y = int(self.top_y + HORSE_SHADOW_MAX_Y_FRAC * (self.bottom_y - self.top_y))
-            x = self._distance_to_screen_x(event.distance, y, ground_y, horse_y)
-            sprite = Barrier((x, y))
-            self._sprites_by_event[event] = sprite
+        y = self._sprite_y(event.kind)
+        x = self._distance_to_screen_x(event.distance, y, ground_y, horse_y)
+        if event.kind == 'barrier':
+            # Картинка — функция события: барьер, ушедший за экран и вернувшийся, тот же
+            sprite = Barrier((x, y), variant=hash(event.distance))
             self.barrier_sprites.add(sprite)
-        elif event.kind == 'flag':
-            y = int(self.top_y + HORSE_SHADOW_MIN_Y_FRAC * (self.bottom_y - self.top_y))
-            x = self._distance_to_screen_x(event.distance, y, ground_y, horse_y)
+            order = _ORDER_BARRIER
+        else:
             sprite = Flag((x, y))
-            self._sprites_by_event[event] = sprite
             self.flag_sprites.add(sprite)
+            order = _ORDER_FLAG
+        self._sprites_by_event[event] = sprite
+        self._add_sprite_run(event, sprite, order)
+        Path._max_sprite_width = max(Path._max_sprite_width, sprite.rect.width)
+        return sprite
+
+    def _add_sprite_run(self, event, sprite, order):
+        run = []
+        self._runs_by_event[event] = (self._add_run(sprite.rect.bottom, order, run), run)
+
+    def _show_sprite_run(self, event, sprite):
+        """Пара спрайта в списке отрисовки — только пока он на экране"""
+        run = self._runs_by_event[event][1]
+        if sprite.rect.right > 0 and sprite.rect.left < self.screen_width:
+            if run:
+                run[0] = (sprite.image, sprite.rect)
+            else:
+                run.append((sprite.image, sprite.rect))
+        elif run:
+            run.clear()
 
     def _update_sprite_position(self, event, ground_y: float, horse_y: float, dt: float):
         """Обновляет позицию спрайта на основе distance события"""
         sprite = self._sprites_by_event[event]
-        
-        # Обновляем анимацию для флагов
         if event.kind == 'flag':
             sprite.update(dt)
-        
-        # Вычисляем новую позицию
-        if event.kind == 'grass':
-            y = int(self.top_y + event.y_frac * (self.bottom_y - self.top_y))
-        elif event.kind == 'barrier':
-            y = int(self.top_y + HORSE_SHADOW_MAX_Y_FRAC * (self.bottom_y - self.top_y))
-        else:  # flag
-            y = int(self.top_y + HORSE_SHADOW_MIN_Y_FRAC * (self.bottom_y - self.top_y))
-        
+        y = self._sprite_y(event.kind)
         x = self._distance_to_screen_x(event.distance, y, ground_y, horse_y)
         sprite.rect.x = round(x)
         sprite.rect.bottom = y
@@ -303,9 +446,8 @@ class Path:
     def _remove_sprite_for_event(self, event):
         """Удаляет спрайт для события"""
         sprite = self._sprites_by_event.pop(event)
-        if event.kind == 'grass':
-            self.grass_sprites.remove(sprite)
-        elif event.kind == 'barrier':
+        self._remove_run(self._runs_by_event.pop(event)[0])
+        if event.kind == 'barrier':
             self.barrier_sprites.remove(sprite)
         elif event.kind == 'flag':
             self.flag_sprites.remove(sprite)
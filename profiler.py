@@ -0,0 +1,136 @@
+import csv
+import json
+import time
+
+import numpy as np
+import pygame
+
+# Участки кадра, замеряемые по дорожкам
+PATH_UPDATE = 0
+VISIBLE_SPRITES = 1
+COLLISIONS = 2
+HORSE_UPDATE = 3
+PATH_DRAW = 4
+SECTION_NAMES = ('path_update', 'visible_sprites', 'collisions', 'horse_update', 'path_draw')
+
+# Счетчики спрайтов по дорожкам
+SPRITE_NAMES = ('grass', 'barrier', 'flag')
+
+
+class FrameProfiler:
+    """Кольцевой буфер замеров кадра фиксированного размера.
+
+    Замеры пишутся в заранее выделенные массивы, поэтому включенный профайлер
+    не выделяет память в кадре. Выключенный профайлер — это None у Path и Game:
+    в горячем коде остается только проверка на None.
+    """
+
+    def __init__(self, lane_count, capacity):
+        self.lane_count = lane_count
+        self.capacity = capacity
+        self.sections = np.zeros((capacity, lane_count, len(SECTION_NAMES)), dtype=np.float64)
+        self.sprites = np.zeros((capacity, lane_count, len(SPRITE_NAMES)), dtype=np.int32)
+        self.frame_times = np.zeros(capacity, dtype=np.float64)
+        self.flip_times = np.zeros(capacity, dtype=np.float64)
+        self.frame_count = 0  # всего кадров с начала записи
+        self._index = 0
+        self._frame_start = time.perf_counter()
+        self.overlay_visible = False
+        self._overlay_font = None
+        self._overlay_surface = None
+        self._overlay_updated = 0.0
+
+    def begin_frame(self):
+        self._index = self.frame_count % self.capacity
+        self.sections[self._index] = 0.0
+        self._frame_start = time.perf_counter()
+
+    def add(self, lane, section, seconds):
+        self.sections[self._index, lane, section] += seconds
+
+    def set_sprites(self, lane, grass, barrier, flag):
+        row = self.sprites[self._index, lane]
+        row[0] = grass
+        row[1] = barrier
+        row[2] = flag
+
+    def end_frame(self, flip_seconds):
+        self.flip_times[self._index] = flip_seconds
+        self.frame_times[self._index] = time.perf_counter() - self._frame_start
+        self.frame_count += 1
+
+    def _filled(self):
+        """Индексы записанных кадров в хронологическом порядке"""
+        if self.frame_count <= self.capacity:
+            return np.arange(self.frame_count)
+        start = self.frame_count % self.capacity
+        return np.concatenate((np.arange(start, self.capacity), np.arange(start)))
+
+    def percentiles(self):
+        """p50/p99 времени кадра в миллисекундах по содержимому буфера"""
+        if self.frame_count == 0:
+            return None, None
+        frame_times = self.frame_times[self._filled()]
+        p50, p99 = np.percentile(frame_times, (50, 99)) * 1000.0
+        return float(p50), float(p99)
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def draw_overlay(self, surface):
+        """Рисует p50/p99 и число спрайтов; текст перерисовывается 4 раза в секунду"""
+        now = time.perf_counter()
+        if self._overlay_surface is None or now - self._overlay_updated >= 0.25:
+            self._overlay_updated = now
+            if self._overlay_font is None:
+                self._overlay_font = pygame.font.SysFont(None, 24)
+            p50, p99 = self.percentiles()
+            lines = [f"frame p50 {p50 or 0:.2f} ms  p99 {p99 or 0:.2f} ms"]
+            last = self.sprites[(self.frame_count - 1) % self.capacity]
+            for lane in range(self.lane_count):
+                counts = ' '.join(f"{name} {last[lane, i]}" for i, name in enumerate(SPRITE_NAMES))
+                lines.append(f"lane {lane}: {counts}")
+            rendered = [self._overlay_font.render(line, True, (255, 255, 255)) for line in lines]
+            width = max(r.get_width() for r in rendered) + 12
+            height = sum(r.get_height() for r in rendered) + 12
+            self._overlay_surface = pygame.Surface((width, height))
+            self._overlay_surface.fill((0, 0, 0))
+            y = 6
+            for r in rendered:
+                self._overlay_surface.blit(r, (6, y))
+                y += r.get_height()
+        surface.blit(self._overlay_surface, (10, 20))
+
+    def export(self, basename=None):
+        """Сохраняет буфер в CSV (кадр x дорожка) и сводку в JSON; возвращает пути файлов"""
+        if basename is None:
+            basename = time.strftime('profile_%Y%m%d_%H%M%S')
+        order = self._filled()
+        first_frame = self.frame_count - len(order)
+        csv_path = basename + '.csv'
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('frame', 'lane', 'frame_ms', 'flip_ms')
+                            + tuple(name + '_ms' for name in SECTION_NAMES) + SPRITE_NAMES)
+            for n, i in enumerate(order):
+                for lane in range(self.lane_count):
+                    writer.writerow((first_frame + n, lane,
+                                     round(self.frame_times[i] * 1000.0, 4), round(self.flip_times[i] * 1000.0, 4))
+                                    + tuple(round(v * 1000.0, 4) for v in self.sections[i, lane])
+                                    + tuple(int(v) for v in self.sprites[i, lane]))
+        p50, p99 = self.percentiles()
+        json_path = basename + '.json'
+        summary = {
+            'frames': self.frame_count,
+            'buffered_frames': len(order),
+            'frame_p50_ms': p50,
+            'frame_p99_ms': p99,
+            'flip_mean_ms': float(self.flip_times[order].mean() * 1000.0) if len(order) else None,
+            'sections_mean_ms': {
+                name: [float(v) for v in self.sections[order, :, i].mean(axis=0) * 1000.0] if len(order) else None
+                for i, name in enumerate(SECTION_NAMES)
+            },
+        }
+        with open(json_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        return csv_path, json_path
@@ -1,9 +1,10 @@
-import pygame
-import os
-import glob
+import asset_cache
 
 
 class Animation:
+    __slots__ = ('frames', 'fps', 'loop', 'current_frame', 'frame_time', 'frame_duration',
+                 'is_playing', 'is_finished')
+
     def __init__(self, frames, fps=8, loop=True):
         self.frames = frames
         self.fps = fps
@@ -31,18 +32,47 @@ class Animation:
             return
         
         self.frame_time += dt
+        if self.frame_time < self.frame_duration:
+            return
+        
+        # Остаток времени переносится на следующий кадр, за один вызов
+        # можно пройти несколько кадров (низкий FPS или большой dt)
+        steps = int(self.frame_time / self.frame_duration)
+        self.frame_time -= steps * self.frame_duration
+        self.current_frame += steps
         
-        if self.frame_time >= self.frame_duration:
+        if self.current_frame >= len(self.frames):
+            if self.loop:
+                self.current_frame %= len(self.frames)
+            else:
+                self.current_frame = len(self.frames) - 1
+                self.frame_time = 0
+                self.is_finished = True
+                self.is_playing = False
+    
+    def frame_at(self, t):
+        """Индекс кадра через t секунд после начала воспроизведения (O(1))"""
+        index = int(t * self.fps)
+        if index < len(self.frames):
+            return index
+        if self.loop:
+            return index % len(self.frames)
+        return len(self.frames) - 1
+    
+    def is_finished_at(self, t):
+        """Закончится ли незацикленная анимация через t секунд после начала"""
+        return not self.loop and int(t * self.fps) >= len(self.frames)
+    
+    def seek(self, t):
+        """Переводит анимацию в состояние через t секунд после начала воспроизведения"""
+        self.current_frame = self.frame_at(t)
+        if self.is_finished_at(t):
             self.frame_time = 0
-            self.current_frame += 1
-            
-            if self.current_frame >= len(self.frames):
-                if self.loop:
-                    self.current_frame = 0
-                else:
-                    self.current_frame = len(self.frames) - 1
-                    self.is_finished = True
-                    self.is_playing = False
+            self.is_finished = True
+            self.is_playing = False
+        else:
+            self.frame_time = t - int(t * self.fps) * self.frame_duration
+            self.is_finished = False
     
     def get_current_frame(self):
         if not self.frames:
@@ -53,27 +83,5 @@ class Animation:
 class AnimationManager:
     @staticmethod
     def load_animation(folder_path, fps=8, loop=True):
-        """Load animation frames from a folder"""
-        frames = []
-        
-        # Get all PNG files in the folder
-        pattern = os.path.join(folder_path, "*.png")
-        image_files = sorted(glob.glob(pattern))
-        
-        for image_file in image_files:
-            try:
-                image = pygame.image.load(image_file)
-                # Convert to display format for better performance
-                image = image.convert_alpha()
-                frames.append(image)
-            except pygame.error as e:
-                print(f"Error loading image {image_file}: {e}")
-        
-        if not frames:
-            print(f"Warning: No frames found in {folder_path}")
-            # Create a placeholder surface
-            placeholder = pygame.Surface((32, 32), pygame.SRCALPHA)
-            pygame.draw.rect(placeholder, (255, 0, 0), (0, 0, 32, 32))
-            frames = [placeholder]
-        
-        return Animation(frames, fps, loop)
+        """Load animation frames from a folder (frames are shared via asset_cache)"""
+        return Animation(asset_cache.load_frames(folder_path), fps, loop)
@@ -0,0 +1,89 @@
+"""Адаптивное качество отрисовки по измеренному времени кадра.
+
+QualityGovernor получает время работы каждого кадра (обновление, отрисовка и flip,
+без ожидания в clock.tick) и раз в окно из QUALITY_WINDOW_FRAMES кадров сравнивает
+среднее с бюджетом. Превышение бюджета — уровень ниже сразу; подъем — только после
+QUALITY_UP_WINDOWS окон подряд с запасом (среднее ниже QUALITY_UP_FRACTION бюджета).
+Если после подъема кадр снова не укладывается, число окон для следующего подъема
+удваивается, чтобы качество не переключалось туда и обратно.
+
+Уровни меняют только картинку: события плана, спрайты и random заезда те же,
+поэтому записи заездов воспроизводятся при любом уровне.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    name: str
+    grass_stride: int    # рисуется примерно каждая N-я трава плана
+    smooth_sky: bool     # новое масштабирование неба через smoothscale (иначе scale)
+    sky_image: bool      # картинка неба (иначе заливка SKY_COLOR)
+    overlay_blend: bool  # полупрозрачное затемнение и тени текста в оверлеях
+
+
+# От лучшего к худшему; каждый следующий уровень дешевле предыдущего
+LEVELS = (
+    QualityLevel('high', 1, True, True, True),
+    QualityLevel('medium', 2, True, True, False),
+    QualityLevel('low', 4, False, True, False),
+    QualityLevel('lowest', 8, False, False, False),
+)
+
+
+class QualityGovernor:
+    def __init__(self, budget_sec, window_frames, up_fraction, up_windows, max_up_windows=64):
+        self.budget_sec = budget_sec
+        self.window_frames = window_frames
+        self.up_fraction = up_fraction
+        self.base_up_windows = up_windows
+        self.up_windows = up_windows
+        self.max_up_windows = max_up_windows
+        self.level = 0
+        self._sum = 0.0
+        self._count = 0
+        self._good_windows = 0
+        self._since_raise = None  # окон после последнего подъема (None — последней сменой был спуск)
+
+    def frame_done(self, seconds):
+        """Учитывает время кадра; возвращает новый QualityLevel при смене уровня, иначе None"""
+        self._sum += seconds
+        self._count += 1
+        if self._count < self.window_frames:
+            return None
+        average = self._sum / self._count
+        self._sum = 0.0
+        self._count = 0
+
+        if average > self.budget_sec:
+            self._good_windows = 0
+            if self.level == len(LEVELS) - 1:
+                return None
+            if self._since_raise is not None and self._since_raise < self.up_windows:
+                # Подъем не удержался: следующий — только после вдвое большего запаса
+                self.up_windows = min(self.up_windows * 2, self.max_up_windows)
+            self._since_raise = None
+            return self._set_level(self.level + 1, average)
+
+        if self._since_raise is not None:
+            self._since_raise += 1
+            if self._since_raise == self.up_windows:
+                # Подъем удержался: штраф снимается
+                self.up_windows = self.base_up_windows
+        if self.level > 0 and average < self.budget_sec * self.up_fraction:
+            self._good_windows += 1
+            if self._good_windows >= self.up_windows:
+                self._good_windows = 0
+                self._since_raise = 0
+                return self._set_level(self.level - 1, average)
+        else:
+            self._good_windows = 0
+        return None
+
+    def _set_level(self, level, average):
+        old = LEVELS[self.level]
+        self.level = level
+        new = LEVELS[level]
+        print(f"Quality {old.name} -> {new.name}: frame {average * 1000:.1f} ms, "
+              f"budget {self.budget_sec * 1000:.1f} ms")
+        return new
@@ -1,10 +1,25 @@
-import time
+from game_clock import SYSTEM_CLOCK
 
 
 class RaceController:
-    def __init__(self):
+    def __init__(self, clock=SYSTEM_CLOCK):
+        self.clock = clock
         self._winner_path = None
         self._winner_time = None
+        self._start_time = None
+
+    def start(self):
+        """Отмечает старт заезда (конец обратного отсчета)"""
+        self._start_time = self.clock.now()
+
+    def is_started(self):
+        return self._start_time is not None
+
+    def race_duration(self):
+        """Время от старта до победы или None"""
+        if self._start_time is None or self._winner_time is None:
+            return None
+        return self._winner_time - self._start_time
 
     def get_winner(self):
         return self._winner_path
@@ -12,9 +27,9 @@ class RaceController:
     def declare_winner(self, path):
         if self._winner_path is None:
             self._winner_path = path
-            self._winner_time = time.time()
+            self._winner_time = self.clock.now()
 
     def should_auto_restart(self, seconds: float) -> bool:
-        return self._winner_time is not None and (time.time() - self._winner_time) >= seconds
+        return self._winner_time is not None and (self.clock.now() - self._winner_time) >= seconds
 
 
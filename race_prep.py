@@ -0,0 +1,89 @@
+import random
+import threading
+
+import pygame
+
+import asset_cache
+from constants import BARRIER_MAX_SPAWN_DISTANCE, BARRIER_MIN_SPAWN_DISTANCE, GRASS_MAX_SPAWN_DISTANCE, \
+    GRASS_MIN_SPAWN_DISTANCE, TRACK_TOTAL_DISTANCE
+from horse import Horse
+from path import Path
+from track_plan import TrackPlan
+
+
+def generate_plan(seed):
+    """План трассы — функция только seed (свой генератор, глобальный random не трогается)"""
+    return TrackPlan.generate(
+        total_distance=TRACK_TOTAL_DISTANCE,
+        min_grass_spacing=GRASS_MIN_SPAWN_DISTANCE,
+        max_grass_spacing=GRASS_MAX_SPAWN_DISTANCE,
+        min_barrier_spacing=BARRIER_MIN_SPAWN_DISTANCE,
+        max_barrier_spacing=BARRIER_MAX_SPAWN_DISTANCE,
+        rng=random.Random(seed),
+    )
+
+
+class RacePreparer:
+    """Готовит следующий заезд в фоновом потоке, пока идет экран победы.
+
+    Поток генерирует план, декодирует и масштабирует небо под высоты дорожек и тонирует
+    кадры лошадей нужных цветов — только в свои объекты, не трогая asset_cache и кэши
+    Horse. В кэши готовое кладет result() уже в главном потоке между кадрами, как
+    AssetReloader.apply_pending. Дорожки и лошади создаются при старте заезда (после
+    random.seed, чтобы заезд оставался воспроизводимым), но это только легкие объекты
+    поверх готовых ресурсов.
+    """
+
+    def __init__(self, seed, sky_heights, jacket_color_shifts):
+        self.seed = seed
+        self._sky_heights = sky_heights
+        self._jacket_color_shifts = jacket_color_shifts
+        self._plan = None
+        self._sky = None  # (путь, alpha, поверхность, pixel_key)
+        self._sky_scaled = {}  # ключ load_scaled -> поверхность
+        self._frames = {}  # цвет жокея -> кадры из Horse.prepare_frames
+        self._thread = threading.Thread(target=self._prepare, name='race-prep', daemon=True)
+        self._thread.start()
+
+    def result(self):
+        """Возвращает (seed, план) и кладет подготовленные ресурсы в кэши (главный поток).
+        Ждет поток, только если окно рестарта оказалось короче подготовки"""
+        self._thread.join()
+        if self._plan is None:
+            self._plan = generate_plan(self.seed)
+        if self._sky is not None:
+            asset_cache.add_image(*self._sky)
+        asset_cache.add_scaled(self._sky_scaled)
+        for shift, prepared in self._frames.items():
+            Horse.add_prepared_frames(shift, prepared)
+        return self.seed, self._plan
+
+    def _prepare(self):
+        plan = generate_plan(self.seed)
+        path = plan.sky_background_path
+        if path:
+            try:
+                self._prepare_sky(path)
+            except pygame.error as e:
+                print(f"Error preparing sky background {path}: {e}")
+        for shift in self._jacket_color_shifts:
+            prepared = Horse.prepare_frames(shift)
+            if prepared is not None:
+                self._frames[shift] = prepared
+        self._plan = plan
+
+    def _prepare_sky(self, path):
+        """Небо и его масштабированные копии, которых еще нет в кэше"""
+        self._sky = (path, False) + asset_cache.decode_image(path, alpha=False)
+        sky = self._sky[2]
+        cached = set(asset_cache.cached_scaled_keys())
+        for height in self._sky_heights:
+            size = Path.sky_scaled_size(sky, height)
+            if (path, False, size, False, True) in cached and (path, False, size, True, True) in cached:
+                continue
+            try:
+                scaled = pygame.transform.smoothscale(sky, size)
+            except ValueError:
+                scaled = pygame.transform.scale(sky, size)
+            self._sky_scaled[(path, False, size, False, True)] = scaled
+            self._sky_scaled[(path, False, size, True, True)] = pygame.transform.flip(scaled, True, False)
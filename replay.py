@@ -0,0 +1,281 @@
+"""Запись и воспроизведение заездов.
+
+Лог заезда — компактный бинарный файл: seed, TrackPlan, dt каждого шага симуляции
+(1 байт, мс) и нажатия, прошедшие через Path.handle_event, с номером шага.
+Воспроизведение подает те же нажатия на тех же шагах и получает того же
+победителя и те же traveled_distance — если картинки те же: число и размеры кадров
+лошади задают ход симуляции, поэтому их отпечаток пишется в заголовок и сверяется.
+
+    python replay.py recordings/race_....hrr              # как можно быстрее, без окна
+    python replay.py recordings/race_....hrr --realtime   # в реальном времени с отрисовкой
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+
+from track_plan import TrackEvent, TrackPlan
+
+MAGIC = b'HRRP'
+# 2 — падения по маскам кадров (в версии 1 — по прямоугольникам);
+# 3 — трава без random (см. grass.py), последовательность random заезда другая;
+# 4 — картинка барьера по событию плана, спрайты создаются по экранной видимости (см. Path);
+# 5 — отпечаток картинок в заголовке;
+# 6 — правило столкновений (Path.pixel_collision) в заголовке
+VERSION = 6
+
+# magic, версия, seed, ширина и высота экрана, число дорожек, время часов на старте, число шагов,
+# отпечаток картинок (asset_fingerprint), флаги FLAG_*
+_HEADER = struct.Struct('<4sBIHHBdIQB')
+# Столкновения по маскам кадров (иначе по прямоугольникам)
+FLAG_PIXEL_COLLISION = 1
+_EVENT = struct.Struct('<Bdd')
+_INPUT = struct.Struct('<IB')
+
+_EVENT_KINDS = ('grass', 'barrier', 'flag')
+
+# Действие нажатия: код = дорожка * 4 + действие
+ACTION_LEFT = 0
+ACTION_RIGHT = 1
+ACTION_JUMP = 2
+
+
+def encode_key(lane_configs, key):
+    """Коды нажатия для всех дорожек, которым принадлежит клавиша"""
+    codes = []
+    for lane, config in enumerate(lane_configs):
+        controls = config.controls
+        if key == controls.left:
+            codes.append(lane * 4 + ACTION_LEFT)
+        elif key == controls.right:
+            codes.append(lane * 4 + ACTION_RIGHT)
+        elif key == controls.up:
+            codes.append(lane * 4 + ACTION_JUMP)
+    return codes
+
+
+def decode_key(lane_configs, code):
+    controls = lane_configs[code // 4].controls
+    return (controls.left, controls.right, controls.up)[code % 4]
+
+
+def asset_fingerprint():
+    """Отпечаток картинок, от которых зависит симуляция: размер холста лошади, число кадров,
+    рамки и размеры кадров ее анимаций и размеры картинок барьеров (после загрузки кадров)"""
+    import asset_cache
+    from horse import Horse
+
+    digest = hashlib.blake2b(digest_size=8)
+    frames = Horse._load_source()
+    digest.update(struct.pack('<HH', *Horse._canvas_size))
+    for animation_frames, crop in zip(frames, Horse._crops):
+        digest.update(struct.pack('<I4h', len(animation_frames), *crop))
+        for frame in animation_frames:
+            digest.update(struct.pack('<HH', *frame.get_size()))
+    for image_path in asset_cache.list_images(os.path.join('assets', 'barrier')):
+        digest.update(struct.pack('<HH', *asset_cache.load_image(image_path).get_size()))
+    return int.from_bytes(digest.digest(), 'little')
+
+
+class RaceLog:
+    def __init__(self, seed, plan, screen_size, lane_count, start_time):
+        self.seed = seed
+        self.plan = plan
+        self.screen_size = screen_size
+        self.lane_count = lane_count
+        self.start_time = start_time
+        self.dt_ms = bytearray()
+        self.inputs = []  # (шаг, код)
+        self.winner_lane = -1
+        self.distances = [0.0] * lane_count
+        self.asset_fingerprint = 0
+        self.pixel_collision = True
+
+    def to_bytes(self):
+        body = bytearray()
+        sky = (self.plan.sky_background_path or '').encode('utf-8')
+        body += struct.pack('<H', len(sky)) + sky
+        body += struct.pack('<dI', self.plan.total_distance, len(self.plan.events))
+        for event in self.plan.events:
+            y_frac = event.y_frac if event.y_frac is not None else -1.0
+            body += _EVENT.pack(_EVENT_KINDS.index(event.kind), event.distance, y_frac)
+        body += self.dt_ms
+        body += struct.pack('<I', len(self.inputs))
+        for step, code in self.inputs:
+            body += _INPUT.pack(step, code)
+        body += struct.pack('<b', self.winner_lane)
+        body += struct.pack(f'<{self.lane_count}d', *self.distances)
+        header = _HEADER.pack(MAGIC, VERSION, self.seed, self.screen_size[0], self.screen_size[1],
+                              self.lane_count, self.start_time, len(self.dt_ms), self.asset_fingerprint,
+                              FLAG_PIXEL_COLLISION if self.pixel_collision else 0)
+        return header + zlib.compress(bytes(body), 9)
+
+    @staticmethod
+    def from_bytes(data):
+        magic, version = struct.unpack_from('<4sB', data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a race log or unsupported version')
+        _, _, seed, width, height, lane_count, start_time, step_count, fingerprint, flags = _HEADER.unpack_from(data)
+        body = zlib.decompress(data[_HEADER.size:])
+        offset = 0
+
+        def read(fmt):
+            nonlocal offset
+            values = struct.unpack_from(fmt, body, offset)
+            offset += struct.calcsize(fmt)
+            return values
+
+        sky_len, = read('<H')
+        sky = body[offset:offset + sky_len].decode('utf-8') or None
+        offset += sky_len
+        total_distance, event_count = read('<dI')
+        events = []
+        for _ in range(event_count):
+            kind, distance, y_frac = _EVENT.unpack_from(body, offset)
+            offset += _EVENT.size
+            events.append(TrackEvent(_EVENT_KINDS[kind], distance, y_frac if y_frac >= 0 else None))
+        log = RaceLog(seed, TrackPlan(sky, events, total_distance), (width, height), lane_count, start_time)
+        log.asset_fingerprint = fingerprint
+        log.pixel_collision = bool(flags & FLAG_PIXEL_COLLISION)
+        log.dt_ms = bytearray(body[offset:offset + step_count])
+        offset += step_count
+        input_count, = read('<I')
+        for _ in range(input_count):
+            log.inputs.append(_INPUT.unpack_from(body, offset))
+            offset += _INPUT.size
+        log.winner_lane, = read('<b')
+        log.distances = list(read(f'<{lane_count}d'))
+        return log
+
+
+class RaceRecorder:
+    """Пишет заезд во время игры; Game вызывает step() в начале каждого кадра"""
+
+    def __init__(self, seed, plan, screen_size, lane_configs, start_time):
+        self.lane_configs = lane_configs
+        self.log = RaceLog(seed, plan, screen_size, len(lane_configs), start_time)
+        self.log.asset_fingerprint = asset_fingerprint()
+        from path import Path
+        self.log.pixel_collision = Path.pixel_collision
+
+    def step(self, dt):
+        self.log.dt_ms.append(round(dt * 1000.0))
+
+    def key_pressed(self, key):
+        step = len(self.log.dt_ms) - 1
+        for code in encode_key(self.lane_configs, key):
+            self.log.inputs.append((step, code))
+
+    def finish(self, paths, race_controller):
+        winner = race_controller.get_winner()
+        self.log.winner_lane = paths.index(winner) if winner in paths else -1
+        self.log.distances = [path.traveled_distance for path in paths]
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, time.strftime('race_%Y%m%d_%H%M%S') + f'_{self.log.seed:08x}.hrr')
+        with open(path, 'wb') as f:
+            f.write(self.log.to_bytes())
+        return path
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return RaceLog.from_bytes(f.read())
+
+
+def replay(log, realtime=False, render=None, capture_dir=None):
+    """Воспроизводит заезд; возвращает (номер дорожки-победителя или -1, traveled_distance по дорожкам).
+    capture_dir — записать кадры в PNG (все, без пропусков: офлайн кодировщик можно ждать)"""
+    if render is None:
+        render = realtime or capture_dir is not None
+    if not realtime:
+        # Без показа на экране (и при записи кадров) окно не нужно
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from path import Path
+
+    # Правило столкновений — как при записи, независимо от PIXEL_COLLISION
+    pixel_collision = Path.pixel_collision
+    Path.pixel_collision = log.pixel_collision
+    try:
+        return _replay(log, realtime, render, capture_dir)
+    finally:
+        Path.pixel_collision = pixel_collision
+
+
+def _replay(log, realtime, render, capture_dir):
+    import pygame
+    import main
+    from game_clock import ManualClock
+
+    clock = ManualClock()
+    lane_configs = main.default_lane_configs(log.lane_count, bot_count=0)
+    game = main.Game(lane_configs, clock=clock, screen_size=log.screen_size, record=False, results_db=None)
+    # Качество отрисовки не подстраивается: кадры воспроизведения (и записи) — всегда в полном качестве
+    game.quality = None
+    if log.asset_fingerprint != asset_fingerprint():
+        print(f"Warning: assets differ from the recording (fingerprint {log.asset_fingerprint:016x}, "
+              f"now {asset_fingerprint():016x}): horse frames or barriers changed, the replay may not match")
+    clock.set_time(log.start_time)
+    game.start_race(log.plan, log.seed)
+    if capture_dir is not None:
+        from capture import FrameCapture
+        from constants import CAPTURE_SLOTS
+        if game.capture is not None:
+            game.capture.close()  # запись, начатая по CAPTURE, — вместо нее своя, без пропусков
+        game.capture = FrameCapture(game.screen, capture_dir, CAPTURE_SLOTS, drop=False)
+
+    inputs_by_step = {}
+    for step, code in log.inputs:
+        inputs_by_step.setdefault(step, []).append(
+            pygame.event.Event(pygame.KEYDOWN, key=decode_key(lane_configs, code)))
+
+    pacer = pygame.time.Clock() if realtime else None
+    paths, race_controller = game.lanes.paths, game.race_controller
+    for step, ms in enumerate(log.dt_ms):
+        if pacer is not None and ms:
+            pacer.tick(1000.0 / ms)
+            pygame.event.pump()
+        clock.step = ms / 1000.0
+        game.dt = clock.tick(0)
+        # Перезапуск в последнем кадре пересоздает дорожки — итог берем по дорожкам этого заезда
+        paths, race_controller = game.lanes.paths, game.race_controller
+        game.frame(inputs_by_step.get(step, ()), render=render)
+
+    if game.capture is not None:
+        game.capture.close()
+    winner = race_controller.get_winner()
+    winner_lane = paths.index(winner) if winner in paths else -1
+    return winner_lane, [path.traveled_distance for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Воспроизведение записанного заезда')
+    parser.add_argument('log')
+    parser.add_argument('--realtime', action='store_true', help='в реальном времени с отрисовкой')
+    parser.add_argument('--capture', metavar='DIR', help='записать кадры заезда в PNG в DIR')
+    args = parser.parse_args(argv)
+
+    log = load(args.log)
+    start = time.perf_counter()
+    winner_lane, distances = replay(log, realtime=args.realtime, capture_dir=args.capture)
+    elapsed = time.perf_counter() - start
+    print(f"{len(log.dt_ms)} steps, {len(log.inputs)} inputs, replayed in {elapsed:.2f} s")
+    print(f"winner lane: recorded {log.winner_lane}, replayed {winner_lane}")
+    for lane, (recorded, replayed) in enumerate(zip(log.distances, distances)):
+        print(f"lane {lane} traveled_distance: recorded {recorded:.3f}, replayed {replayed:.3f}")
+    match = winner_lane == log.winner_lane and distances == log.distances
+    if match:
+        print('match')
+    elif log.asset_fingerprint != asset_fingerprint():
+        print('MISMATCH: assets differ from the recording')
+    else:
+        print('MISMATCH')
+    return 0 if match else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""Результаты заездов в локальной базе SQLite.
+
+Game передает итог заезда в ResultsStore.record() — это только постановка в очередь.
+Запись идет в фоновом потоке пачками (одна транзакция на пачку), поэтому кадр
+не ждет диска. Запросы открывают отдельное соединение; база в режиме WAL,
+так что чтение не блокирует запись.
+
+    python results.py leaderboard       # лучшие времена победителей
+    python results.py lanes             # победы и падения по дорожкам
+    python results.py daily             # заезды по дням
+"""
+import argparse
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from constants import RESULTS_BATCH_SIZE, RESULTS_DB, RESULTS_FLUSH_SEC
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,       -- unix time старта
+    day TEXT NOT NULL,              -- YYYY-MM-DD по местному времени, для агрегатов по дням
+    duration_sec REAL,              -- от старта до победы, NULL если победителя нет
+    winner_lane INTEGER NOT NULL,   -- -1 если заезд прерван
+    lane_count INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    falls INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lane_results (
+    race_id INTEGER NOT NULL REFERENCES races(id),
+    lane INTEGER NOT NULL,
+    jacket_color_shift REAL NOT NULL,
+    falls INTEGER NOT NULL,
+    distance REAL NOT NULL,
+    won INTEGER NOT NULL,
+    PRIMARY KEY (race_id, lane)
+);
+-- Покрывающие индексы: запросы статистики читают только индекс, не таблицу
+CREATE INDEX IF NOT EXISTS races_leaderboard ON races(duration_sec, winner_lane, started_at) WHERE winner_lane >= 0;
+CREATE INDEX IF NOT EXISTS races_day ON races(day, duration_sec, falls);
+CREATE INDEX IF NOT EXISTS lane_results_lane ON lane_results(lane, won, falls);
+"""
+
+
+@dataclass(frozen=True)
+class LaneResult:
+    jacket_color_shift: float
+    falls: int
+    distance: float
+
+
+@dataclass(frozen=True)
+class RaceResult:
+    started_at: float
+    duration_sec: float  # None, если победителя нет
+    winner_lane: int
+    seed: int
+    lanes: tuple  # LaneResult по дорожкам сверху вниз
+
+
+def _connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    # Пачка и так пишется одной транзакцией; FULL добавил бы fsync на каждую
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+class ResultsStore:
+    def __init__(self, path=RESULTS_DB, batch_size=RESULTS_BATCH_SIZE, flush_interval=RESULTS_FLUSH_SEC):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        connection = _connect(path)
+        connection.executescript(_SCHEMA)
+        connection.close()
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self.written = 0  # заездов записано фоновым потоком
+        self._thread = threading.Thread(target=self._worker, name='results-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, result):
+        """Ставит результат в очередь на запись, не блокируя"""
+        self._queue.put(result)
+
+    def close(self):
+        """Дописывает очередь и останавливает поток"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _worker(self):
+        connection = _connect(self.path)
+        # Пишет в базу только этот поток, поэтому id заездов назначаются здесь,
+        # и пачка уходит двумя executemany без lastrowid на каждую строку
+        self._next_id = connection.execute('SELECT COALESCE(MAX(id), 0) FROM races').fetchone()[0] + 1
+        stop = False
+        while not stop:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                stop = True
+            if batch:
+                try:
+                    self._write(connection, batch)
+                except sqlite3.Error as e:
+                    print(f"Failed to write race results: {e}")
+        connection.close()
+
+    def _write(self, connection, batch):
+        races = []
+        lanes = []
+        for race_id, result in enumerate(batch, self._next_id):
+            races.append((race_id, result.started_at, result.duration_sec, result.winner_lane, len(result.lanes),
+                          result.seed, sum(lane.falls for lane in result.lanes)))
+            lanes.extend((race_id, index, lane.jacket_color_shift, lane.falls, lane.distance, index == result.winner_lane)
+                         for index, lane in enumerate(result.lanes))
+        with connection:
+            connection.executemany(
+                'INSERT INTO races (id, started_at, day, duration_sec, winner_lane, lane_count, seed, falls) '
+                "VALUES (?1, ?2, date(?2, 'unixepoch', 'localtime'), ?3, ?4, ?5, ?6, ?7)", races)
+            connection.executemany(
+                'INSERT INTO lane_results (race_id, lane, jacket_color_shift, falls, distance, won) '
+                'VALUES (?, ?, ?, ?, ?, ?)', lanes)
+        self._next_id += len(batch)
+        self.written += len(batch)
+
+    # --- запросы (в потоке вызывающего, отдельным соединением) ---
+
+    def _query(self, sql, params=()):
+        connection = _connect(self.path)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def leaderboard(self, limit=10):
+        """Лучшие времена: (duration_sec, winner_lane, started_at)"""
+        return self._query('SELECT duration_sec, winner_lane, started_at FROM races '
+                           'WHERE winner_lane >= 0 ORDER BY duration_sec LIMIT ?', (limit,))
+
+    def lane_stats(self):
+        """По дорожкам: (lane, заездов, побед, падений всего)"""
+        return self._query('SELECT lane, COUNT(*), SUM(won), SUM(falls) FROM lane_results GROUP BY lane ORDER BY lane')
+
+    def daily_stats(self, first_day=None, last_day=None):
+        """По дням: (day, заездов, завершенных, средняя длительность, лучшее время, падений)"""
+        return self._query('SELECT day, COUNT(*), COUNT(duration_sec), AVG(duration_sec), MIN(duration_sec), SUM(falls) '
+                           'FROM races WHERE day BETWEEN ? AND ? GROUP BY day ORDER BY day',
+                           (first_day or '0000-00-00', last_day or '9999-99-99'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Статистика заездов')
+    parser.add_argument('query', choices=('leaderboard', 'lanes', 'daily'))
+    parser.add_argument('--db', default=RESULTS_DB)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    store = ResultsStore(args.db)
+    if args.query == 'leaderboard':
+        for place, (duration, lane, started_at) in enumerate(store.leaderboard(args.limit), 1):
+            print(f"{place:3d}. {duration:8.2f} s  lane {lane}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(started_at))}")
+    elif args.query == 'lanes':
+        for lane, races, wins, falls in store.lane_stats():
+            print(f"lane {lane}: races {races}, wins {wins}, falls {falls}")
+    else:
+        for day, races, finished, avg, best, falls in store.daily_stats():
+            print(f"{day}: races {races}, finished {finished}, avg {avg or 0:.2f} s, best {best or 0:.2f} s, falls {falls}")
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Телеметрия заездов: покадровые трассы дорожек для подбора расстояний между барьерами
+и скоростей галопа.
+
+В кадре TelemetryRecorder.record() только пишет числа в заранее выделенные numpy-блоки
+(по столбцу на величину, строка — кадр, столбец массива — дорожка). Блоки образуют
+кольцо из TELEMETRY_BLOCKS штук: заполненный блок уходит фоновому потоку, запись
+продолжается в следующий. Поток копирует блок и возвращает его в кольцо, а в конце
+заезда склеивает копии и пишет один файл np.savez_compressed на заезд. Если поток
+отстал на все кольцо, кадры не ждут диска, а пропускаются (счетчик dropped в файле).
+
+    python telemetry.py telemetry/race_*.npz    # сводка по дорожкам
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from horse_states import BARRIER, NAMES
+
+# Столбцы кадра и столбцы дорожек: имя -> dtype
+FRAME_COLUMNS = {'time': np.float64, 'dt': np.float32}
+LANE_COLUMNS = {
+    'distance': np.float64,      # traveled_distance
+    'speed': np.float32,         # get_speed(), пикселей в секунду
+    'state': np.uint8,           # AnimState
+    'gallop_factor': np.float32,
+    'falls': np.uint16,          # с начала заезда
+    'jumps': np.uint16,          # с начала заезда (входы в состояние BARRIER)
+}
+
+
+class _Block:
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, frames, lane_count):
+        self.columns = {name: np.zeros(frames, dtype=dtype) for name, dtype in FRAME_COLUMNS.items()}
+        self.columns.update((name, np.zeros((frames, lane_count), dtype=dtype)) for name, dtype in LANE_COLUMNS.items())
+        self.rows = 0
+
+
+class TelemetryRecorder:
+    def __init__(self, lane_count, directory, block_frames, blocks):
+        self.lane_count = lane_count
+        self.directory = directory
+        self.block_frames = block_frames
+        self._blocks = [_Block(block_frames, lane_count) for _ in range(blocks)]
+        # Свободных блоков в кольце; запись никогда не ждет этот семафор
+        self._free = threading.Semaphore(blocks - 1)
+        self._next = 1
+        self._block = self._blocks[0]
+        self._jumps = [0] * lane_count
+        self._prev_state = [None] * lane_count
+        self._race = None
+        self.dropped = 0  # кадров пропущено текущим заездом
+        self.written = []  # пути записанных файлов
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._worker, name='telemetry-writer', daemon=True)
+        self._thread.start()
+
+    def begin_race(self, seed, plan):
+        """Начинает трассу нового заезда (незаконченная предыдущая дописывается)"""
+        self.finish_race()
+        self._race = {
+            'seed': seed,
+            'total_distance': plan.total_distance,
+            'barrier_distances': np.array(plan.barrier_distances, dtype=np.float64),
+        }
+        self._jumps = [0] * self.lane_count
+        self._prev_state = [None] * self.lane_count
+        self.dropped = 0
+
+    def record(self, now, dt, paths):
+        """Одна строка трассы; без выделения памяти, кроме смены блока"""
+        block = self._block
+        if block is None:
+            # Поток отстал на все кольцо: кадр пропускается, пока не освободится блок
+            if not self._take_block():
+                self.dropped += 1
+                return
+            block = self._block
+        row = block.rows
+        columns = block.columns
+        columns['time'][row] = now
+        columns['dt'][row] = dt
+        distance = columns['distance'][row]
+        speed = columns['speed'][row]
+        states = columns['state'][row]
+        gallop = columns['gallop_factor'][row]
+        falls = columns['falls'][row]
+        jumps = columns['jumps'][row]
+        prev_state = self._prev_state
+        for lane, path in enumerate(paths):
+            horse = path.horse
+            state = horse.current_animation
+            if state == BARRIER and prev_state[lane] != BARRIER:
+                self._jumps[lane] += 1
+            prev_state[lane] = state
+            distance[lane] = path.traveled_distance
+            speed[lane] = horse.get_speed()
+            states[lane] = state
+            gallop[lane] = horse.gallop_speed_factor
+            falls[lane] = path.falls
+            jumps[lane] = self._jumps[lane]
+        block.rows = row + 1
+        if block.rows == self.block_frames:
+            self._queue.put(('block', block))
+            self._block = None
+            self._take_block()
+
+    def _take_block(self):
+        if not self._free.acquire(blocking=False):
+            return False
+        self._block = self._blocks[self._next]
+        self._next = (self._next + 1) % len(self._blocks)
+        return True
+
+    def finish_race(self):
+        """Отдает потоку остаток трассы и заголовок заезда; файл пишется в фоне"""
+        if self._race is None:
+            return
+        block = self._block
+        if block is not None and block.rows:
+            self._queue.put(('block', block))
+            self._block = None
+            self._take_block()
+        self._queue.put(('finish', dict(self._race, dropped=self.dropped, lane_count=self.lane_count)))
+        self._race = None
+
+    def close(self):
+        """Дописывает трассу текущего заезда и останавливает поток"""
+        self.finish_race()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _worker(self):
+        parts = []
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            kind, payload = item
+            if kind == 'block':
+                rows = payload.rows
+                parts.append({name: column[:rows].copy() for name, column in payload.columns.items()})
+                payload.rows = 0
+                self._free.release()
+                continue
+            columns = {name: np.concatenate([part[name] for part in parts]) if parts else
+                       np.zeros((0,) + ((self.lane_count,) if name in LANE_COLUMNS else ()), dtype=dtype)
+                       for name, dtype in {**FRAME_COLUMNS, **LANE_COLUMNS}.items()}
+            parts = []
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, time.strftime('race_%Y%m%d_%H%M%S') + f"_{payload['seed']:08x}.npz")
+            try:
+                np.savez_compressed(path, **columns, **payload)
+                self.written.append(path)
+            except OSError as e:
+                print(f"Error writing telemetry {path}: {e}")
+
+
+def load(path):
+    """Трасса заезда: dict столбцов (кадр или кадр x дорожка) и скаляров заголовка"""
+    with np.load(path) as data:
+        return {name: data[name] if data[name].ndim else data[name].item() for name in data.files}
+
+
+def summary(trace):
+    """Сводка по дорожкам: дистанция, средняя скорость в движении, прыжки, падения"""
+    lanes = []
+    for lane in range(trace['lane_count']):
+        speed = trace['speed'][:, lane]
+        moving = speed > 0
+        lanes.append({
+            'lane': lane,
+            'distance': float(trace['distance'][-1, lane]) if len(speed) else 0.0,
+            'mean_speed': float(speed[moving].mean()) if moving.any() else 0.0,
+            'max_gallop_factor': float(trace['gallop_factor'][:, lane].max()) if len(speed) else 0.0,
+            'jumps': int(trace['jumps'][-1, lane]) if len(speed) else 0,
+            'falls': int(trace['falls'][-1, lane]) if len(speed) else 0,
+            'state_frames': {NAMES[state]: int(count) for state, count in
+                             zip(*np.unique(trace['state'][:, lane], return_counts=True))},
+        })
+    return lanes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Сводка телеметрии заездов')
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args(argv)
+    for path in args.paths:
+        trace = load(path)
+        gaps = np.diff(trace['barrier_distances'])
+        print(f"{path}: seed {trace['seed']:08x}, {len(trace['time'])} frames, {trace['dropped']} dropped, "
+              f"barrier spacing {gaps.min() if len(gaps) else 0:.0f}..{gaps.max() if len(gaps) else 0:.0f}")
+        for lane in summary(trace):
+            print(f"  lane {lane['lane']}: distance {lane['distance']:.0f}, mean speed {lane['mean_speed']:.0f}, "
+                  f"gallop x{lane['max_gallop_factor']:.1f}, jumps {lane['jumps']}, falls {lane['falls']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
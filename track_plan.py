@@ -1,8 +1,8 @@
 import os
-import glob
 from dataclasses import dataclass
 import random
 
+import asset_cache
 from constants import GRASS_MAX_Y_FRAC, GRASS_MIN_Y_FRAC, HORSE_SHADOW_MAX_Y_FRAC, HORSE_SHADOW_MIN_Y_FRAC
 
 
@@ -19,32 +19,42 @@ class TrackPlan:
         # events must be sorted by distance
         self.events = events
         self.total_distance = total_distance
+        # Данные, производные от плана, считаются один раз и общие для всех дорожек
+        self.distances = [e.distance for e in events]
+        # Трава рисуется запеченными кусками (см. grass.py), спрайты — только барьеры и флаг
+        self.grass_events = [e for e in events if e.kind == 'grass']
+        self.sprite_events = [e for e in events if e.kind != 'grass']
+        self.sprite_distances = [e.distance for e in self.sprite_events]
+        self.barrier_distances = [e.distance for e in events if e.kind == 'barrier']
 
     @staticmethod
     def generate(total_distance: float,
                  min_grass_spacing: float,
                  max_grass_spacing: float,
                  min_barrier_spacing: float,
-                 max_barrier_spacing: float):
-        bg_path = TrackPlan._load_sky_background()
+                 max_barrier_spacing: float,
+                 rng=random):
+        """rng — источник случайности (по умолчанию модуль random); отдельный random.Random
+        позволяет готовить план в фоновом потоке, не сбивая последовательность игры"""
+        bg_path = TrackPlan._load_sky_background(rng)
 
         events = []
 
         # Grass events
         d = 0.0
         while d < total_distance:
-            d += random.uniform(min_grass_spacing, max_grass_spacing)
+            d += rng.uniform(min_grass_spacing, max_grass_spacing)
             if d >= total_distance:
                 break
-            y_frac = random.uniform(GRASS_MIN_Y_FRAC, GRASS_MAX_Y_FRAC)
+            y_frac = rng.uniform(GRASS_MIN_Y_FRAC, GRASS_MAX_Y_FRAC)
             while y_frac > HORSE_SHADOW_MIN_Y_FRAC and y_frac < HORSE_SHADOW_MAX_Y_FRAC:
-                y_frac = random.uniform(GRASS_MIN_Y_FRAC, GRASS_MAX_Y_FRAC)
+                y_frac = rng.uniform(GRASS_MIN_Y_FRAC, GRASS_MAX_Y_FRAC)
             events.append(TrackEvent('grass', d, y_frac))
 
         # Barrier events
         d = 0.0
         while d < total_distance:
-            d += random.uniform(min_barrier_spacing, max_barrier_spacing)
+            d += rng.uniform(min_barrier_spacing, max_barrier_spacing)
             if d >= total_distance:
                 break
             events.append(TrackEvent('barrier', d, None))
@@ -55,14 +65,15 @@ class TrackPlan:
         events.sort(key=lambda e: e.distance)
         return TrackPlan(bg_path, events, total_distance)
 
-    def _load_sky_background():
+    def _load_sky_background(rng=random):
         """Загружает случайное изображение неба из assets/backgrounds."""
         try:
             folder = os.path.join('assets', 'backgrounds')
-            candidates = sorted(glob.glob(os.path.join(folder, '*.png')))
+            # Список из asset_cache: при подключенном бандле — из его индекса, без чтения папки
+            candidates = asset_cache.list_images(folder)
             if not candidates:
                 return None
-            path = random.choice(candidates)
+            path = rng.choice(candidates)
             return path
         except Exception as e:
             print(f"Error loading sky background: {e}")